@@ -0,0 +1,286 @@
+"""End-to-end latency benchmark for the LLM-backed pipelines.
+
+Runs query_rag, full_ingest_pipeline and run_full_scan against whatever
+LLMClient is configured, normally a cassette so results are reproducible:
+
+    # Record once against the real API (or llm_stub.py)
+    python benchmark.py --cassette bench/nexus.jsonl.gz --mode record
+    # Replay without tokens, compare against a saved run
+    python benchmark.py --cassette bench/nexus.jsonl.gz --output bench/run.json
+    python benchmark.py --cassette bench/nexus.jsonl.gz --baseline bench/run.json
+
+Exits non-zero when a workload's p95 regresses past --tolerance.
+
+Replays are exact when recorded and replayed at the same --concurrency (or
+1): other interleavings change which rag queries race the cold index
+build or see ingest's graph mutations. Embeddings replay under any batching.
+
+The embed workload embeds 2000 texts per call, the shape of a full reindex.
+
+The ann and quant workloads need no LLM. On synthetic clustered vectors at
+each of --ann-sizes, ann measures exact vs. IVF search latency and
+recall@k, and quant compares the heap footprint, latency and recall@k of
+int8 and binary quantized indexes against exact float search.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import logging
+
+import numpy as np
+
+RAG_QUERIES = [
+    "What is the current pricing for Acme Corp and who committed to it?",
+    "Which teams are working on the billing API and are they aligned?",
+    "Who is overloaded right now and what should be delegated?",
+    "What decisions changed in EMEA this month?",
+    "Which AI agents are operating on outdated context?",
+]
+
+INGEST_TEXTS = [
+    ("slack", "Sarah Chen confirmed Acme Corp stays at $20/seat through Q3. Nova-Sales needs the updated pricing sheet."),
+    ("email", "Henrik decided to delay the EMEA launch by two weeks until the GDPR review from Nina Volkov is complete."),
+    ("meeting", "Priya will own the billing GraphQL migration; Atlas-Code should stop work on the REST v3 spec."),
+    ("agent_log", "Atlas-Code generated 14 endpoints against billing-api-v3.yaml and opened PR #482 for review."),
+]
+
+
+async def _rag(i: int):
+    from services.rag_v2 import query_rag
+    return await query_rag(RAG_QUERIES[i % len(RAG_QUERIES)])
+
+
+async def _ingest(i: int):
+    from services.ingest import full_ingest_pipeline
+    source_type, text = INGEST_TEXTS[i % len(INGEST_TEXTS)]
+    return await full_ingest_pipeline(text, source_type=source_type, source_id=f"bench-{i % len(INGEST_TEXTS)}")
+
+
+async def _scan(i: int):
+    from services.immune_llm import run_full_scan
+    scan = await run_full_scan()
+    # run_full_scan records a failed agent instead of raising; count it as an error
+    failed = {name: r["error"] for name, r in scan["by_agent"].items() if "error" in r}
+    if failed:
+        raise RuntimeError(f"{len(failed)} agents failed: {failed}")
+    return scan
+
+
+async def _embed(i: int):
+    # A reindex-sized batch; each iteration's texts are distinct so nothing is reused
+    from services.llm.client import get_llm_client
+    texts = [f"{INGEST_TEXTS[j % len(INGEST_TEXTS)][1]} ({i}-{j})" for j in range(2000)]
+    return await get_llm_client().embed(texts)
+
+
+WORKLOADS = {"rag": _rag, "ingest": _ingest, "scan": _scan, "embed": _embed}
+
+
+def _clustered_vectors(n: int, dim: int, rng, clusters: int = 1000) -> np.ndarray:
+    """Synthetic embeddings: topic centers plus noise, roughly like real text embeddings."""
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    return centers[rng.integers(0, clusters, size=n)] + 1.5 * rng.normal(size=(n, dim)).astype(np.float32)
+
+
+def ann_benchmark(sizes: list[int], dim: int, top_k: int, nprobes: list[int], queries: int = 50) -> dict:
+    """Recall@k and per-query latency of IVF search against exact search."""
+    from services.llm.vector_index import VectorIndex
+
+    rng = np.random.default_rng(0)
+    out = {}
+    for n in sizes:
+        vectors = _clustered_vectors(n, dim, rng)
+        index = VectorIndex()
+        index.add([f"n{i}" for i in range(n)], vectors)
+        qs = vectors[rng.choice(n, size=queries, replace=False)] + 0.3 * rng.normal(size=(queries, dim)).astype(np.float32)
+
+        start = time.perf_counter()
+        exact = [index.search_batch([q], top_k, exact=True)[0] for q in qs]
+        exact_ms = (time.perf_counter() - start) / queries * 1000
+        truth = [{node_id for node_id, _ in r} for r in exact]
+
+        start = time.perf_counter()
+        index.train_ivf()
+        entry = {"exact_ms": round(exact_ms, 3), "train_s": round(time.perf_counter() - start, 2), "ivf": {}}
+        print(f"ann n={n:<8d} exact {exact_ms:8.3f}ms/query  (IVF {len(index._ivf.centroids)} lists, trained in {entry['train_s']}s)")
+        for nprobe in nprobes:
+            start = time.perf_counter()
+            approx = [index.search_ivf([q], top_k, nprobe=nprobe)[0] for q in qs]
+            ms = (time.perf_counter() - start) / queries * 1000
+            recall = float(np.mean([len(t & {node_id for node_id, _ in a}) / len(t) for t, a in zip(truth, approx)]))
+            entry["ivf"][nprobe] = {"ms": round(ms, 3), "recall_at_k": round(recall, 4)}
+            print(f"    nprobe={nprobe:<4d} {ms:8.3f}ms/query  recall@{top_k}={recall:.3f}")
+        out[n] = entry
+    return out
+
+
+class _RowSource:
+    """Float rows by id, standing in for the memory-mapped EmbeddingStore."""
+
+    def __init__(self, ids: list[str], matrix: np.ndarray):
+        self._pos = {node_id: i for i, node_id in enumerate(ids)}
+        self._matrix = matrix
+
+    def get(self, ids: list[str]) -> np.ndarray:
+        return self._matrix[[self._pos[node_id] for node_id in ids]]
+
+
+def quant_benchmark(sizes: list[int], dim: int, top_k: int, queries: int = 50) -> dict:
+    """Heap bytes, per-query latency and recall@k of quantized indexes vs. exact float search."""
+    from services.llm.quantized_index import QuantizedIndex
+    from services.llm.vector_index import VectorIndex, normalize
+
+    rng = np.random.default_rng(0)
+    out = {}
+    for n in sizes:
+        vectors = _clustered_vectors(n, dim, rng)
+        ids = [f"n{i}" for i in range(n)]
+        qs = vectors[rng.choice(n, size=queries, replace=False)] + 0.3 * rng.normal(size=(queries, dim)).astype(np.float32)
+        exact_index = VectorIndex()
+        exact_index.ann = "exact"
+        exact_index.add(ids, vectors)
+        source = _RowSource(ids, normalize(vectors))
+
+        entry = {}
+        truth = None
+        for kind, index in (
+            ("float32", exact_index),
+            ("int8", QuantizedIndex("int8", rerank_source=source)),
+            ("binary", QuantizedIndex("binary", rerank_source=source)),
+        ):
+            if kind != "float32":
+                index.add(ids, vectors)
+            start = time.perf_counter()
+            found = [index.search(q, top_k) for q in qs]
+            ms = (time.perf_counter() - start) / queries * 1000
+            sets = [{node_id for node_id, _ in r} for r in found]
+            truth = truth or sets
+            recall = float(np.mean([len(t & f) / len(t) for t, f in zip(truth, sets)]))
+            entry[kind] = {"heap_mb": round(index.nbytes / 2**20, 2), "ms": round(ms, 3), "recall_at_k": round(recall, 4)}
+            print(f"quant n={n:<8d} {kind:8s} {entry[kind]['heap_mb']:9.2f}MB {ms:8.3f}ms/query  recall@{top_k}={recall:.3f}")
+        out[n] = entry
+    return out
+
+
+async def run_workload(name: str, iterations: int, concurrency: int) -> dict:
+    """Run one workload and summarize its per-call latencies."""
+    fn = WORKLOADS[name]
+    sem = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors: list[str] = []
+
+    async def one(i: int):
+        async with sem:
+            start = time.perf_counter()
+            try:
+                await fn(i)
+                latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                errors.append(str(e))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(iterations)))
+    wall = time.perf_counter() - start
+
+    arr = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "calls": iterations,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "mean_ms": round(float(arr.mean()), 1),
+        "p50_ms": round(float(np.percentile(arr, 50)), 1),
+        "p95_ms": round(float(np.percentile(arr, 95)), 1),
+        "p99_ms": round(float(np.percentile(arr, 99)), 1),
+        "max_ms": round(float(arr.max()), 1),
+        "throughput_per_s": round(len(latencies) / wall, 2) if wall else 0.0,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Workloads whose p95 exceeds the baseline by more than tolerance."""
+    regressions = []
+    for name, r in results["workloads"].items():
+        base = baseline.get("workloads", {}).get(name)
+        if not base or not base.get("p95_ms"):
+            continue
+        ratio = r["p95_ms"] / base["p95_ms"]
+        if ratio > 1 + tolerance:
+            regressions.append(f"{name}: p95 {r['p95_ms']}ms vs baseline {base['p95_ms']}ms ({ratio:.2f}x)")
+    return regressions
+
+
+async def main(args) -> int:
+    from services.llm.client import get_llm_client
+    client = get_llm_client()
+
+    results = {"config": vars(args), "workloads": {}}
+    for name in args.workloads.split(","):
+        if name == "ann":
+            results["ann"] = ann_benchmark(
+                [int(n) for n in args.ann_sizes.split(",")], args.ann_dim, 10,
+                [int(p) for p in args.ann_nprobe.split(",")],
+            )
+            continue
+        if name == "quant":
+            results["quant"] = quant_benchmark([int(n) for n in args.ann_sizes.split(",")], args.ann_dim, 10)
+            continue
+        results["workloads"][name] = await run_workload(name, args.iterations, args.concurrency)
+        r = results["workloads"][name]
+        print(
+            f"{name:8s} n={r['calls']:<4d} err={r['errors']:<3d} "
+            f"p50={r['p50_ms']:>8.1f}ms p95={r['p95_ms']:>8.1f}ms p99={r['p99_ms']:>8.1f}ms "
+            f"max={r['max_ms']:>8.1f}ms {r['throughput_per_s']:>6.2f}/s"
+        )
+        if r["first_error"]:
+            print(f"         first error: {r['first_error']}")
+
+    results["usage"] = client.usage.get_summary()
+    if hasattr(client.client, "stats"):
+        results["cassette"] = client.client.stats
+        print(f"cassette: {client.client.stats}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, default=str)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workloads", default="rag,ingest,scan", help="comma-separated subset of rag,ingest,scan,embed,ann,quant")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--cassette", help="cassette file (sets NEXUS_LLM_CASSETTE)")
+    parser.add_argument("--mode", default="replay", choices=["replay", "record", "auto"])
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--response-cache", action="store_true", help="keep LLMClient's in-process response cache on")
+    parser.add_argument("--ann-sizes", default="10000,100000", help="index sizes for the ann and quant workloads")
+    parser.add_argument("--ann-dim", type=int, default=256, help="vector dimension for the ann and quant workloads")
+    parser.add_argument("--ann-nprobe", default="4,16,64", help="IVF lists probed per query")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON to compare p95 against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed p95 increase over baseline")
+    args = parser.parse_args()
+
+    if args.cassette:
+        os.environ["NEXUS_LLM_CASSETTE"] = args.cassette
+        os.environ["NEXUS_LLM_CASSETTE_MODE"] = args.mode
+        os.environ["NEXUS_LLM_CASSETTE_LATENCY_SCALE"] = str(args.latency_scale)
+    if not args.response_cache:
+        # Otherwise repeated iterations measure cache lookups, not the pipeline
+        os.environ["NEXUS_LLM_CACHE_TTL"] = "0"
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,619 @@
+"""Local OpenAI-compatible stand-in for load and latency testing.
+
+Serves /v1/chat/completions (streaming and non-streaming) and /v1/embeddings
+with deterministic, schema-valid responses so LLMClient, RAG, ingest and the
+immune scan can be exercised and benchmarked without an API key:
+
+    uvicorn llm_stub:app --port 8100
+    NEXUS_LLM_BASE_URL=http://localhost:8100/v1 uvicorn main:app
+
+JSON completions are built per prompt template in services/llm/prompts.py,
+recognised by the template's opening line, and cite node IDs found in the
+prompt. Content depends only on the request; latencies and injected errors
+also depend on how many times that request has been seen, so retries of a
+failed call can succeed while a fixed workload stays reproducible.
+
+Configuration (environment):
+    NEXUS_STUB_LATENCY_MS        median time to first token (default 200)
+    NEXUS_STUB_LATENCY_DIST      fixed | uniform | lognormal (default lognormal)
+    NEXUS_STUB_LATENCY_SPREAD    uniform: +/- fraction, lognormal: sigma (default 0.5)
+    NEXUS_STUB_EMBED_LATENCY_MS  median embedding latency (default 60)
+    NEXUS_STUB_TOKENS_PER_SEC    completion token rate, 0 for instant (default 80)
+    NEXUS_STUB_ERROR_429         fraction of requests rejected with 429 (default 0)
+    NEXUS_STUB_ERROR_500         fraction of requests failed with 500 (default 0)
+    NEXUS_STUB_TIMEOUT_RATE      fraction of requests that hang (default 0)
+    NEXUS_STUB_TIMEOUT_SECONDS   how long a hanging request sleeps (default 120)
+    NEXUS_STUB_SEED              seed for content, latencies and errors (default 0)
+"""
+
+import os
+import re
+import json
+import math
+import time
+import base64
+import random
+import asyncio
+import hashlib
+import logging
+from collections import Counter, OrderedDict
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from services.llm import prompts
+from services.llm.tokens import count_tokens
+
+logger = logging.getLogger("nexus.llm_stub")
+
+LATENCY_MS = float(os.getenv("NEXUS_STUB_LATENCY_MS", "200"))
+LATENCY_DIST = os.getenv("NEXUS_STUB_LATENCY_DIST", "lognormal")
+LATENCY_SPREAD = float(os.getenv("NEXUS_STUB_LATENCY_SPREAD", "0.5"))
+EMBED_LATENCY_MS = float(os.getenv("NEXUS_STUB_EMBED_LATENCY_MS", "60"))
+TOKENS_PER_SEC = float(os.getenv("NEXUS_STUB_TOKENS_PER_SEC", "80"))
+ERROR_429 = float(os.getenv("NEXUS_STUB_ERROR_429", "0"))
+ERROR_500 = float(os.getenv("NEXUS_STUB_ERROR_500", "0"))
+TIMEOUT_RATE = float(os.getenv("NEXUS_STUB_TIMEOUT_RATE", "0"))
+TIMEOUT_SECONDS = float(os.getenv("NEXUS_STUB_TIMEOUT_SECONDS", "120"))
+SEED = os.getenv("NEXUS_STUB_SEED", "0")
+
+EMBEDDING_DIMENSIONS = {
+    "text-embedding-3-large": 3072,
+    "text-embedding-3-small": 1536,
+    "text-embedding-ada-002": 1536,
+}
+
+# Prefix caching is simulated the way providers bill it: prompts of at least
+# 1024 tokens are cached in 128-token increments of previously seen prefixes.
+_CACHE_MIN_TOKENS = 1024
+_CACHE_BLOCK_TOKENS = 128
+_CHARS_PER_TOKEN = 4
+_CACHE_MAX_ENTRIES = 200_000
+
+# Attempt counts are kept for the most recently seen requests only; a retry
+# follows its failed attempt closely, so older fingerprints can be forgotten.
+_SEEN_MAX_ENTRIES = 100_000
+
+app = FastAPI(title="NEXUS LLM stub")
+
+_seen_requests: OrderedDict[str, int] = OrderedDict()
+_prefix_cache: set[str] = set()
+_stats: Counter = Counter()
+
+
+# ── Determinism helpers ──────────────────────────────────────────────────────
+
+def _fingerprint(body: dict) -> str:
+    return hashlib.sha256(json.dumps(body, sort_keys=True).encode()).hexdigest()
+
+
+def _attempt(fingerprint: str) -> int:
+    """Count another attempt at a request; 1 the first time it is seen."""
+    attempt = _seen_requests.pop(fingerprint, 0) + 1
+    _seen_requests[fingerprint] = attempt
+    if attempt == 1:
+        _stats["unique_requests"] += 1
+    if len(_seen_requests) > _SEEN_MAX_ENTRIES:
+        _seen_requests.popitem(last=False)
+    return attempt
+
+
+def _rng(*parts) -> random.Random:
+    raw = ":".join(str(p) for p in (SEED,) + parts)
+    return random.Random(int(hashlib.sha256(raw.encode()).hexdigest()[:16], 16))
+
+
+def _sample_latency(rng: random.Random, median_ms: float) -> float:
+    """Sample a latency in seconds from the configured distribution."""
+    if LATENCY_DIST == "fixed" or median_ms <= 0:
+        ms = median_ms
+    elif LATENCY_DIST == "uniform":
+        ms = median_ms * rng.uniform(1 - LATENCY_SPREAD, 1 + LATENCY_SPREAD)
+    else:
+        ms = median_ms * math.exp(rng.gauss(0, LATENCY_SPREAD))
+    return max(ms, 0.0) / 1000
+
+
+def _injected_failure(rng: random.Random) -> str | None:
+    r = rng.random()
+    if r < ERROR_429:
+        return "429"
+    if r < ERROR_429 + ERROR_500:
+        return "500"
+    if r < ERROR_429 + ERROR_500 + TIMEOUT_RATE:
+        return "timeout"
+    return None
+
+
+async def _maybe_fail(rng: random.Random) -> JSONResponse | None:
+    failure = _injected_failure(rng)
+    if failure is None:
+        return None
+    _stats[f"injected_{failure}"] += 1
+    if failure == "timeout":
+        await asyncio.sleep(TIMEOUT_SECONDS)
+        return JSONResponse(status_code=504, content=_error("Upstream timed out", "timeout"))
+    if failure == "429":
+        return JSONResponse(
+            status_code=429,
+            content=_error("Rate limit reached for requests", "rate_limit_exceeded"),
+            headers={"retry-after-ms": "200"},
+        )
+    return JSONResponse(status_code=500, content=_error("The server had an error processing your request", "server_error"))
+
+
+def _error(message: str, code: str) -> dict:
+    return {"error": {"message": message, "type": code, "param": None, "code": code}}
+
+
+def _cached_tokens(model: str, prompt: str) -> int:
+    """Tokens served from the simulated prefix cache; records this prompt's prefixes."""
+    block = _CACHE_BLOCK_TOKENS * _CHARS_PER_TOKEN
+    if len(prompt) < _CACHE_MIN_TOKENS * _CHARS_PER_TOKEN:
+        return 0
+    if len(_prefix_cache) > _CACHE_MAX_ENTRIES:
+        _prefix_cache.clear()
+
+    h = hashlib.sha256(model.encode())
+    cached_chars = 0
+    for end in range(block, len(prompt) + 1, block):
+        h.update(prompt[end - block:end].encode())
+        key = h.hexdigest()
+        if key in _prefix_cache:
+            cached_chars = end
+        else:
+            _prefix_cache.add(key)
+    if cached_chars < _CACHE_MIN_TOKENS * _CHARS_PER_TOKEN:
+        return 0
+    return cached_chars // _CHARS_PER_TOKEN
+
+
+# ── Prompt parsing ───────────────────────────────────────────────────────────
+
+_ID_RE = re.compile(r"\b(?:person|agent|team|decision|fact|commitment|question|topic|info)-[a-z0-9]+(?:-[a-z0-9]+)*\b")
+_NAMED_ID_RE = re.compile(r"([A-Z][\w.'-]*(?: [A-Z][\w.'-]*)*) \(ID: ([\w-]+)")
+
+
+class _PromptFacts:
+    """Node IDs and names mentioned in a prompt, for citing in canned output."""
+
+    def __init__(self, text: str):
+        seen: dict[str, None] = {}
+        for m in _ID_RE.finditer(text):
+            seen.setdefault(m.group(0))
+        self.ids = list(seen)
+        self.names = {nid: name for name, nid in _NAMED_ID_RE.findall(text)}
+
+    def of_type(self, *types: str) -> list[str]:
+        return [i for i in self.ids if i.split("-", 1)[0] in types]
+
+    def pick(self, rng: random.Random, *types: str, k: int = 1) -> list[str]:
+        pool = self.of_type(*types) if types else self.ids
+        if not pool:
+            pool = [f"{types[0] if types else 'fact'}-{rng.randint(1, 20)}"]
+        return rng.sample(pool, min(k, len(pool)))
+
+    def one(self, rng: random.Random, *types: str) -> str:
+        return self.pick(rng, *types)[0]
+
+    def name(self, node_id: str) -> str:
+        return self.names.get(node_id, node_id)
+
+
+_SEVERITIES = ["critical", "warning", "info"]
+_PRIORITIES = ["critical", "high", "medium", "low"]
+_DIVISIONS = ["HQ", "NA", "EMEA", "APAC"]
+_CATEGORIES = ["strategic", "operational", "financial", "technical", "organizational", "external"]
+_EDGE_TYPES = ["AFFECTS", "DEPENDS_ON", "BLOCKS", "ABOUT", "CONTRADICTS", "OWNS"]
+
+_SENTENCES = [
+    "{a} is still acting on context that {b} has since replaced.",
+    "The dependency between {a} and {b} has no owner and is slipping.",
+    "{a} and {b} are solving overlapping problems without talking to each other.",
+    "Resolving this this week avoids an estimated ${n}K in rework.",
+    "{a} should confirm the current position with {b} before the next commitment goes out.",
+    "Load on {a} is above {n}% and the open commitments are concentrated there.",
+    "The latest decision from {a} has not propagated to {b}.",
+    "Escalate to {a} if {b} cannot close this within {n} days.",
+]
+
+
+def _sentence(rng: random.Random, facts: _PromptFacts) -> str:
+    a, b = (facts.pick(rng, k=2) + [facts.one(rng, "person")])[:2]
+    return rng.choice(_SENTENCES).format(a=facts.name(a), b=facts.name(b), n=rng.randint(5, 90))
+
+
+def _paragraph(rng: random.Random, facts: _PromptFacts, sentences: int = 3) -> str:
+    return " ".join(_sentence(rng, facts) for _ in range(sentences))
+
+
+def _headline(rng: random.Random, facts: _PromptFacts, kind: str) -> str:
+    return f"{kind.capitalize()} risk around {facts.name(facts.one(rng, 'decision', 'fact', 'commitment'))}"
+
+
+# ── Canned JSON per prompt template ──────────────────────────────────────────
+
+def _classifier(rng, facts, user):
+    primary, secondary = rng.sample(_CATEGORIES, 2)
+    return {
+        "primary": primary,
+        "secondary": secondary if rng.random() < 0.5 else None,
+        "confidence": round(rng.uniform(0.6, 0.98), 2),
+    }
+
+
+def _entities(rng, facts, user):
+    text = user.split("Text:", 1)[-1].strip()
+    claims = [s.strip() for s in re.split(r"(?<=[.!?])\s+", text) if s.strip()][:4] or [text[:200]]
+    entities = []
+    for person_id in facts.pick(rng, "person", k=2):
+        entities.append({
+            "name": facts.name(person_id), "type": "person", "existing_id": person_id,
+            "division": rng.choice(_DIVISIONS), "content": "", "confidence": round(rng.uniform(0.7, 0.99), 2),
+        })
+    for i, claim in enumerate(claims):
+        entities.append({
+            "name": claim[:60], "type": rng.choice(["fact", "decision", "commitment", "question"]),
+            "existing_id": None, "division": rng.choice(_DIVISIONS), "content": claim,
+            "confidence": round(rng.uniform(0.6, 0.95), 2),
+        })
+    relationships = [
+        {
+            "source_name": entities[-1 - i]["name"], "target_name": entities[i % 2]["name"],
+            "type": rng.choice(["DECIDED_BY", "ASSIGNED_TO", "ABOUT"]),
+            "description": "Stated in the source text.",
+        }
+        for i in range(min(len(claims), 2))
+    ]
+    return {"entities": entities, "relationships": relationships}
+
+
+def _relationships(rng, facts, user):
+    relationships = []
+    for _ in range(rng.randint(1, 3)):
+        source, target = (facts.pick(rng, k=2) * 2)[:2]
+        relationships.append({
+            "source_id": source, "target_id": target, "type": rng.choice(_EDGE_TYPES),
+            "reasoning": _sentence(rng, facts),
+        })
+    contradictions = []
+    if rng.random() < 0.3:
+        existing = facts.one(rng, "fact", "decision")
+        contradictions.append({
+            "new_fact": _sentence(rng, facts), "existing_fact_id": existing,
+            "existing_fact": facts.name(existing), "severity": rng.choice(_SEVERITIES),
+        })
+    return {"relationships": relationships, "contradictions": contradictions}
+
+
+def _info_router(rng, facts, user):
+    routes = []
+    for person_id in facts.pick(rng, "person", k=rng.randint(1, 3)):
+        routes.append({
+            "person_id": person_id, "person_name": facts.name(person_id),
+            "reason": _sentence(rng, facts), "priority": rng.choice(_PRIORITIES),
+            "action_required": rng.random() < 0.5, "suggested_action": _sentence(rng, facts),
+            "personalized_summary": _paragraph(rng, facts, 2),
+        })
+    return {"routes": routes}
+
+
+def _task_scheduler(rng, facts, user):
+    count = rng.randint(3, 6)
+    task_ids = [f"task-{i + 1:03d}" for i in range(count)]
+    tasks = []
+    for i, task_id in enumerate(task_ids):
+        owner = facts.one(rng, "person", "agent")
+        tasks.append({
+            "id": task_id, "title": f"Resolve {facts.name(facts.one(rng, 'decision', 'fact', 'question'))}",
+            "description": _paragraph(rng, facts, 2), "assigned_to": owner,
+            "assigned_to_name": facts.name(owner), "assignment_reason": _sentence(rng, facts),
+            "type": "ai" if owner.startswith("agent") else "human",
+            "priority": rng.choice(_PRIORITIES), "estimated_hours": rng.randint(1, 16),
+            "blocks": task_ids[i + 1:i + 2], "blocked_by": task_ids[i - 1:i] if i else [],
+            "deadline_suggestion": None,
+        })
+    return {
+        "tasks": tasks,
+        "critical_path": task_ids,
+        "parallelization_groups": [{"tasks": task_ids[:1], "reason": "No upstream dependencies."}],
+    }
+
+
+def _worker_tracker(rng, facts, user):
+    def pair():
+        return (facts.pick(rng, "person", "agent", k=2) * 2)[:2]
+
+    out = {key: [] for key in (
+        "conflicts", "duplicates", "overloads", "reallocation_suggestions", "collaboration_recommendations",
+    )}
+    for _ in range(rng.randint(0, 2)):
+        a, b = pair()
+        out["conflicts"].append({"worker_a": a, "worker_b": b, "issue": _sentence(rng, facts), "severity": rng.choice(_SEVERITIES[:2])})
+    for _ in range(rng.randint(0, 1)):
+        a, b = pair()
+        out["duplicates"].append({"worker_a": a, "worker_b": b, "overlap": _sentence(rng, facts), "wasted_effort": f"{rng.randint(5, 80)} hours"})
+    for worker in facts.pick(rng, "person", k=rng.randint(0, 2)):
+        out["overloads"].append({"worker_id": worker, "load": rng.randint(80, 98), "suggestion": facts.name(facts.one(rng, "person"))})
+    for _ in range(rng.randint(0, 2)):
+        a, b = pair()
+        out["reallocation_suggestions"].append({"task": _sentence(rng, facts), "current_owner": a, "suggested_owner": b, "reason": _sentence(rng, facts)})
+    for _ in range(rng.randint(1, 2)):
+        a, b = pair()
+        out["collaboration_recommendations"].append({"person_a": a, "person_b": b, "reason": _sentence(rng, facts)})
+    return out
+
+
+def _immune(agent: str):
+    def build(rng, facts, user):
+        findings = []
+        for _ in range(rng.randint(1, 3)):
+            affected = facts.pick(rng, k=rng.randint(2, 4))
+            finding = {
+                "detected": True, "severity": rng.choice(_SEVERITIES),
+                "headline": _headline(rng, facts, agent), "detail": _paragraph(rng, facts),
+                "affected_node_ids": affected, "recommended_action": _sentence(rng, facts),
+            }
+            if agent == "contradiction":
+                a, b = (facts.pick(rng, "fact", "decision", k=2) * 2)[:2]
+                finding.update(node_a_id=a, node_b_id=b, estimated_cost=f"${rng.randint(10, 500)}K",
+                               resolver_id=facts.one(rng, "person"))
+            elif agent == "staleness":
+                finding.update(stale_node_id=facts.one(rng, "fact", "decision"),
+                               freshness_score=round(rng.uniform(0.05, 0.4), 2))
+            elif agent == "silo":
+                finding.update(group_a_ids=facts.pick(rng, "person", "team", k=2),
+                               group_b_ids=facts.pick(rng, "person", "team", k=2),
+                               overlap_description=_sentence(rng, facts),
+                               estimated_cost=f"${rng.randint(10, 500)}K")
+            elif agent == "overload":
+                finding.update(overloaded_node_id=facts.one(rng, "person"),
+                               cognitive_load=rng.randint(80, 98), active_commitments=rng.randint(5, 12))
+            elif agent == "coordination":
+                finding.update(agent_id=facts.one(rng, "agent"), supervisor_id=facts.one(rng, "person"))
+            elif agent == "drift":
+                finding.update(drifting_node_id=facts.one(rng, "agent", "person"),
+                               outdated_context_id=facts.one(rng, "decision", "fact"),
+                               current_truth_id=facts.one(rng, "decision", "fact"))
+            findings.append(finding)
+        return {"findings": findings}
+    build.__name__ = f"_immune_{agent}"
+    return build
+
+
+def _ask(rng, facts, user):
+    cited = facts.pick(rng, k=rng.randint(2, 5))
+    return {
+        "answer": "\n\n".join(_paragraph(rng, facts) for _ in range(rng.randint(2, 3))),
+        "citations": [{"node_id": nid, "label": facts.name(nid), "relevance": _sentence(rng, facts)} for nid in cited],
+        "items": [{
+            "type": rng.choice(["contradiction", "staleness", "silo", "overload", "drift", "answer"]),
+            "headline": _headline(rng, facts, "open"), "detail": _sentence(rng, facts),
+            "division": rng.choice(_DIVISIONS), "affected_node_ids": cited,
+            "actions": [{"label": "View in graph", "route": "/graph"}],
+        }],
+        "highlight_node_ids": cited,
+        "suggested_followups": [f"What is blocking {facts.name(nid)}?" for nid in cited[:3]],
+    }
+
+
+def _onboarding(rng, facts, user):
+    titles = re.findall(r'"title": "([^"]+)"', prompts.ONBOARDING_GENERATOR)
+    return {
+        "steps": [{"title": t, "content": _paragraph(rng, facts, 4)} for t in titles],
+        "time_to_context_minutes": rng.randint(15, 45),
+    }
+
+
+def _infodrop(rng, facts, user):
+    return {
+        "type": rng.choice(["fact", "decision", "commitment", "question"]),
+        "content": " ".join(user.split())[:500],
+        "division": rng.choice(_DIVISIONS),
+        "related_node_ids": facts.pick(rng, "decision", "fact", "commitment", k=2),
+        "contradiction_detected": False,
+        "contradiction_detail": "",
+        "route_to": facts.pick(rng, "person", k=2),
+        "confidence": round(rng.uniform(0.6, 0.95), 2),
+    }
+
+
+def _default_json(rng, facts, user):
+    return {"answer": _paragraph(rng, facts)}
+
+
+def _marker(template: str) -> str:
+    """First line of a template without format fields, used to recognise it."""
+    return next(line for line in template.splitlines() if line.strip() and "{" not in line)
+
+
+_TEMPLATES = [(_marker(prompts.IMMUNE_AGENTS[name]), _immune(name)) for name in prompts.IMMUNE_AGENTS] + [
+    (_marker(prompts.TASK_SCHEDULER), _task_scheduler),
+    (_marker(prompts.WORKER_TRACKER), _worker_tracker),
+    (_marker(prompts.INFO_ROUTER), _info_router),
+    (_marker(prompts.INFODROP_CLASSIFIER), _infodrop),
+    (_marker(prompts.CLASSIFIER), _classifier),
+    (_marker(prompts.ENTITY_EXTRACTOR), _entities),
+    (_marker(prompts.RELATIONSHIP_EXTRACTOR), _relationships),
+    (_marker(prompts.ONBOARDING_GENERATOR), _onboarding),
+    (_marker(prompts.ASK_NEXUS_STRUCTURED), _ask),
+    (_marker(prompts.ASK_NEXUS), _ask),
+]
+
+
+def _completion_text(body: dict) -> str:
+    messages = body.get("messages", [])
+    system = "\n".join(m.get("content") or "" for m in messages if m.get("role") == "system")
+    user = "\n".join(m.get("content") or "" for m in messages if m.get("role") != "system")
+    rng = _rng("content", _fingerprint(body))
+    facts = _PromptFacts(system + "\n" + user)
+
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        builder = next((b for marker, b in _TEMPLATES if marker in system), _default_json)
+        _stats[f"template_{builder.__name__}"] += 1
+        return json.dumps(builder(rng, facts, user), indent=2)
+
+    _stats["template_text"] += 1
+    return "\n\n".join(_paragraph(rng, facts, rng.randint(2, 3)) for _ in range(rng.randint(2, 4)))
+
+
+# ── Endpoints ────────────────────────────────────────────────────────────────
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    fingerprint = _fingerprint(body)
+    attempt_rng = _rng("attempt", fingerprint, _attempt(fingerprint))
+    _stats["chat_requests"] += 1
+
+    failure = await _maybe_fail(attempt_rng)
+    if failure is not None:
+        return failure
+
+    model = body.get("model", "gpt-4o")
+    messages = body.get("messages", [])
+    prompt = "".join(f"{m.get('role')}:{m.get('content') or ''}\n" for m in messages)
+    prompt_tokens = count_tokens(prompt, model) + 3 * len(messages)
+    cached = min(_cached_tokens(model, prompt), prompt_tokens)
+
+    text = _completion_text(body)
+    finish_reason = "stop"
+    max_tokens = body.get("max_completion_tokens") or body.get("max_tokens")
+    if max_tokens and count_tokens(text, model) > max_tokens:
+        text = text[: max_tokens * _CHARS_PER_TOKEN]
+        finish_reason = "length"
+    completion_tokens = count_tokens(text, model)
+
+    usage = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": cached},
+    }
+    ttft = _sample_latency(attempt_rng, LATENCY_MS)
+    completion_id = f"chatcmpl-stub{fingerprint[:20]}"
+    created = int(time.time())
+
+    if body.get("stream"):
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+        return StreamingResponse(
+            _stream_chunks(completion_id, created, model, text, finish_reason, ttft, usage if include_usage else None),
+            media_type="text/event-stream",
+        )
+
+    generation = completion_tokens / TOKENS_PER_SEC if TOKENS_PER_SEC > 0 else 0
+    await asyncio.sleep(ttft + generation)
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": created,
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": text},
+            "finish_reason": finish_reason,
+        }],
+        "usage": usage,
+    }
+
+
+async def _stream_chunks(completion_id, created, model, text, finish_reason, ttft, usage):
+    """Emit chat.completion.chunk events paced at the configured token rate."""
+
+    def chunk(delta: dict, finish: str | None = None, with_usage: dict | None = None) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [] if with_usage else [{"index": 0, "delta": delta, "finish_reason": finish}],
+        }
+        if with_usage:
+            payload["usage"] = with_usage
+        return f"data: {json.dumps(payload)}\n\n"
+
+    await asyncio.sleep(ttft)
+    yield chunk({"role": "assistant", "content": ""})
+
+    # One token is roughly four characters; batch tokens so each sleep is >= 10ms
+    per_token = 1 / TOKENS_PER_SEC if TOKENS_PER_SEC > 0 else 0
+    tokens_per_chunk = max(1, math.ceil(0.01 / per_token)) if per_token else 64
+    step = tokens_per_chunk * _CHARS_PER_TOKEN
+    for i in range(0, len(text), step):
+        if per_token:
+            await asyncio.sleep(per_token * tokens_per_chunk)
+        yield chunk({"content": text[i:i + step]})
+
+    yield chunk({}, finish_reason)
+    if usage:
+        yield chunk({}, with_usage=usage)
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    fingerprint = _fingerprint(body)
+    attempt_rng = _rng("attempt", fingerprint, _attempt(fingerprint))
+    _stats["embedding_requests"] += 1
+
+    failure = await _maybe_fail(attempt_rng)
+    if failure is not None:
+        return failure
+
+    model = body.get("model", "text-embedding-3-large")
+    inputs = body.get("input", [])
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    dimensions = body.get("dimensions") or EMBEDDING_DIMENSIONS.get(model, 1536)
+    as_base64 = body.get("encoding_format") == "base64"
+
+    data = []
+    for i, text in enumerate(inputs):
+        vec = _embed_text(str(text), dimensions)
+        embedding = base64.b64encode(vec.astype("<f4").tobytes()).decode() if as_base64 else vec.tolist()
+        data.append({"object": "embedding", "index": i, "embedding": embedding})
+
+    tokens = sum(count_tokens(str(t), model) for t in inputs)
+    await asyncio.sleep(_sample_latency(attempt_rng, EMBED_LATENCY_MS))
+    return {
+        "object": "list",
+        "data": data,
+        "model": model,
+        "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+    }
+
+
+def _embed_text(text: str, dimensions: int) -> np.ndarray:
+    """Hashed bag-of-words vector: texts sharing words get similar embeddings."""
+    vec = np.zeros(dimensions, dtype=np.float32)
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        digest = hashlib.blake2b(word.encode(), digest_size=8).digest()
+        h = int.from_bytes(digest, "little")
+        vec[h % dimensions] += 1.0 if (h >> 63) & 1 else -1.0
+    norm = np.linalg.norm(vec)
+    if norm == 0:
+        vec = np.random.default_rng(len(text)).standard_normal(dimensions).astype(np.float32)
+        norm = np.linalg.norm(vec)
+    return vec / norm
+
+
+@app.get("/v1/models")
+async def list_models():
+    models = ["gpt-4o", "gpt-4o-mini", "gpt-5.2", *EMBEDDING_DIMENSIONS]
+    return {"object": "list", "data": [{"id": m, "object": "model", "owned_by": "nexus-stub"} for m in models]}
+
+
+@app.get("/stats")
+async def stats():
+    """Request counts, injected failures and template hits since startup."""
+    return {
+        **dict(_stats),
+        "prefix_cache_entries": len(_prefix_cache),
+    }
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=int(os.getenv("NEXUS_STUB_PORT", "8100")))
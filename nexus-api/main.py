@@ -1,8 +1,10 @@
 import os
+import asyncio
 import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,7 +16,7 @@ DEMO_MODE = os.getenv("NEXUS_DEMO_MODE", "true").lower() == "true"
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Startup: verify Supabase connection and build embedding index."""
+    """Startup: verify Supabase connection and build embedding index. Shutdown: flush write-behind buffers."""
     # Verify Supabase connection
     from services.supabase_client import is_supabase_configured
     if is_supabase_configured():
@@ -29,7 +31,8 @@ async def lifespan(app: FastAPI):
         logging.info("Supabase not configured — using in-memory/JSON fallback")
 
     # Build embedding index
-    if os.getenv("OPENAI_API_KEY"):
+    from services.llm import is_llm_configured
+    if is_llm_configured():
         try:
             from services.llm.embeddings import get_embedding_service
             emb = get_embedding_service()
@@ -39,6 +42,12 @@ async def lifespan(app: FastAPI):
             logging.warning(f"Could not build embedding index on startup: {e}")
     yield
 
+    # Persist any usage and conversation messages still buffered by the write-behind paths
+    from services.llm.client import get_llm_client
+    get_llm_client().usage.flush()
+    from services.conversation_store import get_conversation_store
+    get_conversation_store().flush()
+
 
 app = FastAPI(title="NEXUS API", version="3.0.0", lifespan=lifespan)
 
@@ -73,7 +82,8 @@ app.include_router(routing.router)
 
 @app.get("/")
 async def root():
-    llm_status = "configured" if os.getenv("OPENAI_API_KEY") else "not configured"
+    from services.llm import is_llm_configured
+    llm_status = "configured" if is_llm_configured() else "not configured"
     from services.supabase_client import is_supabase_configured
     db_status = "connected" if is_supabase_configured() else "not configured"
     return {
@@ -88,12 +98,54 @@ async def root():
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """LLM, graph store and storage metrics in Prometheus text format."""
+    from services import metrics
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/llm/metrics")
+async def llm_metrics():
+    """Per-task latency percentiles, TTFT and cache hit ratios for SLO review."""
+    from services import metrics
+    return metrics.llm_snapshot()
+
+
+@app.get("/api/llm/routing")
+async def llm_routing():
+    """Adaptive model routing state: heavy-model pressure and which tasks are downgraded."""
+    from services.llm.router import get_model_router
+    return get_model_router().status()
+
+
 @app.get("/api/llm/usage")
-async def llm_usage():
-    """Get LLM token usage and cost summary."""
+async def llm_usage(window: str | None = None):
+    """Get LLM token usage and cost summary, optionally for a trailing window (15m, 24h, 7d)."""
     try:
         from services.llm.client import get_llm_client
         client = get_llm_client()
-        return client.usage.get_summary()
+        # Flushes pending usage and reads Supabase; keep both off the event loop
+        return await asyncio.to_thread(client.usage.get_summary, window)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception:
         return {"total_calls": 0, "total_cost_usd": 0, "message": "LLM client not initialized"}
+
+
+@app.get("/api/llm/usage/timeseries")
+async def llm_usage_timeseries(granularity: str = "hour", window: str = "24h"):
+    """Get LLM usage per time bucket for charting."""
+    from services.llm.client import get_llm_client
+    try:
+        buckets = await asyncio.to_thread(get_llm_client().usage.get_timeseries, granularity, window)
+        return {"granularity": granularity, "buckets": buckets}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/llm/usage/recent")
+async def llm_usage_recent(limit: int = 50):
+    """Get the most recent LLM calls."""
+    from services.llm.client import get_llm_client
+    return {"calls": get_llm_client().usage.get_recent(limit)}
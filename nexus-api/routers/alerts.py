@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException
-from services.graph_store import load_alerts
+from services.graph_store import load_alerts, mark_changed
 
 router = APIRouter(prefix="/api")
 
@@ -26,6 +26,7 @@ async def resolve_alert(alert_id: str):
 
     _resolved_ids.add(alert_id)
     alert["resolved"] = True
+    mark_changed("alerts")
 
     return {
         "alert": alert,
@@ -1,7 +1,10 @@
 import os
 import json
+import time
+import asyncio
 import logging
-from fastapi import APIRouter
+from contextlib import aclosing
+from fastapi import APIRouter, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from services.graph_store import load_graph, load_ask_cache
@@ -10,27 +13,41 @@ from services.rag import query_with_rag
 router = APIRouter(prefix="/api")
 logger = logging.getLogger("nexus.ask")
 
+# Streamed tokens are sent in slices of at most this many milliseconds
+SSE_COALESCE_MS = float(os.getenv("NEXUS_SSE_COALESCE_MS", "40"))
+# An SSE comment is sent after this much silence, so proxies keep the connection open
+SSE_HEARTBEAT_SECONDS = float(os.getenv("NEXUS_SSE_HEARTBEAT_SECONDS", "15"))
+
 
 class AskRequest(BaseModel):
     query: str
     stream: bool = False
     conversation_id: str | None = None
+    # Optional retrieval pre-filters, e.g. divisions=["EMEA"]
+    divisions: list[str] | None = None
+    types: list[str] | None = None
+    statuses: list[str] | None = None
 
 
 @router.post("/ask")
-async def ask_nexus(request: AskRequest):
-    # Try LLM-powered RAG if OpenAI key is configured
-    if os.getenv("OPENAI_API_KEY"):
+async def ask_nexus(request: AskRequest, http_request: Request):
+    # Try LLM-powered RAG if an LLM endpoint is configured
+    from services.llm import is_llm_configured
+    if is_llm_configured():
         try:
+            from services.retrieval import SearchFilters
+            filters = SearchFilters.of(request.divisions, request.types, request.statuses)
             if request.stream:
                 return StreamingResponse(
-                    _stream_ask(request.query),
+                    _stream_ask(request.query, filters, http_request),
                     media_type="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
                 )
             from services.rag_v2 import query_rag
             result = await query_rag(
                 request.query,
                 conversation_id=request.conversation_id,
+                filters=filters,
             )
             logger.info(f"[Ask] LLM RAG response for: {request.query[:50]}")
             return result
@@ -43,12 +60,82 @@ async def ask_nexus(request: AskRequest):
     return await query_with_rag(request.query, graph, cache)
 
 
-async def _stream_ask(query: str):
-    """SSE stream for Ask NEXUS."""
+def _sse(event: dict) -> str:
+    from services import metrics
+    metrics.ASK_STREAM_FRAMES.inc(type=event["type"])
+    return f"data: {json.dumps(event, default=str)}\n\n"
+
+
+async def _stream_ask(query: str, filters=None, http_request: Request | None = None):
+    """Progressive SSE for Ask NEXUS.
+
+    Events, in order: retrieval (ranked nodes, as soon as search finishes),
+    token (model text, coalesced into NEXUS_SSE_COALESCE_MS slices),
+    citations, result (the whole answer), done; or error. Idle gaps get a
+    heartbeat comment. When the client disconnects the pipeline task is
+    cancelled, which closes the upstream LLM stream.
+    """
+    from services import metrics
+    from services.rag_v2 import query_rag_stream
+
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    events: asyncio.Queue = asyncio.Queue()
+    finished = object()
+
+    async def pump():
+        try:
+            # aclosing() tears the upstream LLM stream down when this task is cancelled
+            async with aclosing(query_rag_stream(query, filters)) as stream:
+                async for event in stream:
+                    events.put_nowait(event)
+        except Exception as e:
+            events.put_nowait({"type": "error", "content": str(e)})
+        events.put_nowait(finished)
+
+    task = asyncio.create_task(pump())
+    pending: list[str] = []
+    flush_at = 0.0
+    last_sent = loop.time()
+    first_token = True
     try:
-        from services.rag_v2 import query_rag_stream
-        async for token in query_rag_stream(query):
-            yield f"data: {json.dumps({'type': 'token', 'content': token})}\n\n"
-        yield f"data: {json.dumps({'type': 'done'})}\n\n"
-    except Exception as e:
-        yield f"data: {json.dumps({'type': 'error', 'content': str(e)})}\n\n"
+        while True:
+            deadline = flush_at if pending else last_sent + SSE_HEARTBEAT_SECONDS
+            try:
+                event = await asyncio.wait_for(events.get(), max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                if http_request is not None and await http_request.is_disconnected():
+                    logger.info(f"[Ask] Client disconnected, cancelling stream for: {query[:50]}")
+                    return
+                if pending:
+                    yield _sse({"type": "token", "content": "".join(pending)})
+                    pending.clear()
+                else:
+                    yield ": heartbeat\n\n"
+                last_sent = loop.time()
+                continue
+
+            if event is finished:
+                break
+            if event["type"] == "token":
+                if first_token:
+                    metrics.ASK_STREAM_FIRST_EVENT_SECONDS.observe(time.perf_counter() - started, event="token")
+                    first_token = False
+                if not pending:
+                    flush_at = loop.time() + SSE_COALESCE_MS / 1000
+                pending.append(event["content"])
+                continue
+
+            if pending:
+                yield _sse({"type": "token", "content": "".join(pending)})
+                pending.clear()
+            if event["type"] == "retrieval":
+                metrics.ASK_STREAM_FIRST_EVENT_SECONDS.observe(time.perf_counter() - started, event="retrieval")
+            yield _sse(event)
+            last_sent = loop.time()
+            if event["type"] == "error":
+                return
+
+        yield _sse({"type": "done"})
+    finally:
+        task.cancel()
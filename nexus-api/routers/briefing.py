@@ -4,6 +4,7 @@ from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import json
+from contextlib import aclosing
 
 router = APIRouter(prefix="/api/briefing", tags=["briefing"])
 
@@ -37,8 +38,9 @@ async def _stream_briefing(person_id: str):
     """SSE stream for briefing generation."""
     try:
         from services.briefing_generator import generate_briefing_stream
-        async for token in generate_briefing_stream(person_id):
-            yield f"data: {json.dumps({'type': 'token', 'content': token})}\n\n"
+        async with aclosing(generate_briefing_stream(person_id)) as tokens:
+            async for token in tokens:
+                yield f"data: {json.dumps({'type': 'token', 'content': token})}\n\n"
         yield f"data: {json.dumps({'type': 'done'})}\n\n"
     except Exception as e:
         yield f"data: {json.dumps({'type': 'error', 'content': str(e)})}\n\n"
@@ -1,13 +1,22 @@
 """LLM-powered immune system scan endpoints."""
 
+import json
+from contextlib import aclosing
+
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 
 router = APIRouter(prefix="/api/immune", tags=["immune"])
 
 
 @router.post("/scan")
-async def full_scan():
-    """Run all 6 immune system agents in parallel using LLM reasoning."""
+async def full_scan(stream: bool = False):
+    """Run all 6 immune system agents in parallel using LLM reasoning.
+
+    With ?stream=true, alerts are sent over SSE as each finding is generated.
+    """
+    if stream:
+        return StreamingResponse(_stream_scan(), media_type="text/event-stream")
     try:
         from services.immune_llm import run_full_scan
         return await run_full_scan()
@@ -15,6 +24,17 @@ async def full_scan():
         raise HTTPException(status_code=503, detail=str(e))
 
 
+async def _stream_scan():
+    """SSE stream of immune scan events."""
+    try:
+        from services.immune_llm import run_full_scan_stream
+        async with aclosing(run_full_scan_stream()) as events:
+            async for event in events:
+                yield f"data: {json.dumps(event, default=str)}\n\n"
+    except Exception as e:
+        yield f"data: {json.dumps({'type': 'error', 'content': str(e)})}\n\n"
+
+
 @router.post("/scan/{agent_name}")
 async def single_scan(agent_name: str):
     """Run a single immune system agent."""
@@ -1,4 +1,3 @@
-import os
 import uuid
 import logging
 from datetime import datetime, timezone
@@ -18,8 +17,9 @@ class InfoRequest(BaseModel):
 async def info_drop(request: InfoRequest):
     text = request.text.strip()
 
-    # Try LLM-powered InfoDrop if OpenAI key is configured
-    if os.getenv("OPENAI_API_KEY"):
+    # Try LLM-powered InfoDrop if an LLM endpoint is configured
+    from services.llm import is_llm_configured
+    if is_llm_configured():
         try:
             from services.infodrop_v2 import process_infodrop
             result = await process_infodrop(text)
@@ -47,29 +47,29 @@ async def info_drop(request: InfoRequest):
         "size": 30,
     }
 
-    keywords = set(text.lower().split())
-    related_nodes = []
-    new_edges = []
-
-    for node in graph.get("nodes", []):
-        label_words = set(node.get("label", "").lower().split())
-        content_words = set(node.get("content", "").lower().split()) if node.get("content") else set()
-        overlap = keywords & (label_words | content_words)
-        if len(overlap) >= 2:
-            related_nodes.append(node)
-            new_edges.append({
-                "id": f"edge-info-{uuid.uuid4().hex[:6]}",
-                "source": new_id,
-                "target": node["id"],
-                "type": "ABOUT",
-                "weight": min(len(overlap) / 5, 1.0),
-                "interaction_type": "human-human",
-            })
+    # Nodes sharing at least two terms with the drop, most relevant first
+    from services.lexical_index import get_node_index
+    hits = get_node_index().search(text, top_k=10, min_match=2)
+    scores = dict(hits)
+    nodes_by_id = {node["id"]: node for node in graph.get("nodes", []) if node["id"] in scores}
+    related_nodes = [nodes_by_id[node_id] for node_id, _ in hits if node_id in nodes_by_id]
+    new_edges = [
+        {
+            "id": f"edge-info-{uuid.uuid4().hex[:6]}",
+            "source": new_id,
+            "target": node_id,
+            "type": "ABOUT",
+            "weight": round(score / hits[0][1], 3),
+            "interaction_type": "human-human",
+        }
+        for node_id, score in hits
+        if node_id in nodes_by_id
+    ]
 
     ripple_target = related_nodes[0]["id"] if related_nodes else ""
 
     return {
         "unit": unit,
-        "new_edges": new_edges[:10],
+        "new_edges": new_edges,
         "ripple_target": ripple_target,
     }
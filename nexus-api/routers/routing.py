@@ -1,6 +1,10 @@
 """Information routing endpoints."""
 
-from fastapi import APIRouter
+import json
+from contextlib import aclosing
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/api/routing", tags=["routing"])
@@ -20,6 +24,45 @@ async def routing_history(unit_id: str | None = None):
     return {"history": get_routing_history(unit_id)}
 
 
+class RouteRequest(BaseModel):
+    knowledge_unit: dict
+    source_context: str = ""
+    stream: bool = False
+    # "heavy", "fast" or an allowed model name; skips adaptive downgrading
+    model: str | None = None
+
+
+@router.post("/route")
+async def route(req: RouteRequest):
+    """Route a knowledge unit to the people who need to know about it."""
+    from services.llm.router import check_override
+    try:
+        check_override(req.model)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if req.stream:
+        return StreamingResponse(
+            _stream_route(req.knowledge_unit, req.source_context, req.model),
+            media_type="text/event-stream",
+        )
+    try:
+        from services.info_router import route_information
+        return await route_information(req.knowledge_unit, req.source_context, model=req.model)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+async def _stream_route(knowledge_unit: dict, source_context: str, model: str | None = None):
+    """SSE stream of routes as they are generated."""
+    try:
+        from services.info_router import route_information_stream
+        async with aclosing(route_information_stream(knowledge_unit, source_context, model=model)) as events:
+            async for event in events:
+                yield f"data: {json.dumps(event, default=str)}\n\n"
+    except Exception as e:
+        yield f"data: {json.dumps({'type': 'error', 'content': str(e)})}\n\n"
+
+
 class AckRequest(BaseModel):
     person_id: str
     source_unit: str
@@ -13,11 +13,16 @@ async def worker_status():
 
 
 @router.post("/analyze")
-async def analyze():
-    """Run full worker analysis via LLM."""
+async def analyze(model: str | None = None):
+    """Run full worker analysis via LLM. model ("heavy", "fast" or an allowed name) overrides adaptive routing."""
+    from services.llm.router import check_override
+    try:
+        check_override(model)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     try:
         from services.worker_tracker import analyze_workers
-        return await analyze_workers()
+        return await analyze_workers(model=model)
     except RuntimeError as e:
         raise HTTPException(status_code=503, detail=str(e))
 
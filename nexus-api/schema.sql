@@ -57,13 +57,45 @@ CREATE TABLE IF NOT EXISTS graph_metadata (
 );
 
 -- ── NODE EMBEDDINGS (pgvector) ────────────────────────
+-- Sized for text-embedding-3-large (3072). For another NEXUS_EMBEDDING_MODEL
+-- or NEXUS_EMBEDDING_DIMENSIONS, run the SQL from
+-- `python migrate.py --print-schema` instead, which is sized to match.
 CREATE TABLE IF NOT EXISTS node_embeddings (
   node_id       TEXT PRIMARY KEY REFERENCES nodes(id) ON DELETE CASCADE,
   text_content  TEXT NOT NULL,
   embedding     vector(3072),
   model         TEXT NOT NULL DEFAULT 'text-embedding-3-large',
+  content_hash  TEXT,
   created_at    TIMESTAMPTZ DEFAULT now()
 );
+-- Added after the initial release (no-op on fresh installs)
+ALTER TABLE node_embeddings ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+-- A table made for another size is emptied and resized: vectors of
+-- different sizes are not comparable, and the API re-embeds on startup.
+DO $$
+BEGIN
+  IF (SELECT atttypmod FROM pg_attribute
+      WHERE attrelid = 'node_embeddings'::regclass AND attname = 'embedding') <> 3072 THEN
+    DROP INDEX IF EXISTS idx_node_embeddings_hnsw;
+    DELETE FROM node_embeddings;
+    ALTER TABLE node_embeddings ALTER COLUMN embedding TYPE vector(3072);
+  END IF;
+END $$;
+
+-- pgvector cannot index vector columns over 2000 dimensions, but halfvec
+-- goes to 4000, so the HNSW index is built on a half-precision cast.
+CREATE INDEX IF NOT EXISTS idx_node_embeddings_hnsw ON node_embeddings
+  USING hnsw ((embedding::halfvec(3072)) halfvec_cosine_ops)
+  WITH (m = 16, ef_construction = 64);
+
+-- The API checks this against the size of its embeddings at startup
+CREATE OR REPLACE FUNCTION node_embedding_dimensions()
+RETURNS INT
+LANGUAGE sql STABLE AS $$
+  SELECT atttypmod FROM pg_attribute
+  WHERE attrelid = 'node_embeddings'::regclass AND attname = 'embedding';
+$$;
 
 -- ── MUTATION HISTORY ──────────────────────────────────
 CREATE TABLE IF NOT EXISTS mutation_history (
@@ -139,6 +171,7 @@ CREATE TABLE IF NOT EXISTS llm_usage (
   id            BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
   model         TEXT NOT NULL,
   input_tokens  INTEGER NOT NULL,
+  cached_tokens INTEGER NOT NULL DEFAULT 0,
   output_tokens INTEGER NOT NULL,
   cost_usd      FLOAT NOT NULL,
   task_type     TEXT NOT NULL,
@@ -148,6 +181,25 @@ CREATE TABLE IF NOT EXISTS llm_usage (
 CREATE INDEX IF NOT EXISTS idx_usage_model ON llm_usage(model);
 CREATE INDEX IF NOT EXISTS idx_usage_task ON llm_usage(task_type);
 
+-- Columns added after the initial release (no-ops on fresh installs)
+ALTER TABLE llm_usage ADD COLUMN IF NOT EXISTS cached_tokens INTEGER NOT NULL DEFAULT 0;
+
+-- ── LLM USAGE ROLLUPS ─────────────────────────────────
+-- Pre-aggregated usage per minute/hour/day bucket, incremented in batches
+-- by the API so summaries never scan llm_usage.
+CREATE TABLE IF NOT EXISTS llm_usage_rollups (
+  granularity   TEXT NOT NULL,
+  bucket_start  TIMESTAMPTZ NOT NULL,
+  model         TEXT NOT NULL,
+  task_type     TEXT NOT NULL,
+  calls         BIGINT NOT NULL DEFAULT 0,
+  input_tokens  BIGINT NOT NULL DEFAULT 0,
+  cached_tokens BIGINT NOT NULL DEFAULT 0,
+  output_tokens BIGINT NOT NULL DEFAULT 0,
+  cost_usd      FLOAT NOT NULL DEFAULT 0,
+  PRIMARY KEY (granularity, bucket_start, model, task_type)
+);
+
 -- ── CONVERSATIONS ─────────────────────────────────────
 CREATE TABLE IF NOT EXISTS conversations (
   id            TEXT PRIMARY KEY,
@@ -164,6 +216,8 @@ CREATE TABLE IF NOT EXISTS conversation_messages (
 );
 
 CREATE INDEX IF NOT EXISTS idx_conv_msgs_conv ON conversation_messages(conversation_id);
+-- Serves "latest N messages of a conversation"
+CREATE INDEX IF NOT EXISTS idx_conv_msgs_conv_time ON conversation_messages(conversation_id, created_at DESC);
 
 -- ── WORKER ANALYSES ───────────────────────────────────
 CREATE TABLE IF NOT EXISTS worker_analyses (
@@ -178,26 +232,155 @@ CREATE TABLE IF NOT EXISTS ask_cache (
   response      JSONB NOT NULL,
   created_at    TIMESTAMPTZ DEFAULT now()
 );
+-- Set for LLM answers: fingerprints of the cited nodes, checked on every hit
+ALTER TABLE ask_cache ADD COLUMN IF NOT EXISTS cited_fingerprints JSONB;
+ALTER TABLE ask_cache ADD COLUMN IF NOT EXISTS compute_ms INTEGER;
 
 -- ── VECTOR SEARCH FUNCTION ────────────────────────────
+-- Earlier versions took no filters; drop them so named-argument calls stay unambiguous
+DROP FUNCTION IF EXISTS search_similar_nodes_packed(TEXT, INT, FLOAT);
+DROP FUNCTION IF EXISTS search_similar_nodes(vector, INT, FLOAT);
+
+-- NULL filters match everything; otherwise a node's division, type and
+-- status must each be in the given list.
 CREATE OR REPLACE FUNCTION search_similar_nodes(
   query_embedding vector(3072),
   match_count INT DEFAULT 20,
-  similarity_threshold FLOAT DEFAULT 0.0
+  similarity_threshold FLOAT DEFAULT 0.0,
+  filter_divisions TEXT[] DEFAULT NULL,
+  filter_types TEXT[] DEFAULT NULL,
+  filter_statuses TEXT[] DEFAULT NULL
 )
 RETURNS TABLE (node_id TEXT, similarity FLOAT)
 LANGUAGE plpgsql AS $$
 BEGIN
+  -- HNSW returns at most ef_search rows, so keep it above match_count
+  PERFORM set_config('hnsw.ef_search', GREATEST(40, match_count * 2)::TEXT, true);
+  IF filter_divisions IS NOT NULL OR filter_types IS NOT NULL OR filter_statuses IS NOT NULL THEN
+    -- pgvector >= 0.8 keeps walking the graph until enough rows pass the filters
+    BEGIN
+      PERFORM set_config('hnsw.iterative_scan', 'relaxed_order', true);
+    EXCEPTION WHEN OTHERS THEN
+      NULL;
+    END;
+  END IF;
   RETURN QUERY
-  SELECT ne.node_id, (1 - (ne.embedding <=> query_embedding))::FLOAT AS similarity
-  FROM node_embeddings ne
-  WHERE ne.embedding IS NOT NULL
-    AND (1 - (ne.embedding <=> query_embedding)) > similarity_threshold
-  ORDER BY ne.embedding <=> query_embedding
-  LIMIT match_count;
+  WITH candidates AS (
+    -- Ordered by the halfvec expression so idx_node_embeddings_hnsw is used
+    SELECT ne.node_id, ne.embedding
+    FROM node_embeddings ne
+    JOIN nodes n ON n.id = ne.node_id
+    WHERE ne.embedding IS NOT NULL
+      AND (filter_divisions IS NULL OR n.division = ANY(filter_divisions))
+      AND (filter_types IS NULL OR n.type = ANY(filter_types))
+      AND (filter_statuses IS NULL OR n.status = ANY(filter_statuses))
+    ORDER BY ne.embedding::halfvec(3072) <=> query_embedding::halfvec(3072)
+    LIMIT match_count
+  )
+  -- Similarity is rescored at full precision
+  SELECT c.node_id, (1 - (c.embedding <=> query_embedding))::FLOAT AS similarity
+  FROM candidates c
+  WHERE (1 - (c.embedding <=> query_embedding)) > similarity_threshold
+  ORDER BY 2 DESC;
 END;
 $$;
 
+-- Query vectors arrive as base64 little-endian float32, a quarter of the
+-- size of their JSON text. Floats are rebuilt from their IEEE 754 bits;
+-- subnormals, far below embedding precision, read as zero.
+CREATE OR REPLACE FUNCTION unpack_float32_vector(packed TEXT)
+RETURNS vector
+LANGUAGE sql IMMUTABLE STRICT AS $$
+  SELECT array_agg(
+    CASE WHEN f.e = 0 THEN 0::FLOAT
+         ELSE (1 - 2 * f.s) * (1 + f.m / 8388608::FLOAT) * power(2::FLOAT, f.e - 127) END
+    ORDER BY f.i
+  )::REAL[]::vector
+  FROM (
+    SELECT w.i, w.bits >> 31 AS s, (w.bits >> 23) & 255 AS e, w.bits & 8388607 AS m
+    FROM (
+      SELECT i,
+        get_byte(b.raw, 4 * i)::BIGINT
+          | (get_byte(b.raw, 4 * i + 1)::BIGINT << 8)
+          | (get_byte(b.raw, 4 * i + 2)::BIGINT << 16)
+          | (get_byte(b.raw, 4 * i + 3)::BIGINT << 24) AS bits
+      FROM (SELECT decode(packed, 'base64') AS raw) b,
+           generate_series(0, length(b.raw) / 4 - 1) AS i
+    ) w
+  ) f;
+$$;
+
+CREATE OR REPLACE FUNCTION search_similar_nodes_packed(
+  query_packed TEXT,
+  match_count INT DEFAULT 20,
+  similarity_threshold FLOAT DEFAULT 0.0,
+  filter_divisions TEXT[] DEFAULT NULL,
+  filter_types TEXT[] DEFAULT NULL,
+  filter_statuses TEXT[] DEFAULT NULL
+)
+RETURNS TABLE (node_id TEXT, similarity FLOAT)
+LANGUAGE sql AS $$
+  SELECT * FROM search_similar_nodes(
+    unpack_float32_vector(query_packed), match_count, similarity_threshold,
+    filter_divisions, filter_types, filter_statuses
+  );
+$$;
+
+-- ── USAGE ROLLUP FUNCTIONS ────────────────────────────
+CREATE OR REPLACE FUNCTION increment_usage_rollups(p_rows JSONB)
+RETURNS VOID
+LANGUAGE plpgsql AS $$
+BEGIN
+  INSERT INTO llm_usage_rollups AS r
+    (granularity, bucket_start, model, task_type, calls, input_tokens, cached_tokens, output_tokens, cost_usd)
+  SELECT x.granularity, x.bucket_start, x.model, x.task_type,
+         x.calls, x.input_tokens, x.cached_tokens, x.output_tokens, x.cost_usd
+  FROM jsonb_to_recordset(p_rows) AS x(
+    granularity TEXT, bucket_start TIMESTAMPTZ, model TEXT, task_type TEXT,
+    calls BIGINT, input_tokens BIGINT, cached_tokens BIGINT, output_tokens BIGINT, cost_usd FLOAT
+  )
+  ON CONFLICT (granularity, bucket_start, model, task_type) DO UPDATE SET
+    calls         = r.calls + EXCLUDED.calls,
+    input_tokens  = r.input_tokens + EXCLUDED.input_tokens,
+    cached_tokens = r.cached_tokens + EXCLUDED.cached_tokens,
+    output_tokens = r.output_tokens + EXCLUDED.output_tokens,
+    cost_usd      = r.cost_usd + EXCLUDED.cost_usd;
+
+  -- Minute buckets are only useful for recent windows
+  DELETE FROM llm_usage_rollups
+  WHERE granularity = 'minute' AND bucket_start < now() - INTERVAL '2 days';
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION usage_summary(
+  p_since TIMESTAMPTZ DEFAULT NULL,
+  p_granularity TEXT DEFAULT 'day'
+)
+RETURNS TABLE (
+  model TEXT, task_type TEXT, calls BIGINT, input_tokens BIGINT,
+  cached_tokens BIGINT, output_tokens BIGINT, cost_usd FLOAT
+)
+LANGUAGE sql STABLE AS $$
+  SELECT r.model, r.task_type,
+         SUM(r.calls)::BIGINT, SUM(r.input_tokens)::BIGINT, SUM(r.cached_tokens)::BIGINT,
+         SUM(r.output_tokens)::BIGINT, SUM(r.cost_usd)::FLOAT
+  FROM llm_usage_rollups r
+  WHERE r.granularity = p_granularity
+    AND (p_since IS NULL OR r.bucket_start >= p_since)
+  GROUP BY r.model, r.task_type;
+$$;
+
+-- Backfill rollups from calls recorded before rollups existed
+INSERT INTO llm_usage_rollups
+  (granularity, bucket_start, model, task_type, calls, input_tokens, cached_tokens, output_tokens, cost_usd)
+SELECT g.granularity, date_trunc(g.granularity, u.created_at), u.model, u.task_type,
+       COUNT(*), SUM(u.input_tokens), SUM(u.cached_tokens), SUM(u.output_tokens), SUM(u.cost_usd)
+FROM llm_usage u
+CROSS JOIN (VALUES ('hour'), ('day')) AS g(granularity)
+WHERE u.created_at IS NOT NULL
+GROUP BY g.granularity, date_trunc(g.granularity, u.created_at), u.model, u.task_type
+ON CONFLICT DO NOTHING;
+
 -- ── REALTIME ──────────────────────────────────────────
 DO $$
 BEGIN
@@ -0,0 +1,255 @@
+"""Answer cache for Ask: LLM answers reused until a node they cite changes.
+
+Answers are keyed by the normalized query plus any retrieval filters. Each
+entry records a fingerprint of every node the answer cited (citations,
+highlight_node_ids and the items' affected_node_ids), hashed from the
+fields the prompt shows for a node. A lookup recomputes those fingerprints
+from the current graph; if one differs, or a cited node is gone, the entry
+is stale. Fingerprints are content hashes rather than in-process counters,
+so entries persisted to the Supabase ask_cache table stay valid across
+restarts and workers. freshness_score is left out: it is recomputed for
+every node on a schedule and would otherwise void the whole cache.
+
+A stale or expired entry is recomputed, unless stale-while-revalidate is
+on: then it is returned at once and refreshed in the background. Misses and
+refreshes for the same key share one pipeline run.
+
+New nodes cannot invalidate an answer that does not cite them, so entries
+also expire after NEXUS_ASK_CACHE_TTL.
+
+These rows share the ask_cache table with the seeded answers, under keys
+prefixed with ASK_CACHE_LLM_PREFIX so an answer can never replace a seeded
+row. They are kept out of the keyword fallback (graph_store.load_ask_cache
+skips them): it matches loosely and could not apply the fingerprint or TTL
+checks.
+
+Configured through the environment:
+    NEXUS_ASK_CACHE       0 to disable (default 1)
+    NEXUS_ASK_CACHE_SIZE  entries kept in memory (default 512)
+    NEXUS_ASK_CACHE_TTL   seconds before an entry counts as stale (default 86400)
+    NEXUS_ASK_CACHE_SWR   1 to serve stale answers while refreshing (default 0)
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from . import metrics
+from .graph_expansion import get_adjacency
+from .graph_store import ASK_CACHE_LLM_PREFIX, get_generation
+from .supabase_client import get_supabase, is_supabase_configured
+
+logger = logging.getLogger("nexus.answer_cache")
+
+# Node fields rendered into the Ask context, and so able to change an answer
+FINGERPRINT_FIELDS = ("type", "label", "division", "content", "role", "cognitive_load", "status")
+
+
+def node_fingerprint(node: dict | None) -> str | None:
+    """Hash of a node's prompt-visible fields; None for a missing node."""
+    if node is None:
+        return None
+    payload = json.dumps([node.get(f) for f in FINGERPRINT_FIELDS], default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+_fingerprints: tuple[int, dict[str, str | None]] = (-1, {})
+
+
+def current_fingerprints(node_ids) -> dict[str, str | None]:
+    """Fingerprints of node_ids in the current graph, memoized per graph generation."""
+    global _fingerprints
+    generation = get_generation("graph")
+    if _fingerprints[0] != generation:
+        _fingerprints = (generation, {})
+    memo = _fingerprints[1]
+    nodes_by_id = None
+    out = {}
+    for node_id in node_ids:
+        if node_id not in memo:
+            if nodes_by_id is None:
+                nodes_by_id = get_adjacency().nodes_by_id
+            memo[node_id] = node_fingerprint(nodes_by_id.get(node_id))
+        out[node_id] = memo[node_id]
+    return out
+
+
+def cited_node_ids(response: dict) -> list[str]:
+    """Node ids an answer refers to, in first-mention order."""
+    ids = [c.get("node_id") for c in response.get("citations") or [] if isinstance(c, dict)]
+    ids.extend(response.get("highlight_node_ids") or [])
+    for item in response.get("items") or []:
+        if isinstance(item, dict):
+            ids.extend(item.get("affected_node_ids") or [])
+    return [i for i in dict.fromkeys(ids) if isinstance(i, str) and i]
+
+
+@dataclass
+class CachedAnswer:
+    response: dict
+    fingerprints: dict[str, str | None]
+    created_at: float  # wall clock, so persisted entries age correctly in other workers
+    compute_seconds: float
+
+    def is_fresh(self, ttl: float) -> bool:
+        if time.time() - self.created_at >= ttl:
+            return False
+        return current_fingerprints(self.fingerprints) == self.fingerprints
+
+
+class AnswerCache:
+    """Bounded LRU of answers, backed by the Supabase ask_cache table."""
+
+    def __init__(self, max_size: int = 512, ttl: float = 86400, stale_while_revalidate: bool = False):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self._entries: OrderedDict[str, CachedAnswer] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(query: str, filters=None, structured: bool = True) -> str:
+        """Cache key: the normalized query, plus filters and format when they are not the default."""
+        from .llm.embeddings import normalize_query
+
+        key = normalize_query(query)
+        if filters:
+            key += f" |{filters}"
+        if not structured:
+            key += " |text"
+        return key
+
+    async def get_or_compute(self, key: str, compute, persist: bool = True) -> dict:
+        """The cached answer for key, or compute()'s.
+
+        compute is a coroutine function returning (response, context node ids);
+        the context ids stand in for citations when an answer cites nothing.
+        persist writes the answer through to the ask_cache table.
+        """
+        entry = self._entries.get(key)
+        if entry is None and persist:
+            entry = await asyncio.to_thread(self._load_persisted, key)
+            if entry is not None:
+                self._remember(key, entry)
+
+        if entry is not None:
+            self._entries.move_to_end(key)
+            if entry.is_fresh(self.ttl):
+                metrics.ASK_CACHE.inc(result="hit")
+                metrics.ASK_CACHE_SAVED_SECONDS.inc(entry.compute_seconds)
+                return entry.response
+            if self.stale_while_revalidate:
+                metrics.ASK_CACHE.inc(result="stale")
+                metrics.ASK_CACHE_SAVED_SECONDS.inc(entry.compute_seconds)
+                self._start(key, compute, persist)
+                logger.info(f"[AnswerCache] Serving stale answer, refreshing: {key[:50]}")
+                return entry.response
+            del self._entries[key]
+
+        metrics.ASK_CACHE.inc(result="coalesced" if key in self._inflight else "miss")
+        # shield: a cancelled caller must not cancel the run other callers share
+        return await asyncio.shield(self._start(key, compute, persist))
+
+    def _start(self, key: str, compute, persist: bool) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._run(key, compute, persist))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        return task
+
+    def _finish(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"[AnswerCache] Answer failed for {key[:50]}: {task.exception()}")
+
+    async def _run(self, key: str, compute, persist: bool) -> dict:
+        start = time.perf_counter()
+        response, context_ids = await compute()
+        elapsed = time.perf_counter() - start
+        cited = cited_node_ids(response) or list(context_ids)
+        entry = CachedAnswer(response, current_fingerprints(cited), time.time(), elapsed)
+        self._remember(key, entry)
+        if persist:
+            await asyncio.to_thread(self._persist, key, entry)
+        return response
+
+    def _remember(self, key: str, entry: CachedAnswer):
+        if self.max_size <= 0:
+            return
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        metrics.ASK_CACHE_ENTRIES.set(len(self._entries))
+
+    def clear(self):
+        self._entries.clear()
+        metrics.ASK_CACHE_ENTRIES.set(0)
+
+    # ── ask_cache table ──────────────────────────────────────────────────────
+
+    def _load_persisted(self, key: str) -> CachedAnswer | None:
+        if not is_supabase_configured():
+            return None
+        try:
+            result = (
+                get_supabase().table("ask_cache")
+                .select("response, cited_fingerprints, compute_ms, created_at")
+                .eq("query_normalized", ASK_CACHE_LLM_PREFIX + key)
+                .limit(1)
+                .execute()
+            )
+        except Exception as e:
+            logger.warning(f"[AnswerCache] ask_cache read failed: {e}")
+            return None
+        row = (result.data or [None])[0]
+        # Seeded rows carry no fingerprints and cannot be validated
+        if not row or row.get("cited_fingerprints") is None:
+            return None
+        try:
+            created_at = datetime.fromisoformat(row["created_at"].replace("Z", "+00:00")).timestamp()
+        except (KeyError, AttributeError, ValueError):
+            return None
+        return CachedAnswer(row["response"], row["cited_fingerprints"], created_at, (row.get("compute_ms") or 0) / 1000)
+
+    def _persist(self, key: str, entry: CachedAnswer):
+        if not is_supabase_configured():
+            return
+        try:
+            get_supabase().table("ask_cache").upsert({
+                "query_normalized": ASK_CACHE_LLM_PREFIX + key,
+                "response": entry.response,
+                "cited_fingerprints": entry.fingerprints,
+                "compute_ms": round(entry.compute_seconds * 1000),
+                "created_at": datetime.fromtimestamp(entry.created_at, timezone.utc).isoformat(),
+            }).execute()
+        except Exception as e:
+            logger.warning(f"[AnswerCache] ask_cache write failed: {e}")
+
+
+_answer_cache: AnswerCache | None = None
+
+
+def get_answer_cache() -> AnswerCache | None:
+    """The shared answer cache, or None when NEXUS_ASK_CACHE=0."""
+    global _answer_cache
+    if os.getenv("NEXUS_ASK_CACHE", "1") == "0":
+        return None
+    if _answer_cache is None:
+        _answer_cache = AnswerCache(
+            max_size=int(os.getenv("NEXUS_ASK_CACHE_SIZE", "512")),
+            ttl=float(os.getenv("NEXUS_ASK_CACHE_TTL", "86400")),
+            stale_while_revalidate=os.getenv("NEXUS_ASK_CACHE_SWR", "0") == "1",
+        )
+    return _answer_cache
@@ -1,6 +1,7 @@
 """Module 8: Dynamic briefing and onboarding generation."""
 
 import logging
+from contextlib import aclosing
 from .llm.client import get_llm_client
 from .llm.context_builder import ContextBuilder
 from .llm import prompts
@@ -16,7 +17,7 @@ async def generate_briefing(person_id: str) -> dict:
     org_summary = ctx.build_org_summary()
     person_context = ctx.build_person_context(person_id)
     alerts_context = ctx.build_alerts_context()
-    knowledge_context = ctx.build_knowledge_context()
+    knowledge_context = ctx.build_knowledge_context(max_tokens=1000)
 
     # Extract person info from context
     lines = person_context.split("\n")
@@ -35,7 +36,7 @@ async def generate_briefing(person_id: str) -> dict:
         person_name=person_name,
         role=role,
         division=division,
-        temporal_context=knowledge_context[:4000],
+        temporal_context=knowledge_context,
         alerts_context=alerts_context,
         person_context=person_context,
     )
@@ -64,7 +65,7 @@ async def generate_briefing_stream(person_id: str):
     org_summary = ctx.build_org_summary()
     person_context = ctx.build_person_context(person_id)
     alerts_context = ctx.build_alerts_context()
-    knowledge_context = ctx.build_knowledge_context()
+    knowledge_context = ctx.build_knowledge_context(max_tokens=1000)
 
     lines = person_context.split("\n")
     person_name = "Executive"
@@ -82,19 +83,21 @@ async def generate_briefing_stream(person_id: str):
         person_name=person_name,
         role=role,
         division=division,
-        temporal_context=knowledge_context[:4000],
+        temporal_context=knowledge_context,
         alerts_context=alerts_context,
         person_context=person_context,
     )
 
-    async for token in await client.complete(
+    tokens = await client.complete(
         task_type="briefing",
         system_prompt=system,
         user_prompt=f"Generate the briefing for {person_name} now. Today's date is 2026-02-07.",
         stream=True,
         use_cache=False,
-    ):
-        yield token
+    )
+    async with aclosing(tokens):
+        async for token in tokens:
+            yield token
 
 
 async def generate_onboarding(team_name: str, division: str) -> dict:
@@ -105,12 +108,12 @@ async def generate_onboarding(team_name: str, division: str) -> dict:
     org_summary = ctx.build_org_summary()
     division_context = ctx.build_division_context(division)
     alerts_context = ctx.build_alerts_context()
-    knowledge_context = ctx.build_knowledge_context()
+    knowledge_context = ctx.build_knowledge_context(max_tokens=750)
 
     system = prompts.NEXUS_BASE.format(**org_summary) + "\n\n" + prompts.ONBOARDING_GENERATOR.format(
         team_name=team_name,
         division=division,
-        team_context=division_context + "\n\n" + knowledge_context[:3000],
+        team_context=division_context + "\n\n" + knowledge_context,
         alerts_context=alerts_context,
     )
 
@@ -0,0 +1,169 @@
+"""Ask conversation history: recent turns in memory, persisted write-behind.
+
+Each conversation keeps its last NEXUS_CONVERSATION_TURNS messages in a
+bounded LRU, so follow-up questions read their history without a database
+round trip. A conversation missing from memory is loaded once from
+Supabase (newest messages first, then reversed).
+
+New messages go into memory immediately and are queued for Supabase. A
+flush runs in the default executor, off the event loop, and writes every
+queued message in one conversations upsert plus one messages insert.
+Messages carry explicit timestamps, so a user turn always sorts before
+its answer. Failed writes are requeued; flush() is also called on shutdown.
+
+Without Supabase the LRU is the only store, so a conversation evicted
+from it starts over.
+
+Configured through the environment:
+    NEXUS_CONVERSATION_TURNS       messages kept per conversation (default 10)
+    NEXUS_CONVERSATION_CACHE_SIZE  conversations kept in memory (default 1000)
+"""
+
+import os
+import asyncio
+import logging
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta, timezone
+
+from .supabase_client import get_supabase, is_supabase_configured
+
+logger = logging.getLogger("nexus.conversations")
+
+_MAX_PENDING_MESSAGES = 10_000
+
+
+class ConversationStore:
+    def __init__(self, turns: int = 10, max_conversations: int = 1000):
+        self.turns = turns
+        self.max_conversations = max_conversations
+        self._recent: OrderedDict[str, deque[dict]] = OrderedDict()
+        self._pending: list[dict] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flush_scheduled = False
+
+    def __len__(self) -> int:
+        return len(self._recent)
+
+    def cached(self, conversation_id: str) -> list[dict] | None:
+        """Recent messages if the conversation is in memory, else None."""
+        with self._lock:
+            messages = self._recent.get(conversation_id)
+            if messages is None:
+                return None
+            self._recent.move_to_end(conversation_id)
+            return list(messages)
+
+    def load(self, conversation_id: str) -> list[dict]:
+        """Recent {role, content} messages, oldest first. Blocking on a cache miss."""
+        messages = self.cached(conversation_id)
+        if messages is not None:
+            return messages
+
+        rows = []
+        if is_supabase_configured():
+            try:
+                result = (
+                    get_supabase().table("conversation_messages")
+                    .select("role, content")
+                    .eq("conversation_id", conversation_id)
+                    .order("created_at", desc=True)
+                    .limit(self.turns)
+                    .execute()
+                )
+                rows = [{"role": r["role"], "content": r["content"]} for r in reversed(result.data or [])]
+            except Exception as e:
+                logger.warning(f"[Conversations] Failed to load {conversation_id} from Supabase: {e}")
+                return []
+
+        with self._lock:
+            # Appends that raced with the load are newer than anything it read
+            if conversation_id in self._recent:
+                return list(self._recent[conversation_id])
+            unflushed = [
+                {"role": m["role"], "content": m["content"]}
+                for m in self._pending if m["conversation_id"] == conversation_id
+            ]
+            self._remember(conversation_id, deque(rows + unflushed, maxlen=self.turns))
+            return list(self._recent[conversation_id])
+
+    def append(self, conversation_id: str, user_query: str, assistant_answer: str):
+        """Record one turn; it is readable at once and persisted in the background."""
+        now = datetime.now(timezone.utc)
+        turn = [
+            {"role": "user", "content": user_query},
+            {"role": "assistant", "content": assistant_answer},
+        ]
+        with self._lock:
+            messages = self._recent.get(conversation_id)
+            if messages is None:
+                messages = deque(maxlen=self.turns)
+                self._remember(conversation_id, messages)
+            else:
+                self._recent.move_to_end(conversation_id)
+            messages.extend(turn)
+            if is_supabase_configured():
+                self._pending.extend(
+                    {**m, "conversation_id": conversation_id, "created_at": (now + timedelta(microseconds=i)).isoformat()}
+                    for i, m in enumerate(turn)
+                )
+        self._schedule_flush()
+
+    def _remember(self, conversation_id: str, messages: deque):
+        self._recent[conversation_id] = messages
+        self._recent.move_to_end(conversation_id)
+        while len(self._recent) > self.max_conversations:
+            self._recent.popitem(last=False)
+
+    # ── Write-behind persistence ─────────────────────────────────────────────
+
+    def _schedule_flush(self):
+        with self._lock:
+            if not self._pending or self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        # Keep Supabase round trips off the event loop and out of the response path
+        loop.run_in_executor(None, self.flush)
+
+    def flush(self):
+        """Persist queued messages to Supabase."""
+        with self._flush_lock:
+            with self._lock:
+                messages, self._pending = self._pending, []
+                self._flush_scheduled = False
+            if not messages:
+                return
+            try:
+                sb = get_supabase()
+                latest: dict[str, str] = {}
+                for m in messages:
+                    latest[m["conversation_id"]] = m["created_at"]
+                sb.table("conversations").upsert([
+                    {"id": conversation_id, "updated_at": updated_at}
+                    for conversation_id, updated_at in latest.items()
+                ]).execute()
+                sb.table("conversation_messages").insert(messages).execute()
+                logger.info(f"[Conversations] Persisted {len(messages)} messages in {len(latest)} conversations")
+            except Exception as e:
+                logger.warning(f"[Conversations] Failed to persist conversations to Supabase, will retry: {e}")
+                with self._lock:
+                    self._pending = (messages + self._pending)[-_MAX_PENDING_MESSAGES:]
+
+
+_store: ConversationStore | None = None
+
+
+def get_conversation_store() -> ConversationStore:
+    global _store
+    if _store is None:
+        _store = ConversationStore(
+            turns=int(os.getenv("NEXUS_CONVERSATION_TURNS", "10")),
+            max_conversations=int(os.getenv("NEXUS_CONVERSATION_CACHE_SIZE", "1000")),
+        )
+    return _store
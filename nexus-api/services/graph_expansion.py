@@ -0,0 +1,168 @@
+"""Budgeted graph expansion around retrieved nodes.
+
+Retrieval seeds are expanded best-first over an adjacency index. A
+neighbour reached over an edge scores
+
+    score(parent) * DECAY * edge_weight(type) / log2(2 + degree(parent))
+
+so strong relationships (DECIDED_BY, CONTRADICTS) carry more relevance
+than weak ones (MEMBER_OF, REPORTS_TO), and a hub passes on little to
+each of its many neighbours. Each node keeps the score of its best path.
+Expansion stops at max_nodes, at max_hops, or once the best remaining
+score falls below min_score, and only the NEXUS_EXPANSION_FANOUT
+strongest edges of a node are followed. The work is therefore linear in
+the expanded neighbourhood rather than in the graph's edge count.
+
+Ties are broken by node id, so the same seeds always give the same
+expansion.
+
+Configured through the environment:
+    NEXUS_EXPANSION_DECAY         per-hop decay (default 0.6)
+    NEXUS_EXPANSION_FANOUT        edges followed per node, strongest first (default 12)
+    NEXUS_EXPANSION_MIN_SCORE     smallest score admitted (default 0.05)
+    NEXUS_EXPANSION_EDGE_WEIGHTS  per-type overrides, e.g. "OWNS=0.9,ABOUT=0.5"
+"""
+
+import os
+import math
+import heapq
+import logging
+import threading
+
+from .graph_store import get_generation, load_graph
+
+logger = logging.getLogger("nexus.graph_expansion")
+
+EDGE_WEIGHTS = {
+    "CONTRADICTS": 1.0,
+    "DECIDED_BY": 1.0,
+    "SUPERSEDES": 0.9,
+    "BLOCKS": 0.9,
+    "AFFECTS": 0.9,
+    "DEPENDS_ON": 0.8,
+    "OWNS": 0.8,
+    "ASSIGNED_TO": 0.8,
+    "HANDOFF": 0.7,
+    "DELEGATES_TO": 0.7,
+    "ABOUT": 0.7,
+    "CONTEXT_FEEDS": 0.6,
+    "EXPERT_IN": 0.6,
+    "CAN_ANSWER": 0.6,
+    "REVIEWS_OUTPUT_OF": 0.5,
+    "PRODUCED_BY": 0.5,
+    "SUPERVISED_BY": 0.4,
+    "COMMUNICATES_WITH": 0.4,
+    "MEMBER_OF": 0.3,
+    "REPORTS_TO": 0.3,
+}
+_DEFAULT_EDGE_WEIGHT = 0.5
+
+
+def _edge_weights() -> dict[str, float]:
+    weights = dict(EDGE_WEIGHTS)
+    for part in os.getenv("NEXUS_EXPANSION_EDGE_WEIGHTS", "").split(","):
+        if "=" in part:
+            edge_type, weight = part.split("=", 1)
+            weights[edge_type.strip()] = float(weight)
+    return weights
+
+
+class GraphAdjacency:
+    """Per-node incident edges, strongest first, built once per graph generation."""
+
+    def __init__(self, graph: dict, weights: dict[str, float]):
+        self.nodes_by_id = {n["id"]: n for n in graph.get("nodes", [])}
+        self.edges = graph.get("edges", [])
+        # node_id -> [(weight, neighbour_id, edge index)]
+        self.adjacency: dict[str, list[tuple[float, str, int]]] = {}
+        # node_id -> {neighbour_id: [edge index]}, for membership probes on hubs
+        self.links: dict[str, dict[str, list[int]]] = {}
+        for i, e in enumerate(self.edges):
+            w = weights.get(e.get("type"), _DEFAULT_EDGE_WEIGHT)
+            self.adjacency.setdefault(e["source"], []).append((w, e["target"], i))
+            self.adjacency.setdefault(e["target"], []).append((w, e["source"], i))
+            self.links.setdefault(e["source"], {}).setdefault(e["target"], []).append(i)
+            self.links.setdefault(e["target"], {}).setdefault(e["source"], []).append(i)
+        for entries in self.adjacency.values():
+            entries.sort(key=lambda entry: (-entry[0], entry[1], entry[2]))
+
+    def degree(self, node_id: str) -> int:
+        return len(self.adjacency.get(node_id, ()))
+
+    def edges_between(self, node_ids) -> list[dict]:
+        """Edges with both ends in node_ids, in graph order."""
+        wanted = set(node_ids)
+        indices = set()
+        for node_id in wanted:
+            links = self.links.get(node_id, {})
+            # Walk whichever side is smaller, so a hub costs len(wanted), not its degree
+            if len(links) <= len(wanted):
+                indices.update(i for neighbour, idx in links.items() if neighbour in wanted for i in idx)
+            else:
+                indices.update(i for neighbour in wanted for i in links.get(neighbour, ()))
+        return [self.edges[i] for i in sorted(indices)]
+
+
+_adjacency: tuple[int, GraphAdjacency] | None = None
+_adjacency_lock = threading.Lock()
+
+
+def get_adjacency() -> GraphAdjacency:
+    """The adjacency index for the current graph, rebuilt when its generation changes."""
+    global _adjacency
+    generation = get_generation("graph")
+    with _adjacency_lock:
+        if _adjacency is None or _adjacency[0] != generation:
+            index = GraphAdjacency(load_graph(), _edge_weights())
+            _adjacency = (generation, index)
+            logger.info(f"[Expansion] Adjacency index over {len(index.nodes_by_id)} nodes, {len(index.edges)} edges")
+        return _adjacency[1]
+
+
+def expand(
+    seeds: list[tuple[str, float]],
+    max_nodes: int = 30,
+    max_hops: int = 2,
+    accept=None,
+    adjacency: GraphAdjacency | None = None,
+) -> list[tuple[str, float]]:
+    """Seeds plus their best-scoring neighbourhood, as (node_id, score) best first.
+
+    accept, if given, is a predicate on node dicts; rejected nodes are
+    neither admitted nor expanded through.
+    """
+    adj = adjacency or get_adjacency()
+    decay = float(os.getenv("NEXUS_EXPANSION_DECAY", "0.6"))
+    fanout = int(os.getenv("NEXUS_EXPANSION_FANOUT", "12"))
+    min_score = float(os.getenv("NEXUS_EXPANSION_MIN_SCORE", "0.05"))
+
+    best: dict[str, float] = {}
+    # (-score, node_id, hops); node_id breaks ties deterministically
+    heap = []
+    for node_id, score in seeds:
+        if score > best.get(node_id, 0.0):
+            best[node_id] = score
+            heapq.heappush(heap, (-score, node_id, 0))
+
+    admitted: dict[str, float] = {}
+    while heap and len(admitted) < max_nodes:
+        neg_score, node_id, hops = heapq.heappop(heap)
+        score = -neg_score
+        if node_id in admitted or score < best.get(node_id, 0.0):
+            continue  # already admitted, or a stale entry superseded by a better path
+        if score < min_score:
+            break
+        node = adj.nodes_by_id.get(node_id)
+        if node is None or (accept is not None and not accept(node)):
+            continue
+        admitted[node_id] = score
+        if hops >= max_hops:
+            continue
+        spread = score * decay / math.log2(2 + adj.degree(node_id))
+        for weight, neighbour, _ in adj.adjacency.get(node_id, ())[:fanout]:
+            candidate = spread * weight
+            if neighbour not in admitted and candidate > best.get(neighbour, 0.0):
+                best[neighbour] = candidate
+                heapq.heappush(heap, (-candidate, neighbour, hops + 1))
+
+    return list(admitted.items())
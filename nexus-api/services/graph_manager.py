@@ -1,12 +1,15 @@
 """Module 2: Information Tracking — Graph mutation engine with Supabase persistence."""
 
 import json
+import time
 import uuid
 import math
 import logging
+import functools
 from datetime import datetime
 
-from .graph_store import load_graph, invalidate_cache, NODE_COLUMNS, EDGE_COLUMNS
+from . import metrics
+from .graph_store import load_graph, invalidate_cache, mark_changed, NODE_COLUMNS, EDGE_COLUMNS
 
 logger = logging.getLogger("nexus.graph_manager")
 
@@ -27,6 +30,41 @@ def _get_sb():
     return get_supabase()
 
 
+def _timed(op: str):
+    """Record the operation's duration, labelled with the backend that served it."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            backend = "supabase" if _supabase_available() else "memory"
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                metrics.STORAGE_OP_SECONDS.observe(time.perf_counter() - start, op=op, backend=backend)
+        return wrapper
+    return decorator
+
+
+# ---------------------------------------------------------------------------
+# Change listeners
+# ---------------------------------------------------------------------------
+_node_listeners: list = []
+
+
+def add_node_listener(fn):
+    """Register fn(node_ids) to be called after nodes are created or updated."""
+    if fn not in _node_listeners:
+        _node_listeners.append(fn)
+
+
+def _on_nodes_changed(node_ids: list[str]):
+    for fn in list(_node_listeners):
+        try:
+            fn(node_ids)
+        except Exception as exc:
+            logger.warning("[GraphManager] Node listener failed: %s", exc)
+
+
 def _split_node_for_db(node_data: dict) -> dict:
     """Split a flat node dict into columns + extras for the DB schema."""
     row = {}
@@ -95,6 +133,7 @@ def get_graph_state() -> dict:
     return _graph_state
 
 
+@_timed("upsert_node")
 def upsert_node(node_data: dict) -> tuple[str, bool]:
     """Create or update a node. Returns (node_id, is_new).
 
@@ -118,11 +157,12 @@ def upsert_node(node_data: dict) -> tuple[str, bool]:
             row = _split_node_for_db(node_data)
 
             sb.table("nodes").upsert(row).execute()
-            invalidate_cache()
+            invalidate_cache("graph")
 
             action = "create_node" if is_new else "update_node"
             _record_mutation(action, node_id, node_data)
             logger.info("[GraphManager] %s node %s (Supabase)", action, node_id)
+            _on_nodes_changed([node_id])
             return node_id, is_new
 
         except Exception as exc:
@@ -137,19 +177,24 @@ def upsert_node(node_data: dict) -> tuple[str, bool]:
         for key, value in node_data.items():
             if value is not None and key != "id":
                 existing[key] = value
+        mark_changed("graph")
         _record_mutation("update_node", node_id, node_data)
         logger.info("[GraphManager] Updated node %s (in-memory)", node_id)
+        _on_nodes_changed([node_id])
         return node_id, False
 
     node_data.setdefault("created_at", datetime.now().isoformat())
     node_data.setdefault("freshness_score", 1.0)
     nodes.append(node_data)
     _graph_state["metadata"]["node_count"] = len(nodes)
+    mark_changed("graph")
     _record_mutation("create_node", node_id, node_data)
     logger.info("[GraphManager] Created node %s (in-memory)", node_id)
+    _on_nodes_changed([node_id])
     return node_id, True
 
 
+@_timed("upsert_edge")
 def upsert_edge(source: str, target: str, edge_type: str, metadata: dict | None = None) -> str:
     """Create or update an edge. Returns edge_id.
 
@@ -177,7 +222,7 @@ def upsert_edge(source: str, target: str, edge_type: str, metadata: dict | None
                 if row:
                     sb.table("edges").update(row).eq("id", edge_id).execute()
                 _record_mutation("update_edge", edge_id, metadata)
-                invalidate_cache()
+                invalidate_cache("graph")
                 return edge_id
 
             # Create new edge
@@ -191,7 +236,7 @@ def upsert_edge(source: str, target: str, edge_type: str, metadata: dict | None
             }
             row = _split_edge_for_db(edge_data)
             sb.table("edges").insert(row).execute()
-            invalidate_cache()
+            invalidate_cache("graph")
 
             _record_mutation("create_edge", edge_id, edge_data)
             logger.info("[GraphManager] Created edge %s: %s --[%s]--> %s (Supabase)",
@@ -210,6 +255,7 @@ def upsert_edge(source: str, target: str, edge_type: str, metadata: dict | None
     )
     if existing:
         existing.update(metadata)
+        mark_changed("graph")
         _record_mutation("update_edge", existing["id"], metadata)
         return existing["id"]
 
@@ -217,12 +263,14 @@ def upsert_edge(source: str, target: str, edge_type: str, metadata: dict | None
     edge = {"id": edge_id, "source": source, "target": target, "type": edge_type, **metadata}
     edges.append(edge)
     _graph_state["metadata"]["edge_count"] = len(edges)
+    mark_changed("graph")
     _record_mutation("create_edge", edge_id, edge)
     logger.info("[GraphManager] Created edge %s: %s --[%s]--> %s (in-memory)",
                 edge_id, source, edge_type, target)
     return edge_id
 
 
+@_timed("supersede_node")
 def supersede_node(old_id: str, new_id: str):
     """Mark old knowledge unit as superseded by new one."""
     if _supabase_available():
@@ -231,7 +279,7 @@ def supersede_node(old_id: str, new_id: str):
             sb.table("nodes").update({"status": "superseded", "updated_at": datetime.now().isoformat()}).eq("id", old_id).execute()
             upsert_edge(new_id, old_id, "SUPERSEDES")
             _record_mutation("supersede", old_id, {"superseded_by": new_id})
-            invalidate_cache()
+            invalidate_cache("graph")
             logger.info("[GraphManager] %s superseded by %s (Supabase)", old_id, new_id)
             return
         except Exception as exc:
@@ -243,11 +291,13 @@ def supersede_node(old_id: str, new_id: str):
     old = nodes_by_id.get(old_id)
     if old:
         old["status"] = "superseded"
+        mark_changed("graph")
     upsert_edge(new_id, old_id, "SUPERSEDES")
     _record_mutation("supersede", old_id, {"superseded_by": new_id})
     logger.info("[GraphManager] %s superseded by %s (in-memory)", old_id, new_id)
 
 
+@_timed("compute_freshness")
 def compute_freshness():
     """Recompute freshness scores for all knowledge units using half-life decay."""
     now = datetime.now()
@@ -282,7 +332,7 @@ def compute_freshness():
                 for u in batch:
                     sb.table("nodes").update({"freshness_score": u["freshness_score"], "updated_at": u["updated_at"]}).eq("id", u["id"]).execute()
 
-            invalidate_cache()
+            invalidate_cache("graph")
             logger.info("[GraphManager] Recomputed freshness for %d nodes (Supabase)", len(updates))
             return
 
@@ -304,9 +354,11 @@ def compute_freshness():
                 freshness = math.pow(2, -age_days / half_life)
                 node["freshness_score"] = round(freshness, 3)
 
+    mark_changed("graph")
     logger.info("[GraphManager] Recomputed freshness scores (in-memory)")
 
 
+@_timed("get_node_history")
 def get_node_history(node_id: str) -> list[dict]:
     """Get mutation history for a specific node."""
     if _supabase_available():
@@ -327,6 +379,7 @@ def get_node_history(node_id: str) -> list[dict]:
     return [m for m in _history if m.get("node_id") == node_id]
 
 
+@_timed("get_provenance")
 def get_provenance(node_id: str) -> dict | None:
     """Get provenance information for a node."""
     if _supabase_available():
@@ -2,9 +2,12 @@
 
 import json
 import os
+import time
 import logging
 from datetime import datetime
 
+from . import metrics
+
 logger = logging.getLogger("nexus.graph_store")
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'mock_data')
@@ -14,11 +17,46 @@ DATA_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'mock_data')
 # ---------------------------------------------------------------------------
 _cache: dict[str, object] = {}
 
+# Cache entries derived from each data source; invalidating a source drops all of them
+_DEPENDENT_KEYS = {
+    "graph": ("graph", "hierarchy"),
+    "alerts": ("alerts",),
+    "ask_cache": ("ask_cache",),
+}
+
+# Monotonic generation per data source, bumped on every change.
+# Downstream caches key on these to know when their renderings are stale.
+_generations: dict[str, int] = {source: 0 for source in _DEPENDENT_KEYS}
+
+
+def invalidate_cache(*sources: str):
+    """Clear the in-memory cache so the next read re-fetches from Supabase.
+
+    With no arguments every source is invalidated; otherwise only the named
+    sources ("graph", "alerts", "ask_cache") and the entries derived from them.
+    """
+    for source in sources or tuple(_DEPENDENT_KEYS):
+        for key in _DEPENDENT_KEYS[source]:
+            _cache.pop(key, None)
+        _generations[source] += 1
+    logger.info("[GraphStore] Cache invalidated: %s", ", ".join(sources) or "all")
+
 
-def invalidate_cache():
-    """Clear the in-memory cache so the next read re-fetches from Supabase."""
-    _cache.clear()
-    logger.info("[GraphStore] Cache invalidated")
+def mark_changed(source: str = "graph"):
+    """Record an in-place mutation of cached data.
+
+    The cached object itself stays (it already holds the change), but derived
+    entries are dropped and the generation is bumped.
+    """
+    for key in _DEPENDENT_KEYS[source]:
+        if key != source:
+            _cache.pop(key, None)
+    _generations[source] += 1
+
+
+def get_generation(source: str = "graph") -> int:
+    """Return the current generation of a data source."""
+    return _generations[source]
 
 
 # ---------------------------------------------------------------------------
@@ -83,6 +121,10 @@ def _flatten_edge(row: dict) -> dict:
 # ---------------------------------------------------------------------------
 # Mock-data fallback
 # ---------------------------------------------------------------------------
+def _observe_load(source: str, backend: str, start: float):
+    metrics.GRAPH_STORE_LOAD_SECONDS.observe(time.perf_counter() - start, source=source, backend=backend)
+
+
 def _load_json(filename: str, default: object):
     """Load a JSON file from the mock_data directory."""
     path = os.path.join(DATA_DIR, filename)
@@ -103,7 +145,10 @@ def load_graph() -> dict:
     Results are cached in-memory until invalidate_cache() is called.
     """
     if "graph" in _cache:
+        metrics.GRAPH_STORE_CACHE.inc(source="graph", result="hit")
         return _cache["graph"]
+    metrics.GRAPH_STORE_CACHE.inc(source="graph", result="miss")
+    start = time.perf_counter()
 
     if _supabase_available():
         try:
@@ -131,6 +176,7 @@ def load_graph() -> dict:
 
             graph = {"nodes": nodes, "edges": edges, "metadata": metadata}
             _cache["graph"] = graph
+            _observe_load("graph", "supabase", start)
             logger.info(
                 "[GraphStore] Loaded graph from Supabase: %d nodes, %d edges",
                 len(nodes), len(edges),
@@ -151,6 +197,7 @@ def load_graph() -> dict:
         },
     })
     _cache["graph"] = graph
+    _observe_load("graph", "json", start)
     logger.info("[GraphStore] Loaded graph from mock JSON")
     return graph
 
@@ -164,7 +211,10 @@ def load_hierarchy() -> dict:
     Returns: {"enterprise": {"id": ..., "name": ..., "health": ..., "divisions": [...]}}
     """
     if "hierarchy" in _cache:
+        metrics.GRAPH_STORE_CACHE.inc(source="hierarchy", result="hit")
         return _cache["hierarchy"]
+    metrics.GRAPH_STORE_CACHE.inc(source="hierarchy", result="miss")
+    start = time.perf_counter()
 
     graph = load_graph()
     nodes = graph.get("nodes", [])
@@ -180,6 +230,7 @@ def load_hierarchy() -> dict:
             }
         })
         _cache["hierarchy"] = hierarchy
+        _observe_load("hierarchy", "json", start)
         return hierarchy
 
     # ---- Build hierarchy from flat node list ----
@@ -311,6 +362,7 @@ def load_hierarchy() -> dict:
         }
     }
     _cache["hierarchy"] = hierarchy
+    _observe_load("hierarchy", "derived", start)
     logger.info("[GraphStore] Built hierarchy from node data: %d divisions", len(division_list))
     return hierarchy
 
@@ -321,7 +373,10 @@ def load_alerts() -> list:
     Tries Supabase `alerts` table first, falls back to mock_data/alerts.json.
     """
     if "alerts" in _cache:
+        metrics.GRAPH_STORE_CACHE.inc(source="alerts", result="hit")
         return _cache["alerts"]
+    metrics.GRAPH_STORE_CACHE.inc(source="alerts", result="miss")
+    start = time.perf_counter()
 
     if _supabase_available():
         try:
@@ -329,6 +384,7 @@ def load_alerts() -> list:
             result = sb.table("alerts").select("*").execute()
             alerts = result.data or []
             _cache["alerts"] = alerts
+            _observe_load("alerts", "supabase", start)
             logger.info("[GraphStore] Loaded %d alerts from Supabase", len(alerts))
             return alerts
         except Exception as exc:
@@ -339,17 +395,25 @@ def load_alerts() -> list:
     if isinstance(data, dict):
         data = data.get("alerts", [])
     _cache["alerts"] = data
+    _observe_load("alerts", "json", start)
     logger.info("[GraphStore] Loaded alerts from mock JSON")
     return data
 
 
+# ask_cache keys of answer_cache's LLM answers; seeded rows never carry it
+ASK_CACHE_LLM_PREFIX = "llm:"
+
+
 def load_ask_cache() -> dict:
     """Return the ask cache: {"queries": {...}}.
 
     Tries Supabase `ask_cache` table first, falls back to mock_data/ask_cache.json.
     """
     if "ask_cache" in _cache:
+        metrics.GRAPH_STORE_CACHE.inc(source="ask_cache", result="hit")
         return _cache["ask_cache"]
+    metrics.GRAPH_STORE_CACHE.inc(source="ask_cache", result="miss")
+    start = time.perf_counter()
 
     if _supabase_available():
         try:
@@ -359,11 +423,15 @@ def load_ask_cache() -> dict:
             # Reconstruct the queries dict keyed by the query string
             queries = {}
             for row in rows:
+                # LLM answers are only valid while their cited nodes are unchanged; answer_cache serves those
+                if row.get("cited_fingerprints") is not None or str(row.get("query_normalized", "")).startswith(ASK_CACHE_LLM_PREFIX):
+                    continue
                 query_key = row.get("query", "")
                 if query_key:
                     queries[query_key] = row.get("response", row)
             ask_cache = {"queries": queries}
             _cache["ask_cache"] = ask_cache
+            _observe_load("ask_cache", "supabase", start)
             logger.info("[GraphStore] Loaded %d ask_cache entries from Supabase", len(queries))
             return ask_cache
         except Exception as exc:
@@ -372,6 +440,7 @@ def load_ask_cache() -> dict:
     # Fallback
     ask_cache = _load_json("ask_cache.json", {"queries": {}})
     _cache["ask_cache"] = ask_cache
+    _observe_load("ask_cache", "json", start)
     logger.info("[GraphStore] Loaded ask_cache from mock JSON")
     return ask_cache
 
@@ -3,9 +3,10 @@
 import asyncio
 import json
 import logging
+from contextlib import aclosing
 from datetime import datetime
 from .llm.client import get_llm_client
-from .llm.context_builder import ContextBuilder
+from .llm.prompt_layout import org_layout, TASK, DYNAMIC
 from .llm import prompts
 from .supabase_client import get_supabase, is_supabase_configured
 
@@ -17,30 +18,27 @@ AGENT_NAMES = ["contradiction", "staleness", "silo", "overload", "coordination",
 _scan_history: list[dict] = []
 
 
-async def run_single_agent(agent_name: str) -> dict:
-    """Run a single immune system agent with LLM reasoning."""
+def _agent_prompts(agent_name: str) -> tuple[str, str]:
+    """Return (system, user) prompts for an immune agent."""
     if agent_name not in prompts.IMMUNE_AGENTS:
         raise ValueError(f"Unknown agent: {agent_name}")
 
-    client = get_llm_client()
-    ctx = ContextBuilder()
+    # All six agents share the org prefix and only diverge at their instructions
+    layout = org_layout()
+    layout.add(TASK, prompts.IMMUNE_AGENTS[agent_name])
+    layout.add(DYNAMIC, "Scan the organizational knowledge graph above. Avoid duplicating the active alerts.")
+    return layout.build()
 
-    org_summary = ctx.build_org_summary()
-    org_context = ctx.build_org_context()
-    alerts_context = ctx.build_alerts_context()
 
-    system = (
-        prompts.NEXUS_BASE.format(**org_summary) + "\n\n"
-        + prompts.IMMUNE_AGENTS[agent_name]
-    )
+async def run_single_agent(agent_name: str) -> dict:
+    """Run a single immune system agent with LLM reasoning."""
+    system, user = _agent_prompts(agent_name)
+    client = get_llm_client()
 
     result = await client.complete_json(
         task_type="immune_agent",
         system_prompt=system,
-        user_prompt=(
-            f"Organizational knowledge graph:\n{org_context[:8000]}\n\n"
-            f"Existing alerts (avoid duplicating):\n{alerts_context}"
-        ),
+        user_prompt=user,
         use_cache=False,
     )
 
@@ -49,6 +47,36 @@ async def run_single_agent(agent_name: str) -> dict:
     return {"agent": agent_name, "findings": findings}
 
 
+async def run_single_agent_stream(agent_name: str):
+    """Run a single immune agent, yielding each finding as soon as it is generated.
+
+    Yields {"type": "finding", "agent", "finding"} events, then
+    {"type": "agent_done", "agent", "findings"} with the complete list.
+    """
+    system, user = _agent_prompts(agent_name)
+    client = get_llm_client()
+
+    findings = []
+    events = client.complete_json_stream(
+        task_type="immune_agent",
+        system_prompt=system,
+        user_prompt=user,
+        keys={"findings"},
+        use_cache=False,
+    )
+    async with aclosing(events):
+        async for event in events:
+            if event["type"] == "item":
+                if not isinstance(event["item"], dict):
+                    logger.warning(f"[Immune:{agent_name}] Skipping non-object finding: {event['item']!r:.100}")
+                    continue
+                findings.append(event["item"])
+                yield {"type": "finding", "agent": agent_name, "finding": event["item"]}
+
+    logger.info(f"[Immune:{agent_name}] Found {len(findings)} issues (streamed)")
+    yield {"type": "agent_done", "agent": agent_name, "findings": findings}
+
+
 async def run_full_scan() -> dict:
     """Run all 6 immune system agents in parallel."""
     results = await asyncio.gather(
@@ -56,41 +84,101 @@ async def run_full_scan() -> dict:
         return_exceptions=True,
     )
 
-    all_findings = []
     agent_results = {}
-
     for name, result in zip(AGENT_NAMES, results):
         if isinstance(result, Exception):
             logger.error(f"[Immune:{name}] Failed: {result}")
             agent_results[name] = {"error": str(result), "findings": []}
         else:
             agent_results[name] = result
-            for finding in result.get("findings", []):
-                finding["agent"] = name
-                all_findings.append(finding)
+
+    return _finish_scan(agent_results)
+
+
+async def run_full_scan_stream():
+    """Run all 6 agents in parallel, yielding alerts as individual findings arrive.
+
+    Yields {"type": "alert", "alert"} per finding as soon as any agent closes
+    it, {"type": "agent_done"|"agent_error", "agent", ...} per agent, and a
+    final {"type": "done", "scan"} carrying the same payload as run_full_scan.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def drain(name: str):
+        try:
+            async with aclosing(run_single_agent_stream(name)) as events:
+                async for event in events:
+                    await queue.put(event)
+        except Exception as e:
+            logger.error(f"[Immune:{name}] Failed: {e}")
+            await queue.put({"type": "agent_error", "agent": name, "error": str(e)})
+
+    tasks = [asyncio.create_task(drain(name)) for name in AGENT_NAMES]
+    agent_results: dict[str, dict] = {}
+    alert_counts: dict[str, int] = {}
+    try:
+        while len(agent_results) < len(AGENT_NAMES):
+            event = await queue.get()
+            name = event["agent"]
+            if event["type"] == "finding":
+                finding = {**event["finding"], "agent": name}
+                if finding.get("detected", True):
+                    index = alert_counts.get(name, 0)
+                    alert_counts[name] = index + 1
+                    yield {"type": "alert", "alert": _finding_to_alert(finding, index)}
+            elif event["type"] == "agent_done":
+                agent_results[name] = {"agent": name, "findings": event["findings"]}
+                yield {"type": "agent_done", "agent": name, "findings": len(event["findings"])}
+            else:
+                agent_results[name] = {"error": event["error"], "findings": []}
+                yield event
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    yield {"type": "done", "scan": _finish_scan(agent_results)}
+
+
+def _finding_to_alert(f: dict, index: int) -> dict:
+    """Convert an agent finding (tagged with its agent) to alert format.
+
+    index counts alerts per agent so streamed and final alert IDs agree.
+    """
+    return {
+        "id": f"alert-llm-{f['agent']}-{index}",
+        "agent": f["agent"],
+        "severity": f.get("severity", "warning"),
+        "scope": _infer_scope(f),
+        "headline": f.get("headline", "Issue detected"),
+        "detail": f.get("detail", ""),
+        "affected_node_ids": f.get("affected_node_ids", []),
+        "resolution": {
+            "authority": f.get("resolver_id", f.get("supervisor_id", "")),
+            "action": f.get("recommended_action", "Review and take action"),
+        },
+        "estimated_cost": f.get("estimated_cost"),
+        "timestamp": datetime.now().isoformat(),
+        "resolved": False,
+        "llm_generated": True,
+    }
+
+
+def _finish_scan(agent_results: dict[str, dict]) -> dict:
+    """Assemble the scan result from per-agent results and persist it."""
+    all_findings = []
+    for name in AGENT_NAMES:
+        for finding in agent_results.get(name, {}).get("findings", []):
+            finding["agent"] = name
+            all_findings.append(finding)
 
     # Convert findings to alert format
     alerts = []
+    alert_counts: dict[str, int] = {}
     for f in all_findings:
         if f.get("detected", True):
-            alert = {
-                "id": f"alert-llm-{f['agent']}-{len(alerts)}",
-                "agent": f["agent"],
-                "severity": f.get("severity", "warning"),
-                "scope": _infer_scope(f),
-                "headline": f.get("headline", "Issue detected"),
-                "detail": f.get("detail", ""),
-                "affected_node_ids": f.get("affected_node_ids", []),
-                "resolution": {
-                    "authority": f.get("resolver_id", f.get("supervisor_id", "")),
-                    "action": f.get("recommended_action", "Review and take action"),
-                },
-                "estimated_cost": f.get("estimated_cost"),
-                "timestamp": datetime.now().isoformat(),
-                "resolved": False,
-                "llm_generated": True,
-            }
-            alerts.append(alert)
+            index = alert_counts.get(f["agent"], 0)
+            alert_counts[f["agent"]] = index + 1
+            alerts.append(_finding_to_alert(f, index))
 
     scan_result = {
         "timestamp": datetime.now().isoformat(),
@@ -1,8 +1,9 @@
 """Module 3: Automated Information Routing — determine who needs to know and generate personalized summaries."""
 
 import logging
+from contextlib import aclosing
 from .llm.client import get_llm_client
-from .llm.context_builder import ContextBuilder
+from .llm.prompt_layout import org_layout, TASK, DYNAMIC
 from .llm import prompts
 from .supabase_client import get_supabase, is_supabase_configured
 
@@ -13,67 +14,108 @@ _pending_notifications: list[dict] = []
 _notification_history: list[dict] = []
 
 
-async def route_information(knowledge_unit: dict, source_context: str = "") -> dict:
-    """Determine who needs to know about new information and generate personalized summaries."""
-    client = get_llm_client()
-    ctx = ContextBuilder()
-
-    org_summary = ctx.build_org_summary()
-    org_context = ctx.build_org_context()
-
+def _routing_prompts(knowledge_unit: dict, source_context: str) -> tuple[str, str]:
+    """Return (system, user) prompts for routing a knowledge unit."""
     import json
     unit_text = json.dumps(knowledge_unit, indent=2, default=str)
 
-    system = prompts.NEXUS_BASE.format(**org_summary) + "\n\n" + prompts.INFO_ROUTER
+    layout = org_layout()
+    layout.add(TASK, prompts.INFO_ROUTER)
+    layout.add(DYNAMIC, f"New information entering the knowledge graph:\n{unit_text}\n\nAdditional context:\n{source_context}")
+    return layout.build()
+
+
+async def route_information(knowledge_unit: dict, source_context: str = "", model: str | None = None) -> dict:
+    """Determine who needs to know about new information and generate personalized summaries.
+
+    model overrides adaptive routing for this call ("heavy", "fast" or a model name).
+    """
+    client = get_llm_client()
+    system, user = _routing_prompts(knowledge_unit, source_context)
 
     result = await client.complete_json(
         task_type="info_routing",
         system_prompt=system,
-        user_prompt=f"New information entering the knowledge graph:\n{unit_text}\n\nAdditional context:\n{source_context}\n\nOrganizational context:\n{org_context[:6000]}",
+        user_prompt=user,
         use_cache=False,
+        model=model,
     )
 
     routes = result.get("routes", [])
     logger.info(f"[InfoRouter] Routed to {len(routes)} people")
 
-    # Store notifications
     for route in routes:
-        notification = {
-            "person_id": route.get("person_id"),
-            "person_name": route.get("person_name"),
-            "priority": route.get("priority"),
-            "action_required": route.get("action_required", False),
-            "suggested_action": route.get("suggested_action"),
-            "summary": route.get("personalized_summary"),
-            "source_unit": knowledge_unit.get("id", "unknown"),
-            "acknowledged": False,
-        }
-
-        # Persist to Supabase
-        if is_supabase_configured():
-            try:
-                sb = get_supabase()
-                sb.table("notifications").insert({
-                    "person_id": notification["person_id"],
-                    "person_name": notification["person_name"],
-                    "priority": notification["priority"],
-                    "action_required": notification["action_required"],
-                    "suggested_action": notification["suggested_action"],
-                    "summary": notification["summary"],
-                    "source_unit": notification["source_unit"],
-                    "acknowledged": False,
-                }).execute()
-                logger.info(f"[InfoRouter] Notification for {notification['person_id']} persisted to Supabase")
-            except Exception as e:
-                logger.warning(f"[InfoRouter] Failed to persist notification to Supabase: {e}")
-
-        # Always keep in-memory copy as fallback
-        _pending_notifications.append(notification)
-        _notification_history.append(notification)
+        _store_notification(route, knowledge_unit)
 
     return result
 
 
+async def route_information_stream(knowledge_unit: dict, source_context: str = "", model: str | None = None):
+    """Route new information, yielding each route as soon as the model emits it.
+
+    Notifications are stored per route as they arrive. Yields
+    {"type": "route", "route"} events and a final {"type": "done", "result"}.
+    """
+    client = get_llm_client()
+    system, user = _routing_prompts(knowledge_unit, source_context)
+
+    events = client.complete_json_stream(
+        task_type="info_routing",
+        system_prompt=system,
+        user_prompt=user,
+        keys={"routes"},
+        use_cache=False,
+        model=model,
+    )
+    async with aclosing(events):
+        async for event in events:
+            if event["type"] == "item":
+                if not isinstance(event["item"], dict):
+                    logger.warning(f"[InfoRouter] Skipping non-object route: {event['item']!r:.100}")
+                    continue
+                _store_notification(event["item"], knowledge_unit)
+                yield {"type": "route", "route": event["item"]}
+            else:
+                logger.info(f"[InfoRouter] Routed to {len(event['result'].get('routes', []))} people (streamed)")
+                yield {"type": "done", "result": event["result"]}
+
+
+def _store_notification(route: dict, knowledge_unit: dict):
+    """Persist a notification for one route, keeping an in-memory copy."""
+    notification = {
+        "person_id": route.get("person_id"),
+        "person_name": route.get("person_name"),
+        "priority": route.get("priority"),
+        "action_required": route.get("action_required", False),
+        "suggested_action": route.get("suggested_action"),
+        "summary": route.get("personalized_summary"),
+        "source_unit": knowledge_unit.get("id", "unknown"),
+        "acknowledged": False,
+    }
+
+    # Persist to Supabase
+    if is_supabase_configured():
+        try:
+            sb = get_supabase()
+            sb.table("notifications").insert({
+                "person_id": notification["person_id"],
+                "person_name": notification["person_name"],
+                "priority": notification["priority"],
+                "action_required": notification["action_required"],
+                "suggested_action": notification["suggested_action"],
+                "summary": notification["summary"],
+                "source_unit": notification["source_unit"],
+                "acknowledged": False,
+            }).execute()
+            logger.info(f"[InfoRouter] Notification for {notification['person_id']} persisted to Supabase")
+        except Exception as e:
+            logger.warning(f"[InfoRouter] Failed to persist notification to Supabase: {e}")
+
+    # Always keep in-memory copy as fallback
+    _pending_notifications.append(notification)
+    _notification_history.append(notification)
+
+
 def get_pending_notifications(person_id: str | None = None) -> list[dict]:
     """Get pending notifications, optionally filtered by person."""
     if is_supabase_configured():
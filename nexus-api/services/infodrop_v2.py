@@ -16,10 +16,10 @@ async def process_infodrop(text: str) -> dict:
     client = get_llm_client()
     ctx = ContextBuilder()
 
-    org_context = ctx.build_org_context()
+    org_context = ctx.build_org_context(max_tokens=1500)
 
     # Step 1: LLM classification and entity linking
-    system = prompts.INFODROP_CLASSIFIER.format(graph_context=org_context[:6000])
+    system = prompts.INFODROP_CLASSIFIER.format(graph_context=org_context)
 
     result = await client.complete_json(
         task_type="infodrop_classify",
@@ -5,6 +5,7 @@ from datetime import datetime
 from .llm.client import get_llm_client
 from .llm.context_builder import ContextBuilder
 from .llm import prompts
+from .llm.tokens import truncate_to_tokens
 
 logger = logging.getLogger("nexus.ingest")
 
@@ -15,7 +16,7 @@ async def classify_text(text: str) -> dict:
     result = await client.complete_json(
         task_type="classify",
         system_prompt=prompts.CLASSIFIER,
-        user_prompt=text[:4000],  # Truncate for token limits
+        user_prompt=truncate_to_tokens(text, 1000),  # Truncate for token limits
     )
     return result
 
@@ -36,7 +37,7 @@ async def extract_entities(text: str, source_type: str = "unknown", source_id: s
     result = await client.complete_json(
         task_type="extract_entities",
         system_prompt=system,
-        user_prompt=f"Source type: {source_type}\nSource ID: {source_id or 'unknown'}\n\nText:\n{text[:6000]}",
+        user_prompt=f"Source type: {source_type}\nSource ID: {source_id or 'unknown'}\n\nText:\n{truncate_to_tokens(text, 1500)}",
     )
     return result
 
@@ -51,7 +52,7 @@ async def extract_relationships(entities: list[dict], existing_context: str) ->
     result = await client.complete_json(
         task_type="relationship_extraction",
         system_prompt=prompts.RELATIONSHIP_EXTRACTOR,
-        user_prompt=f"Extracted entities:\n{entities_text}\n\nExisting knowledge graph:\n{existing_context[:8000]}",
+        user_prompt=f"Extracted entities:\n{entities_text}\n\nExisting knowledge graph:\n{truncate_to_tokens(existing_context, 2000)}",
     )
     return result
 
@@ -78,7 +79,7 @@ async def full_ingest_pipeline(
 
     # Step 3: Deep relationship analysis (heavy model)
     ctx = ContextBuilder()
-    knowledge_context = ctx.build_knowledge_context()
+    knowledge_context = ctx.build_knowledge_context(max_tokens=2000)
     deep_rels = await extract_relationships(entities, knowledge_context)
     additional_rels = deep_rels.get("relationships", [])
     contradictions = deep_rels.get("contradictions", [])
@@ -0,0 +1,153 @@
+"""BM25 inverted index for keyword search over graph nodes.
+
+Text is lowercased and split into alphanumeric tokens, minus stop words.
+Each term keeps a posting list of {doc_id: term frequency}, so a query
+only touches the documents that share a term with it and is scored with
+Okapi BM25 (k1=1.2, b=0.75).
+
+get_node_index() is the shared index over every node's text. It is built
+on first use and kept current through graph_manager's node listener:
+changed nodes are queued and re-tokenized on the next lookup.
+"""
+
+import re
+import math
+import heapq
+import logging
+import threading
+from collections import Counter
+
+logger = logging.getLogger("nexus.lexical_index")
+
+STOP_WORDS = frozenset({
+    "a", "about", "an", "and", "are", "at", "but", "did", "do", "does",
+    "for", "how", "in", "is", "it", "of", "on", "or", "not", "that",
+    "the", "this", "to", "was", "were", "what", "when", "who", "why",
+})
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased alphanumeric tokens of text, without stop words."""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOP_WORDS]
+
+
+class LexicalIndex:
+    """Posting lists with per-document lengths, supporting replace and removal."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: dict[str, dict[str, int]] = {}  # term -> {doc_id: tf}
+        self._doc_terms: dict[str, tuple[str, ...]] = {}  # doc_id -> its distinct terms
+        self._doc_len: dict[str, int] = {}
+        self._total_len = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_len
+
+    def add(self, doc_id: str, text: str) -> None:
+        """Index text under doc_id, replacing any previous text."""
+        counts = Counter(tokenize(text))
+        with self._lock:
+            self._remove(doc_id)
+            for term, tf in counts.items():
+                self._postings.setdefault(term, {})[doc_id] = tf
+            self._doc_terms[doc_id] = tuple(counts)
+            length = sum(counts.values())
+            self._doc_len[doc_id] = length
+            self._total_len += length
+
+    def remove(self, doc_id: str) -> bool:
+        """Drop doc_id; returns whether it was indexed."""
+        with self._lock:
+            return self._remove(doc_id)
+
+    def _remove(self, doc_id: str) -> bool:
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return False
+        for term in terms:
+            posting = self._postings[term]
+            del posting[doc_id]
+            if not posting:
+                del self._postings[term]
+        self._total_len -= self._doc_len.pop(doc_id)
+        return True
+
+    def search(
+        self, query: str, top_k: int = 20, min_match: int = 1, allowed: set[str] | None = None
+    ) -> list[tuple[str, float]]:
+        """Top-k (doc_id, BM25 score), best first.
+
+        min_match drops documents sharing fewer distinct terms with the query;
+        allowed, if given, restricts scoring to those doc_ids.
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            n = len(self._doc_len)
+            if not terms or not n or top_k <= 0:
+                return []
+            avg_len = self._total_len / n or 1.0
+            # BM25 length normalization: k1 * (1 - b + b * len / avg_len), split into its two terms
+            base, per_token = self.k1 * (1 - self.b), self.k1 * self.b / avg_len
+            doc_len = self._doc_len
+            scores: dict[str, float] = {}
+            matched: Counter = Counter()
+            for term in terms:
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                weight = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5)) * (self.k1 + 1)
+                docs = posting.keys() if allowed is None else posting.keys() & allowed
+                for doc_id in docs:
+                    tf = posting[doc_id]
+                    scores[doc_id] = scores.get(doc_id, 0.0) + weight * tf / (tf + base + per_token * doc_len[doc_id])
+                if min_match > 1:
+                    matched.update(docs)
+        if min_match > 1:
+            scores = {doc_id: s for doc_id, s in scores.items() if matched[doc_id] >= min_match}
+        return heapq.nlargest(top_k, scores.items(), key=lambda kv: kv[1])
+
+
+# ── Shared node index ────────────────────────────────────────────────────────
+
+_node_index: LexicalIndex | None = None
+_pending: set[str] = set()
+_build_lock = threading.Lock()
+
+
+def _on_nodes_changed(node_ids: list[str]):
+    _pending.update(node_ids)
+
+
+def get_node_index() -> LexicalIndex:
+    """BM25 index over every graph node's text, with queued node changes applied."""
+    global _node_index
+    from .llm.context_builder import ContextBuilder
+
+    with _build_lock:
+        if _node_index is None:
+            from .graph_manager import add_node_listener
+            add_node_listener(_on_nodes_changed)
+            _pending.clear()
+            index = LexicalIndex()
+            for node_id, text in ContextBuilder().get_all_node_texts():
+                index.add(node_id, text)
+            _node_index = index
+            logger.info(f"[LexicalIndex] Indexed {len(index)} nodes")
+        elif _pending:
+            ids = list(_pending)
+            _pending.difference_update(ids)
+            texts = ContextBuilder().get_node_texts(ids)
+            for node_id in ids:
+                if node_id in texts:
+                    _node_index.add(node_id, texts[node_id])
+                else:
+                    _node_index.remove(node_id)
+    return _node_index
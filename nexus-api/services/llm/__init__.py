@@ -1,6 +1,13 @@
-from .client import LLMClient, get_llm_client
+from .client import LLMClient, get_llm_client, is_llm_configured
 from .context_builder import ContextBuilder
 from .embeddings import EmbeddingService
+from .quantized_index import QuantizedIndex
+from .router import ModelRouter, get_model_router
+from .tokens import ContextBudget, count_tokens
 from .usage import UsageTracker
+from .vector_index import VectorIndex
 
-__all__ = ["LLMClient", "get_llm_client", "ContextBuilder", "EmbeddingService", "UsageTracker"]
+__all__ = [
+    "LLMClient", "get_llm_client", "is_llm_configured", "ContextBuilder", "ContextBudget", "count_tokens",
+    "EmbeddingService", "ModelRouter", "QuantizedIndex", "get_model_router", "UsageTracker", "VectorIndex",
+]
@@ -0,0 +1,278 @@
+"""Record-and-replay cassettes for LLM calls.
+
+A cassette is a JSONL file (gzip-compressed when the path ends in .gz) with
+one entry per provider call, keyed by a fingerprint of the request. In
+record mode the real client is called and each response is appended along
+with its latency, or per-chunk timings for streams. In replay mode recorded
+responses are served back with their original latencies, optionally scaled,
+so end-to-end workloads can be benchmarked without tokens or provider noise.
+
+Embeddings are recorded per input text rather than per request, so a replay
+can serve any grouping of recorded texts. Which texts share a request
+depends on timing: concurrent batches, coalesced or cached query
+embeddings, and debounced re-embeds after graph mutations. Chat requests
+are keyed by their full content. Prompts that depend on how calls
+interleave can still miss when replayed at a different concurrency:
+queries racing the cold index build retrieve by keyword, and ingest
+mutates the graph that rag reads. Record and replay at the same
+--concurrency, or at 1 for an exact replay.
+
+Enabled through the environment:
+    NEXUS_LLM_CASSETTE                path to the cassette file
+    NEXUS_LLM_CASSETTE_MODE           replay (default) | record | auto
+    NEXUS_LLM_CASSETTE_LATENCY_SCALE  multiplier on recorded latencies (default 1.0)
+
+auto replays when a recording exists and records otherwise.
+"""
+
+import os
+import gzip
+import json
+import time
+import base64
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import defaultdict
+
+import numpy as np
+from openai.types import CreateEmbeddingResponse
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+logger = logging.getLogger("nexus.llm.cassette")
+
+MODES = ("replay", "record", "auto")
+
+
+class CassetteMiss(RuntimeError):
+    """Raised in replay mode when a request has no recording."""
+
+
+def fingerprint(kind: str, request: dict) -> str:
+    """Stable hash of a provider request."""
+    canonical = json.dumps({"kind": kind, **request}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _pack_floats(values: list[float]) -> str:
+    return base64.b64encode(np.asarray(values, dtype="<f4").tobytes()).decode()
+
+
+def _unpack_floats(packed: str) -> list[float]:
+    return np.frombuffer(base64.b64decode(packed), dtype="<f4").tolist()
+
+
+class Cassette:
+    """Recorded provider responses, appended to and served from one file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: dict[str, list[dict]] = defaultdict(list)
+        self._cursor: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._load()
+
+    def _open(self, mode: str):
+        if self.path.endswith(".gz"):
+            return gzip.open(self.path, mode + "t", encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        count = 0
+        with self._open("r") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries[entry["fp"]].append(entry)
+                    count += 1
+        logger.info(f"[Cassette] Loaded {count} recordings ({len(self._entries)} distinct requests) from {self.path}")
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._entries.values())
+
+    def lookup(self, fp: str) -> dict | None:
+        """Next recording for a fingerprint; repeated requests cycle through recordings in order."""
+        entries = self._entries.get(fp)
+        if not entries:
+            return None
+        with self._lock:
+            entry = entries[self._cursor[fp] % len(entries)]
+            self._cursor[fp] += 1
+        return entry
+
+    def append(self, entry: dict):
+        self.extend([entry])
+
+    def extend(self, entries: list[dict]):
+        with self._lock:
+            for entry in entries:
+                self._entries[entry["fp"]].append(entry)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # gzip files tolerate appended members, so both formats append in place
+            with self._open("a") as f:
+                f.writelines(json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries)
+
+
+class CassetteClient:
+    """Stands in for AsyncOpenAI, recording or replaying chat and embedding calls.
+
+    Exposes the subset LLMClient uses: chat.completions.create (streaming
+    and non-streaming) and embeddings.create.
+    """
+
+    def __init__(self, inner, cassette: Cassette, mode: str = "replay", latency_scale: float = 1.0):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r}, expected one of {MODES}")
+        self.inner = inner
+        self.cassette = cassette
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.stats = {"hits": 0, "misses": 0, "recorded": 0}
+        self.chat = _Namespace(completions=_Namespace(create=self._create_chat))
+        self.embeddings = _Namespace(create=self._create_embeddings)
+
+    # ── Dispatch ─────────────────────────────────────────────────────────────
+
+    def _recording_for(self, fp: str) -> dict | None:
+        if self.mode == "record":
+            return None
+        entry = self.cassette.lookup(fp)
+        if entry is not None:
+            self.stats["hits"] += 1
+            return entry
+        self.stats["misses"] += 1
+        if self.mode == "replay":
+            raise CassetteMiss(f"No cassette recording for request {fp[:12]}")
+        return None
+
+    def _require_inner(self):
+        if self.inner is None:
+            raise RuntimeError("Cassette recording needs a live client — set OPENAI_API_KEY or NEXUS_LLM_BASE_URL")
+        return self.inner
+
+    async def _sleep(self, seconds: float):
+        if seconds > 0 and self.latency_scale > 0:
+            await asyncio.sleep(seconds * self.latency_scale)
+
+    # ── Chat completions ─────────────────────────────────────────────────────
+
+    async def _create_chat(self, **kwargs):
+        fp = fingerprint("chat", kwargs)
+        entry = self._recording_for(fp)
+        if entry is not None:
+            if kwargs.get("stream"):
+                return self._replay_stream(entry)
+            await self._sleep(entry["latency"])
+            return ChatCompletion.model_validate(entry["response"])
+
+        inner = self._require_inner()
+        start = time.perf_counter()
+        resp = await inner.chat.completions.create(**kwargs)
+        if kwargs.get("stream"):
+            return self._record_stream(fp, resp, start)
+
+        self._record({
+            "fp": fp,
+            "kind": "chat",
+            "latency": round(time.perf_counter() - start, 4),
+            "response": resp.model_dump(exclude_none=True),
+        })
+        return resp
+
+    async def _replay_stream(self, entry: dict):
+        for offset, chunk in entry["chunks"]:
+            await self._sleep(offset)
+            yield ChatCompletionChunk.model_validate(chunk)
+
+    async def _record_stream(self, fp: str, stream, start: float):
+        chunks = []
+        last = start
+        completed = False
+        try:
+            async for chunk in stream:
+                now = time.perf_counter()
+                chunks.append([round(now - last, 4), chunk.model_dump(exclude_none=True)])
+                last = now
+                yield chunk
+            completed = True
+        finally:
+            await stream.close()
+            # A stream abandoned by the consumer is not a faithful recording
+            if completed:
+                self._record({"fp": fp, "kind": "chat_stream", "chunks": chunks})
+
+    # ── Embeddings ───────────────────────────────────────────────────────────
+
+    async def _create_embeddings(self, **kwargs):
+        texts = kwargs["input"]
+        texts = [texts] if isinstance(texts, str) else list(texts)
+        params = {k: v for k, v in kwargs.items() if k != "input"}
+        fps = [fingerprint("embedding", {**params, "input": text}) for text in texts]
+
+        if self.mode != "record":
+            entries = [self.cassette.lookup(fp) for fp in fps]
+            if all(entries):
+                self.stats["hits"] += 1
+                await self._sleep(max(e["latency"] for e in entries))
+                tokens = sum(e["tokens"] for e in entries)
+                return CreateEmbeddingResponse.model_validate({
+                    "object": "list",
+                    "model": entries[0]["model"],
+                    "data": [
+                        {"object": "embedding", "index": i, "embedding": _unpack_floats(e["embedding"])}
+                        for i, e in enumerate(entries)
+                    ],
+                    "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+                })
+            self.stats["misses"] += 1
+            if self.mode == "replay":
+                missing = next(fp for fp, e in zip(fps, entries) if e is None)
+                raise CassetteMiss(f"No cassette recording for embedding input {missing[:12]}")
+
+        inner = self._require_inner()
+        start = time.perf_counter()
+        resp = await inner.embeddings.create(**kwargs)
+        latency = round(time.perf_counter() - start, 4)
+        # Usage is per request; spread it over the inputs by length
+        total_tokens = resp.usage.total_tokens if resp.usage else 0
+        total_chars = sum(len(text) for text in texts) or 1
+        self._record(*(
+            {
+                "fp": fp,
+                "kind": "embedding",
+                "latency": latency,
+                "model": resp.model,
+                "tokens": round(total_tokens * len(text) / total_chars),
+                "embedding": _pack_floats(d.embedding),
+            }
+            for fp, text, d in zip(fps, texts, sorted(resp.data, key=lambda d: d.index))
+        ))
+        return resp
+
+    def _record(self, *entries: dict):
+        self.cassette.extend(list(entries))
+        self.stats["recorded"] += len(entries)
+
+
+class _Namespace:
+    def __init__(self, **attrs):
+        self.__dict__.update(attrs)
+
+
+def is_cassette_enabled() -> bool:
+    return bool(os.getenv("NEXUS_LLM_CASSETTE"))
+
+
+def cassette_client_from_env(inner) -> CassetteClient:
+    """Wrap a provider client (or None for pure replay) per NEXUS_LLM_CASSETTE_* settings."""
+    path = os.getenv("NEXUS_LLM_CASSETTE")
+    mode = os.getenv("NEXUS_LLM_CASSETTE_MODE", "replay")
+    scale = float(os.getenv("NEXUS_LLM_CASSETTE_LATENCY_SCALE", "1.0"))
+    client = CassetteClient(inner, Cassette(path), mode=mode, latency_scale=scale)
+    logger.info(f"[Cassette] {mode} mode on {path} (latency x{scale})")
+    return client
@@ -1,41 +1,26 @@
 """Centralized OpenAI LLM client with model routing, caching, retries, and usage tracking."""
 
 import os
-import json
+import time
 import hashlib
 import asyncio
 import logging
+from contextlib import aclosing, asynccontextmanager
 from typing import AsyncGenerator
 
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
+from .. import metrics
+from .cassette import CassetteMiss, cassette_client_from_env, is_cassette_enabled
+from .json_stream import JSONArrayStreamParser, parse_json_text
+from .router import FAST_TASKS, HEAVY_TASKS, get_model_router, route_model  # noqa: F401 — re-exported
+from .tokens import count_tokens
 from .usage import UsageTracker
 
 load_dotenv()
 logger = logging.getLogger("nexus.llm")
 
-# ── Model routing ────────────────────────────────────────────────────────────
-
-HEAVY_TASKS = {
-    "immune_agent", "briefing", "onboarding", "task_scheduling",
-    "conflict_analysis", "contradiction_detection", "executive_summary",
-    "complex_ask", "decision_chain_analysis", "relationship_extraction",
-    "info_routing", "worker_analysis",
-}
-
-FAST_TASKS = {
-    "classify", "extract_entities", "route_info", "simple_ask",
-    "infodrop_classify", "summarize_short", "dedup_check",
-}
-
-
-def route_model(task_type: str) -> str:
-    if task_type in FAST_TASKS:
-        return os.getenv("NEXUS_MODEL_FAST", "gpt-4o-mini")
-    return os.getenv("NEXUS_MODEL_HEAVY", "gpt-4o")
-
-
 # ── Response cache ───────────────────────────────────────────────────────────
 
 class ResponseCache:
@@ -65,14 +50,61 @@ class ResponseCache:
 
 # ── Main client ──────────────────────────────────────────────────────────────
 
+def is_llm_configured() -> bool:
+    """True if an API key, an OpenAI-compatible base URL (e.g. llm_stub) or a cassette is set."""
+    return bool(os.getenv("OPENAI_API_KEY") or os.getenv("NEXUS_LLM_BASE_URL") or is_cassette_enabled())
+
+
 class LLMClient:
     def __init__(self):
         api_key = os.getenv("OPENAI_API_KEY")
-        self.client = AsyncOpenAI(api_key=api_key) if api_key else None
+        base_url = os.getenv("NEXUS_LLM_BASE_URL")
+        # A local stand-in (llm_stub.py) needs a base URL but no real key
+        self.client = (
+            AsyncOpenAI(api_key=api_key or "nexus-local", base_url=base_url or None)
+            if api_key or base_url else None
+        )
+        if is_cassette_enabled():
+            self.client = cassette_client_from_env(self.client)
         self.cache = ResponseCache(ttl=int(os.getenv("NEXUS_LLM_CACHE_TTL", "300")))
         self.usage = UsageTracker()
         self.max_retries = int(os.getenv("NEXUS_LLM_MAX_RETRIES", "3"))
         self.timeout = int(os.getenv("NEXUS_LLM_TIMEOUT", "30"))
+        self.first_token_timeout = float(os.getenv("NEXUS_LLM_FIRST_TOKEN_TIMEOUT", str(self.timeout)))
+        self.stream_idle_timeout = float(os.getenv("NEXUS_LLM_STREAM_IDLE_TIMEOUT", "15"))
+        self._slots = asyncio.Semaphore(int(os.getenv("NEXUS_LLM_MAX_CONCURRENCY", "16")))
+        self.router = get_model_router()
+        # Hedged requests for latency-critical non-streamed calls
+        self.hedge_tasks = {
+            t.strip() for t in os.getenv("NEXUS_LLM_HEDGE_TASKS", "complex_ask,infodrop_classify").split(",") if t.strip()
+        }
+        self.hedge_percentile = float(os.getenv("NEXUS_LLM_HEDGE_PERCENTILE", "0.95"))
+        self.hedge_budget = float(os.getenv("NEXUS_LLM_HEDGE_BUDGET", "0.05"))
+        self.hedge_min_delay = float(os.getenv("NEXUS_LLM_HEDGE_MIN_DELAY", "0.5"))
+        self.hedge_min_samples = int(os.getenv("NEXUS_LLM_HEDGE_MIN_SAMPLES", "20"))
+        self._hedge_eligible = 0
+        self._hedges_fired = 0
+        # Embedding batches are cut by token count and sent concurrently
+        self.embed_batch_tokens = int(os.getenv("NEXUS_EMBED_BATCH_TOKENS", "50000"))
+        self.embed_batch_items = int(os.getenv("NEXUS_EMBED_BATCH_ITEMS", "512"))
+        self.embed_concurrency = int(os.getenv("NEXUS_EMBED_CONCURRENCY", "4"))
+
+    @asynccontextmanager
+    async def _slot(self, model: str):
+        """Hold one of the NEXUS_LLM_MAX_CONCURRENCY provider slots, recording queue wait."""
+        queued_at = time.perf_counter()
+        metrics.LLM_QUEUED.inc(model=model)
+        try:
+            await self._slots.acquire()
+        finally:
+            metrics.LLM_QUEUED.dec(model=model)
+        metrics.LLM_QUEUE_WAIT_SECONDS.observe(time.perf_counter() - queued_at, model=model)
+        metrics.LLM_IN_FLIGHT.inc(model=model)
+        try:
+            yield
+        finally:
+            metrics.LLM_IN_FLIGHT.dec(model=model)
+            self._slots.release()
 
     async def complete(
         self,
@@ -84,22 +116,39 @@ class LLMClient:
         max_tokens: int = 4096,
         stream: bool = False,
         use_cache: bool = True,
+        model: str | None = None,
+        history: list[dict] | None = None,
     ) -> str:
-        """Make a completion call with model routing, caching, and retries."""
-        model = route_model(task_type)
+        """Make a completion call with model routing, caching, and retries.
+
+        model overrides routing for this call: "heavy", "fast" or a model name.
+        history is a list of earlier {role, content} turns, sent between the
+        system prompt and user_prompt; calls with history are not cached.
+        """
+        history = history or []
+        if history:
+            use_cache = False
+        prompt_tokens = (
+            count_tokens(system_prompt + user_prompt + "".join(m["content"] for m in history))
+            if task_type in self.router.downgradable else 0
+        )
+        model = self.router.route(task_type, override=model, prompt_tokens=prompt_tokens).model
+        start = time.perf_counter()
 
         # Check cache
         if use_cache and not stream:
             cached = self.cache.get(model, system_prompt, user_prompt)
+            metrics.LLM_CACHE.inc(task_type=task_type, result="hit" if cached else "miss")
             if cached:
                 logger.info(f"[LLM] Cache hit for {task_type}")
                 return cached
 
         if not self.client:
-            raise RuntimeError("OpenAI client not initialized — set OPENAI_API_KEY")
+            raise RuntimeError("OpenAI client not initialized — set OPENAI_API_KEY or NEXUS_LLM_BASE_URL")
 
         messages = [
             {"role": "system", "content": system_prompt},
+            *({"role": m["role"], "content": m["content"]} for m in history),
             {"role": "user", "content": user_prompt},
         ]
 
@@ -118,38 +167,124 @@ class LLMClient:
         for attempt in range(self.max_retries):
             try:
                 if stream:
-                    return await self._stream(kwargs)
+                    return self._stream(kwargs, task_type)
 
-                resp = await asyncio.wait_for(
-                    self.client.chat.completions.create(**kwargs),
-                    timeout=self.timeout,
-                )
+                if task_type in self.hedge_tasks:
+                    resp = await self._create_hedged(model, task_type, kwargs)
+                else:
+                    resp = await self._create(model, task_type, kwargs)
                 content = resp.choices[0].message.content or ""
 
                 # Track usage
+                cached_tokens = 0
                 if resp.usage:
+                    details = getattr(resp.usage, "prompt_tokens_details", None)
+                    cached_tokens = getattr(details, "cached_tokens", 0) or 0
                     self.usage.record(
                         model=model,
                         input_tokens=resp.usage.prompt_tokens,
                         output_tokens=resp.usage.completion_tokens,
                         task_type=task_type,
+                        cached_tokens=cached_tokens,
                     )
+                    self._count_tokens(model, task_type, resp.usage.prompt_tokens, cached_tokens, resp.usage.completion_tokens)
 
                 # Cache result
                 if use_cache:
                     self.cache.put(model, system_prompt, user_prompt, content)
 
-                logger.info(f"[LLM] {task_type} via {model} — {resp.usage.prompt_tokens}+{resp.usage.completion_tokens} tokens")
+                logger.info(
+                    f"[LLM] {task_type} via {model} — {resp.usage.prompt_tokens}+{resp.usage.completion_tokens} tokens"
+                    f" ({cached_tokens} cached)"
+                )
+                elapsed = time.perf_counter() - start
+                metrics.LLM_REQUEST_SECONDS.observe(elapsed, model=model, task_type=task_type, outcome="ok")
+                self.router.record_outcome(model, task_type, elapsed, ok=True)
                 return content
 
+            except CassetteMiss:
+                raise
             except Exception as e:
                 last_error = e
+                metrics.LLM_ERRORS.inc(model=model, task_type=task_type, error=type(e).__name__)
+                self.router.record_outcome(model, task_type, time.perf_counter() - start, ok=False)
                 logger.warning(f"[LLM] Attempt {attempt+1}/{self.max_retries} failed: {e}")
                 if attempt < self.max_retries - 1:
-                    await asyncio.sleep(1 * (attempt + 1))
+                    backoff = 1 * (attempt + 1)
+                    metrics.LLM_RETRIES.inc(model=model, task_type=task_type)
+                    metrics.LLM_RETRY_WAIT_SECONDS.inc(backoff, model=model, task_type=task_type)
+                    await asyncio.sleep(backoff)
 
+        metrics.LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, model=model, task_type=task_type, outcome="error")
         raise RuntimeError(f"LLM call failed after {self.max_retries} attempts: {last_error}")
 
+    async def _create(self, model: str, task_type: str, kwargs: dict):
+        """One provider attempt holding a concurrency slot."""
+        async with self._slot(model):
+            attempt_start = time.perf_counter()
+            cancelled = False
+            try:
+                return await asyncio.wait_for(self.client.chat.completions.create(**kwargs), timeout=self.timeout)
+            except asyncio.CancelledError:
+                cancelled = True
+                raise
+            finally:
+                # A hedge loser's cancelled attempt would skew the latency the hedge delay is derived from
+                if not cancelled:
+                    metrics.LLM_ATTEMPT_SECONDS.observe(time.perf_counter() - attempt_start, model=model, task_type=task_type)
+
+    def _hedge_delay(self, model: str, task_type: str) -> float | None:
+        """How long to wait before hedging, or None if hedging is not possible right now."""
+        labels = {"model": model, "task_type": task_type}
+        if metrics.LLM_ATTEMPT_SECONDS.count(**labels) < self.hedge_min_samples:
+            return None
+        q = metrics.LLM_ATTEMPT_SECONDS.quantiles((self.hedge_percentile,), **labels)
+        if not q:
+            return None
+        return max(q[self.hedge_percentile], self.hedge_min_delay)
+
+    async def _create_hedged(self, model: str, task_type: str, kwargs: dict):
+        """Issue the attempt, and a duplicate if it outlives the hedge delay; first success wins.
+
+        Hedges are capped at NEXUS_LLM_HEDGE_BUDGET of hedge-eligible calls and
+        skipped while calls are already queueing for a slot, since a duplicate
+        then only adds load. The losing request is cancelled.
+        """
+        delay = self._hedge_delay(model, task_type)
+        self._hedge_eligible += 1
+        if delay is None:
+            return await self._create(model, task_type, kwargs)
+
+        primary = asyncio.create_task(self._create(model, task_type, kwargs))
+        hedge = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                return primary.result()
+            if self._hedges_fired >= self.hedge_budget * self._hedge_eligible or metrics.LLM_QUEUED.get(model=model) > 0:
+                metrics.LLM_HEDGES.inc(model=model, task_type=task_type, result="skipped")
+                return await primary
+
+            self._hedges_fired += 1
+            metrics.LLM_HEDGES.inc(model=model, task_type=task_type, result="fired")
+            logger.info(f"[LLM] Hedging {task_type} via {model} after {delay:.2f}s")
+            hedge = asyncio.create_task(self._create(model, task_type, kwargs))
+            pending = {primary, hedge}
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        winner = "hedge_won" if task is hedge else "primary_won"
+                        metrics.LLM_HEDGES.inc(model=model, task_type=task_type, result=winner)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+
     async def complete_json(
         self,
         task_type: str,
@@ -165,46 +300,262 @@ class LLMClient:
             response_format={"type": "json_object"},
             **kwargs,
         )
-        # Strip markdown fences if present
-        text = raw.strip()
-        if text.startswith("```"):
-            lines = text.split("\n")
-            lines = [l for l in lines if not l.strip().startswith("```")]
-            text = "\n".join(lines)
-        return json.loads(text)
-
-    async def _stream(self, kwargs: dict) -> AsyncGenerator[str, None]:
-        """Stream tokens via async generator."""
+        return parse_json_text(raw)
+
+    async def complete_json_stream(
+        self,
+        task_type: str,
+        system_prompt: str,
+        user_prompt: str,
+        keys: set[str] | None = None,
+        **kwargs,
+    ) -> AsyncGenerator[dict, None]:
+        """Stream a JSON completion, yielding array elements as they close.
+
+        Yields {"type": "item", "key": <array key>, "item": <element>} for each
+        completed element of a top-level array (optionally only for the given
+        keys), then a final {"type": "result", "result": <parsed object>}.
+        """
+        parser = JSONArrayStreamParser(keys)
+        tokens = await self.complete(
+            task_type=task_type,
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            response_format={"type": "json_object"},
+            stream=True,
+            **kwargs,
+        )
+        async with aclosing(tokens):
+            async for token in tokens:
+                for key, item in parser.feed(token):
+                    yield {"type": "item", "key": key, "item": item}
+        yield {"type": "result", "result": parser.result()}
+
+    async def _stream(self, kwargs: dict, task_type: str) -> AsyncGenerator[str, None]:
+        """Stream tokens via async generator, with the same accounting as complete().
+
+        Usage arrives in the final chunk and is recorded through UsageTracker.
+        Failures before the first token are retried; once tokens have been
+        yielded a failure is raised to the consumer. The upstream stream is
+        always closed, including when the consumer stops early (e.g. an SSE
+        client disconnects), in which case usage is estimated from the prompt
+        and the text produced so far.
+        """
+        model = kwargs["model"]
         kwargs["stream"] = True
-        stream = await self.client.chat.completions.create(**kwargs)
-        async for chunk in stream:
-            delta = chunk.choices[0].delta
-            if delta.content:
-                yield delta.content
-
-    async def embed(self, texts: list[str], model: str | None = None) -> list[list[float]]:
-        """Generate embeddings for a list of texts."""
+        kwargs["stream_options"] = {"include_usage": True}
+        start = time.perf_counter()
+        last_error = None
+
+        for attempt in range(self.max_retries):
+            first_token_at = None
+            last_token_at = None
+            chunks = 0
+            emitted: list[str] = []
+            usage = None
+            outcome = "error"
+            try:
+                async with self._slot(model):
+                    stream = await asyncio.wait_for(
+                        self.client.chat.completions.create(**kwargs),
+                        timeout=self.timeout,
+                    )
+                    try:
+                        chunk_iter = stream.__aiter__()
+                        while True:
+                            # Waiting for the first token can take as long as a whole
+                            # call; between tokens a shorter idle timeout applies
+                            wait = self.first_token_timeout if first_token_at is None else self.stream_idle_timeout
+                            try:
+                                chunk = await asyncio.wait_for(chunk_iter.__anext__(), timeout=wait)
+                            except StopAsyncIteration:
+                                break
+                            if chunk.usage:
+                                usage = chunk.usage
+                            if not chunk.choices:
+                                continue
+                            content = chunk.choices[0].delta.content
+                            if not content:
+                                continue
+                            now = time.perf_counter()
+                            if first_token_at is None:
+                                first_token_at = now
+                                metrics.LLM_TTFT_SECONDS.observe(now - start, model=model, task_type=task_type)
+                            else:
+                                metrics.LLM_INTER_TOKEN_SECONDS.observe(now - last_token_at, model=model, task_type=task_type)
+                            last_token_at = now
+                            chunks += 1
+                            emitted.append(content)
+                            yield content
+                        outcome = "ok"
+                    except (asyncio.CancelledError, GeneratorExit):
+                        outcome = "cancelled"
+                        raise
+                    finally:
+                        await stream.aclose()
+                        if outcome != "ok" and emitted:
+                            # The provider bills what it generated even if we stop reading
+                            self._record_stream_usage(model, task_type, kwargs, None, "".join(emitted))
+                        self._observe_stream(model, task_type, start, first_token_at, chunks, usage, outcome)
+
+                self._record_stream_usage(model, task_type, kwargs, usage, "".join(emitted))
+                return
+
+            except CassetteMiss:
+                raise
+            except Exception as e:
+                if emitted:
+                    raise RuntimeError(f"LLM stream failed after {chunks} chunks: {e}") from e
+                last_error = e
+                metrics.LLM_ERRORS.inc(model=model, task_type=task_type, error=type(e).__name__)
+                self.router.record_outcome(model, task_type, time.perf_counter() - start, ok=False)
+                logger.warning(f"[LLM] Stream attempt {attempt+1}/{self.max_retries} failed: {e!r}")
+                if attempt < self.max_retries - 1:
+                    backoff = 1 * (attempt + 1)
+                    metrics.LLM_RETRIES.inc(model=model, task_type=task_type)
+                    metrics.LLM_RETRY_WAIT_SECONDS.inc(backoff, model=model, task_type=task_type)
+                    await asyncio.sleep(backoff)
+
+        raise RuntimeError(f"LLM stream failed after {self.max_retries} attempts: {last_error}")
+
+    def _observe_stream(self, model, task_type, start, first_token_at, chunks, usage, outcome):
+        end = time.perf_counter()
+        # Without usage, assume roughly one token per content chunk
+        output_tokens = usage.completion_tokens if usage else chunks
+        if first_token_at is not None and output_tokens > 1 and end > first_token_at:
+            metrics.LLM_TOKENS_PER_SECOND.observe((output_tokens - 1) / (end - first_token_at), model=model, task_type=task_type)
+        metrics.LLM_REQUEST_SECONDS.observe(end - start, model=model, task_type=task_type, outcome=outcome)
+        if outcome == "ok":
+            self.router.record_outcome(model, task_type, end - start, ok=True)
+            ttft = f"{first_token_at - start:.2f}s" if first_token_at is not None else "n/a"
+            logger.info(f"[LLM] {task_type} stream via {model} — ttft {ttft}, {end - start:.2f}s total")
+
+    def _record_stream_usage(self, model: str, task_type: str, kwargs: dict, usage, output_text: str):
+        """Record a streamed call's usage, estimating it when the final usage chunk never arrived."""
+        if usage:
+            details = getattr(usage, "prompt_tokens_details", None)
+            cached_tokens = getattr(details, "cached_tokens", 0) or 0
+            input_tokens, output_tokens = usage.prompt_tokens, usage.completion_tokens
+        else:
+            cached_tokens = 0
+            input_tokens = sum(count_tokens(m["content"], model) for m in kwargs["messages"])
+            output_tokens = count_tokens(output_text, model)
+        self.usage.record(
+            model=model,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            task_type=task_type,
+            cached_tokens=cached_tokens,
+        )
+        self._count_tokens(model, task_type, input_tokens, cached_tokens, output_tokens)
+        logger.info(
+            f"[LLM] {task_type} via {model} (stream) — {input_tokens}+{output_tokens} tokens"
+            f" ({cached_tokens} cached){'' if usage else ' estimated'}"
+        )
+
+    @staticmethod
+    def _count_tokens(model: str, task_type: str, input_tokens: int, cached_tokens: int, output_tokens: int):
+        metrics.LLM_TOKENS.inc(input_tokens, model=model, task_type=task_type, kind="input")
+        metrics.LLM_TOKENS.inc(cached_tokens, model=model, task_type=task_type, kind="cached")
+        metrics.LLM_TOKENS.inc(output_tokens, model=model, task_type=task_type, kind="output")
+
+    async def embed(self, texts: list[str], model: str | None = None, dimensions: int | None = None) -> list[list[float]]:
+        """Generate embeddings for a list of texts.
+
+        dimensions (default NEXUS_EMBEDDING_DIMENSIONS) asks text-embedding-3
+        models for shortened vectors; unset keeps the model's native size.
+
+        Texts are cut into batches of at most NEXUS_EMBED_BATCH_TOKENS tokens
+        and NEXUS_EMBED_BATCH_ITEMS texts, up to NEXUS_EMBED_CONCURRENCY of
+        which are in flight at once; results come back in input order.
+        """
         if not self.client:
             raise RuntimeError("OpenAI client not initialized")
 
         emb_model = model or os.getenv("NEXUS_EMBEDDING_MODEL", "text-embedding-3-large")
-
-        # Batch in groups of 100
-        all_embeddings = []
-        for i in range(0, len(texts), 100):
-            batch = texts[i:i+100]
-            resp = await self.client.embeddings.create(model=emb_model, input=batch)
-            all_embeddings.extend([d.embedding for d in resp.data])
+        dimensions = dimensions or int(os.getenv("NEXUS_EMBEDDING_DIMENSIONS", "0")) or None
+        extra = {"dimensions": dimensions} if dimensions else {}
+
+        batches = self._embed_batches(texts, emb_model)
+        embeddings: list[list[float] | None] = [None] * len(texts)
+        gate = asyncio.Semaphore(self.embed_concurrency)
+        start = time.perf_counter()
+
+        async def run(lo: int, hi: int):
+            async with gate:
+                embeddings[lo:hi] = await self._embed_batch(texts[lo:hi], emb_model, extra)
+
+        tasks = [asyncio.create_task(run(lo, hi)) for lo, hi in batches]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            # One batch out of retries fails the call; stop spending on the rest
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        elapsed = time.perf_counter() - start
+        metrics.EMBEDDING_TEXTS.inc(len(texts), model=emb_model)
+        if len(batches) > 1 and elapsed > 0:
+            rate = len(texts) / elapsed
+            metrics.EMBEDDING_TEXTS_PER_SECOND.set(rate, model=emb_model)
+            logger.info(
+                f"[LLM] Embedded {len(texts)} texts in {len(batches)} batches "
+                f"in {elapsed:.2f}s ({rate:.0f} texts/s)"
+            )
+        return embeddings
+
+    def _embed_batches(self, texts: list[str], model: str) -> list[tuple[int, int]]:
+        """Split texts into contiguous (start, end) runs under the batch token and item limits."""
+        batches = []
+        lo, tokens = 0, 0
+        for i, text in enumerate(texts):
+            cost = count_tokens(text, model)
+            if i > lo and (tokens + cost > self.embed_batch_tokens or i - lo >= self.embed_batch_items):
+                batches.append((lo, i))
+                lo, tokens = i, 0
+            tokens += cost
+        if lo < len(texts):
+            batches.append((lo, len(texts)))
+        return batches
+
+    async def _embed_batch(self, batch: list[str], model: str, extra: dict) -> list[list[float]]:
+        """One embedding request, retried on its own so a failure does not redo other batches."""
+        last_error = None
+        for attempt in range(self.max_retries):
+            try:
+                async with self._slot(model):
+                    with metrics.EMBEDDING_SECONDS.time(model=model):
+                        resp = await asyncio.wait_for(
+                            self.client.embeddings.create(model=model, input=batch, **extra),
+                            timeout=self.timeout,
+                        )
+                if len(resp.data) != len(batch):
+                    raise ValueError(f"Got {len(resp.data)} embeddings for {len(batch)} texts")
+            except CassetteMiss:
+                raise
+            except Exception as e:
+                last_error = e
+                metrics.LLM_ERRORS.inc(model=model, task_type="embedding", error=type(e).__name__)
+                logger.warning(f"[LLM] Embedding batch of {len(batch)} attempt {attempt+1}/{self.max_retries} failed: {e}")
+                if attempt < self.max_retries - 1:
+                    backoff = 1 * (attempt + 1)
+                    metrics.LLM_RETRIES.inc(model=model, task_type="embedding")
+                    metrics.LLM_RETRY_WAIT_SECONDS.inc(backoff, model=model, task_type="embedding")
+                    await asyncio.sleep(backoff)
+                continue
 
             if resp.usage:
                 self.usage.record(
-                    model=emb_model,
+                    model=model,
                     input_tokens=resp.usage.total_tokens,
                     output_tokens=0,
                     task_type="embedding",
                 )
+                metrics.LLM_TOKENS.inc(resp.usage.total_tokens, model=model, task_type="embedding", kind="input")
+            return [d.embedding for d in sorted(resp.data, key=lambda d: d.index)]
 
-        return all_embeddings
+        raise RuntimeError(f"Embedding batch failed after {self.max_retries} attempts: {last_error}")
 
 
 # ── Singleton ────────────────────────────────────────────────────────────────
@@ -1,29 +1,87 @@
 """Builds prompt-friendly context from the knowledge graph."""
 
-from ..graph_store import load_graph, load_alerts, load_hierarchy
+import copy
+import functools
+import logging
+
+from ..graph_store import load_graph, load_alerts, load_hierarchy, get_generation
+from .tokens import ContextBudget
+
+logger = logging.getLogger("nexus.llm.context")
+
+# Rendered contexts shared by every ContextBuilder, keyed by (method, args).
+# Each entry remembers the source generations it was rendered from and is
+# only reused while those generations are current.
+_render_cache: dict[tuple, tuple[tuple[int, ...], object, dict]] = {}
+_RENDER_CACHE_MAX = 1024
+_render_stats = {"hits": 0, "misses": 0}
+
+
+def _memoized(*sources: str):
+    """Cache a ContextBuilder rendering per (args, generation of each source)."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            generations = tuple(self._generation(source) for source in sources)
+            key = (fn.__name__, args, tuple(sorted(kwargs.items())))
+            entry = _render_cache.get(key)
+            if entry is not None and entry[0] == generations:
+                _render_stats["hits"] += 1
+                self.token_report.update(entry[2])
+                return copy.copy(entry[1])
+
+            _render_stats["misses"] += 1
+            before = dict(self.token_report)
+            result = fn(self, *args, **kwargs)
+            report = {k: v for k, v in self.token_report.items() if before.get(k) is not v}
+            if len(_render_cache) >= _RENDER_CACHE_MAX:
+                _render_cache.clear()
+            _render_cache[key] = (generations, result, report)
+            return copy.copy(result)
+        return wrapper
+    return decorator
+
+
+def get_render_cache_stats() -> dict:
+    """Return hit/miss counts and size of the shared rendering cache."""
+    return {**_render_stats, "entries": len(_render_cache)}
 
 
 class ContextBuilder:
     def __init__(self):
         self._graph = None
         self._alerts = None
+        self._graph_generation = 0
+        self._alerts_generation = 0
+        self.token_report: dict[str, dict] = {}
 
     async def _ensure_loaded(self):
-        if self._graph is None:
-            self._graph = load_graph()
-        if self._alerts is None:
-            self._alerts = load_alerts()
+        self._get_graph()
+        self._get_alerts()
 
     def _get_graph(self):
         if self._graph is None:
+            # Read the generation first so a concurrent change can only make
+            # this snapshot look older than it is, never newer
+            self._graph_generation = get_generation("graph")
             self._graph = load_graph()
         return self._graph
 
     def _get_alerts(self):
         if self._alerts is None:
+            self._alerts_generation = get_generation("alerts")
             self._alerts = load_alerts()
         return self._alerts
 
+    def _generation(self, source: str) -> int:
+        """Return the generation of the snapshot this builder renders from."""
+        if source == "alerts":
+            self._get_alerts()
+            return self._alerts_generation
+        self._get_graph()
+        return self._graph_generation
+
+    @_memoized("graph")
     def build_org_summary(self) -> dict:
         """Return org metadata for prompt template formatting."""
         g = self._get_graph()
@@ -40,92 +98,161 @@ class ContextBuilder:
             "division_count": len(divisions),
         }
 
-    def build_org_context(self) -> str:
-        """Full org context as natural language for system prompts."""
+    @_memoized("graph")
+    def build_org_context(self, max_tokens: int | None = None) -> str:
+        """Full org context as natural language for system prompts.
+
+        With max_tokens, sections are packed by priority and items by relevance
+        so the highest-value nodes survive; see token_report for the accounting.
+        """
+        sections = self._org_context_sections()
+        if max_tokens is None:
+            return "\n\n".join(
+                "\n".join([header] + [text for _, text in items]) if header
+                else "\n".join(text for _, text in items)
+                for _, _, header, items in sections
+            )
+        return self._render_budgeted("org_context", sections, max_tokens)
+
+    @_memoized("graph")
+    def _org_context_sections(self) -> list[tuple[str, int, str | None, list[tuple[float, str]]]]:
+        """Return (name, priority, header, [(score, line)]) sections of the org context."""
         g = self._get_graph()
         nodes = g.get("nodes", [])
         edges = g.get("edges", [])
         meta = g.get("metadata", {})
 
-        lines = [
-            f"Company: {meta.get('company_name', 'Meridian Technologies')}",
-            f"Knowledge graph: {len(nodes)} nodes, {len(edges)} edges",
-            "",
-            "== PEOPLE ==",
+        important_types = {"CONTRADICTS": 1.0, "BLOCKS": 0.9, "SUPERSEDES": 0.8, "DEPENDS_ON": 0.7, "DELEGATES_TO": 0.6}
+        flagged_ids = set()
+        for e in edges:
+            if e.get("type") in important_types:
+                flagged_ids.add(e["source"])
+                flagged_ids.add(e["target"])
+
+        overview = [
+            (1.0, f"Company: {meta.get('company_name', 'Meridian Technologies')}"),
+            (1.0, f"Knowledge graph: {len(nodes)} nodes, {len(edges)} edges"),
         ]
+
+        people = []
         for n in nodes:
             if n.get("type") == "person":
                 load = n.get("cognitive_load", 0)
-                lines.append(
+                load_pct = int(load*100) if isinstance(load, float) and load <= 1 else load
+                score = (load_pct if isinstance(load_pct, (int, float)) else 0) / 100
+                score += 0.5 if n["id"] in flagged_ids else 0.0
+                people.append((score, (
                     f"- {n['label']} (ID: {n['id']}) | {n.get('role', '?')} | "
-                    f"{n.get('division', '?')} | Load: {int(load*100) if isinstance(load, float) and load <= 1 else load}% | "
+                    f"{n.get('division', '?')} | Load: {load_pct}% | "
                     f"Commitments: {n.get('active_commitments', '?')}"
-                )
+                )))
 
-        lines.append("\n== AI AGENTS ==")
+        agents = []
         for n in nodes:
             if n.get("type") == "agent":
-                lines.append(
+                score = 1.0 if n.get("trust_level") == "review_required" else 0.5
+                score += 0.5 if n["id"] in flagged_ids else 0.0
+                agents.append((score, (
                     f"- {n['label']} (ID: {n['id']}) | {n.get('agent_type', '?')} | "
                     f"Trust: {n.get('trust_level', '?')} | Supervisor: {n.get('supervising_human', '?')} | "
                     f"Tasks: {', '.join(n.get('active_tasks', []))}"
-                )
+                )))
 
-        lines.append("\n== KEY KNOWLEDGE UNITS ==")
+        knowledge = []
         for n in nodes:
             if n.get("type") in ("decision", "fact", "commitment", "question"):
-                lines.append(
+                text = (
                     f"- [{n['type'].upper()}] {n['label']} (ID: {n['id']}) | "
                     f"Division: {n.get('division', '?')} | Status: {n.get('status', '?')} | "
                     f"Freshness: {n.get('freshness_score', '?')} | Blast: {n.get('blast_radius', '?')}"
                 )
                 if n.get("content") and n["content"] != n["label"]:
-                    lines.append(f"  Content: {n['content'][:200]}")
+                    text += f"\n  Content: {n['content'][:200]}"
+                blast = n.get("blast_radius")
+                score = 1.0 if n["id"] in flagged_ids else 0.5
+                score += min(blast, 10) / 10 if isinstance(blast, (int, float)) else 0.0
+                score -= 0.3 if n.get("status") == "superseded" else 0.0
+                knowledge.append((score, text))
 
-        lines.append("\n== EDGES (key relationships) ==")
         # Include most important edges
-        important_types = {"CONTRADICTS", "SUPERSEDES", "BLOCKS", "DEPENDS_ON", "DELEGATES_TO"}
-        for e in edges:
-            if e.get("type") in important_types:
-                lines.append(f"- {e['source']} --[{e['type']}]--> {e['target']}")
+        key_edges = [
+            (important_types[e["type"]], f"- {e['source']} --[{e['type']}]--> {e['target']}")
+            for e in edges if e.get("type") in important_types
+        ]
+
+        sections = [
+            ("overview", 10, None, overview),
+            ("people", 5, "== PEOPLE ==", people),
+            ("agents", 3, "== AI AGENTS ==", agents),
+            ("knowledge", 4, "== KEY KNOWLEDGE UNITS ==", knowledge),
+            ("edges", 3, "== EDGES (key relationships) ==", key_edges),
+        ]
 
         # Also include communication edges
         comm_edges = [e for e in edges if e.get("type") == "COMMUNICATES_WITH"]
         if comm_edges:
-            lines.append("\n== COMMUNICATION CHANNELS ==")
-            for e in comm_edges:
-                lines.append(f"- {e['source']} <-> {e['target']} (weight: {e.get('weight', '?')})")
-
-        return "\n".join(lines)
+            sections.append(("communication", 1, "== COMMUNICATION CHANNELS ==", [
+                (e.get("weight", 0.5) if isinstance(e.get("weight"), (int, float)) else 0.5,
+                 f"- {e['source']} <-> {e['target']} (weight: {e.get('weight', '?')})")
+                for e in comm_edges
+            ]))
+        return sections
+
+    def _render_budgeted(self, name: str, sections: list, max_tokens: int) -> str:
+        """Pack sections into max_tokens and record the per-section token report."""
+        budget = ContextBudget(max_tokens)
+        for section_name, priority, header, items in sections:
+            budget.add_section(section_name, items, priority=priority, header=header)
+        text = budget.render()
+        self.token_report[name] = {
+            "budget": max_tokens,
+            "used": budget.tokens_used,
+            "sections": budget.report,
+        }
+        logger.info(
+            f"[Context] {name}: {budget.tokens_used}/{max_tokens} tokens "
+            + ", ".join(f"{k}={v['tokens']}" for k, v in budget.report.items())
+        )
+        return text
 
+    @_memoized("graph")
     def build_people_list(self) -> str:
         """Compact list of all people for entity matching."""
         g = self._get_graph()
         people = [n for n in g.get("nodes", []) if n.get("type") == "person"]
         return "\n".join(f"- {n['label']} (ID: {n['id']}, {n.get('role', '?')}, {n.get('division', '?')})" for n in people)
 
+    @_memoized("graph")
     def build_agents_list(self) -> str:
         """Compact list of all AI agents."""
         g = self._get_graph()
         agents = [n for n in g.get("nodes", []) if n.get("type") == "agent"]
         return "\n".join(f"- {n['label']} (ID: {n['id']}, {n.get('agent_type', '?')}, {n.get('division', '?')})" for n in agents)
 
-    def build_alerts_context(self) -> str:
-        """Format active alerts as context string."""
+    @_memoized("alerts")
+    def build_alerts_context(self, max_tokens: int | None = None) -> str:
+        """Format active alerts as context string, most severe first under a budget."""
         alerts = self._get_alerts()
         if not alerts:
             return "No active alerts."
-        lines = []
+        severity_scores = {"critical": 1.0, "warning": 0.6, "info": 0.3}
+        items = []
         for a in alerts:
             if not a.get("resolved"):
-                lines.append(
+                text = (
                     f"- [{a.get('severity', '?').upper()}] [{a.get('agent', '?')}] {a.get('headline', '?')} | "
                     f"Scope: {a.get('scope', '?')} | Affected: {', '.join(a.get('affected_node_ids', []))}"
                 )
                 if a.get("detail"):
-                    lines.append(f"  Detail: {a['detail'][:200]}")
-        return "\n".join(lines) if lines else "No active alerts."
+                    text += f"\n  Detail: {a['detail'][:200]}"
+                items.append((severity_scores.get(a.get("severity"), 0.5), text))
+        if not items:
+            return "No active alerts."
+        if max_tokens is None:
+            return "\n".join(text for _, text in items)
+        return self._render_budgeted("alerts_context", [("alerts", 0, None, items)], max_tokens) or "No active alerts."
 
+    @_memoized("graph")
     def build_node_context(self, node_id: str, depth: int = 2) -> str:
         """Build context around a specific node including N-hop neighbors."""
         g = self._get_graph()
@@ -165,6 +292,7 @@ class ContextBuilder:
 
         return "\n".join(lines)
 
+    @_memoized("graph")
     def build_person_context(self, person_id: str) -> str:
         """Build detailed context for a specific person."""
         g = self._get_graph()
@@ -202,6 +330,7 @@ class ContextBuilder:
 
         return "\n".join(lines)
 
+    @_memoized("graph")
     def build_division_context(self, division: str) -> str:
         """Build context for a specific division."""
         g = self._get_graph()
@@ -220,33 +349,52 @@ class ContextBuilder:
 
         return "\n".join(lines)
 
-    def build_knowledge_context(self) -> str:
-        """Build context of all knowledge units (decisions, facts, commitments, questions)."""
+    @_memoized("graph")
+    def build_knowledge_context(self, max_tokens: int | None = None) -> str:
+        """Build context of all knowledge units (decisions, facts, commitments, questions).
+
+        Units are listed newest first; under a budget, fresher and more recent
+        units are kept in preference to stale ones.
+        """
         g = self._get_graph()
         knowledge_types = {"decision", "fact", "commitment", "question"}
         nodes = [n for n in g.get("nodes", []) if n.get("type") in knowledge_types]
-
-        lines = []
-        for n in sorted(nodes, key=lambda x: x.get("created_at", ""), reverse=True):
-            lines.append(
+        nodes = sorted(nodes, key=lambda x: x.get("created_at", ""), reverse=True)
+
+        items = []
+        for rank, n in enumerate(nodes):
+            freshness = n.get("freshness_score")
+            score = freshness if isinstance(freshness, (int, float)) else 0.5
+            score += 1.0 / (rank + 2)
+            score -= 0.3 if n.get("status") == "superseded" else 0.0
+            items.append((score, (
                 f"[{n['type'].upper()}] {n['label']} (ID: {n['id']})\n"
                 f"  Division: {n.get('division', '?')} | Status: {n.get('status', '?')} | "
                 f"Freshness: {n.get('freshness_score', '?')} | Source: {n.get('source_type', '?')}\n"
-                f"  Content: {(n.get('content') or '')[:200]}"
-            )
-        return "\n\n".join(lines)
+                f"  Content: {(n.get('content') or '')[:200]}\n"
+            )))
+        if max_tokens is None:
+            return "\n".join(text for _, text in items).rstrip("\n")
+        return self._render_budgeted("knowledge_context", [("knowledge", 0, None, items)], max_tokens).rstrip("\n")
+
+    @staticmethod
+    def node_text(n: dict) -> str:
+        """The text embedded for a node."""
+        text_parts = [n.get("label", "")]
+        if n.get("content"):
+            text_parts.append(n["content"])
+        if n.get("role"):
+            text_parts.append(n["role"])
+        if n.get("type"):
+            text_parts.append(n["type"])
+        return " | ".join(text_parts)
 
     def get_all_node_texts(self) -> list[tuple[str, str]]:
         """Return (node_id, text) pairs for embedding."""
         g = self._get_graph()
-        results = []
-        for n in g.get("nodes", []):
-            text_parts = [n.get("label", "")]
-            if n.get("content"):
-                text_parts.append(n["content"])
-            if n.get("role"):
-                text_parts.append(n["role"])
-            if n.get("type"):
-                text_parts.append(n["type"])
-            results.append((n["id"], " | ".join(text_parts)))
-        return results
+        return [(n["id"], self.node_text(n)) for n in g.get("nodes", [])]
+
+    def get_node_texts(self, node_ids: list[str]) -> dict[str, str]:
+        """Return {node_id: text} for the given nodes that still exist."""
+        wanted = set(node_ids)
+        return {n["id"]: self.node_text(n) for n in self._get_graph().get("nodes", []) if n["id"] in wanted}
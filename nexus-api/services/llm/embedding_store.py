@@ -0,0 +1,285 @@
+"""On-disk, memory-mapped embedding store.
+
+Normalized vectors live in one flat binary file (float32 or float16 rows)
+next to a JSON sidecar that maps node ids to (row, content hash) and
+records the dtype, dimension and embedding model. Readers np.memmap the
+file read-only, so every uvicorn worker on a host shares one copy through
+the page cache and starts without downloading or re-embedding anything.
+
+Writes are append-only: a changed vector is written as a new row and its
+old row becomes dead. Appends start at the sidecar's row count, so rows
+left behind by an interrupted write are overwritten rather than shifting
+later ones. Once dead rows pass NEXUS_EMBEDDING_STORE_COMPACT_RATIO
+the live rows are rewritten to a fresh file. The sidecar is replaced
+atomically after the data it points at is on disk, and writers serialize
+on an flock, so readers always see a consistent snapshot; a reader that
+still maps an old file keeps a valid view of it until it reloads.
+
+Configured through the environment:
+    NEXUS_EMBEDDING_STORE_DIR            directory (default nexus-api/.cache/embeddings; "off" disables)
+    NEXUS_EMBEDDING_STORE_DTYPE          float32 (default) | float16, for new stores
+    NEXUS_EMBEDDING_STORE_COMPACT_RATIO  dead-row fraction that triggers compaction (default 0.3)
+"""
+
+import os
+import json
+import fcntl
+import logging
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from .vector_index import normalize
+
+logger = logging.getLogger("nexus.llm.embedding_store")
+
+DTYPES = ("float32", "float16")
+SIDECAR = "index.json"
+LOCK = ".lock"
+_DEFAULT_DIR = os.path.join(os.path.dirname(__file__), "..", "..", ".cache", "embeddings")
+# Compacting a handful of dead rows is not worth rewriting the file
+_MIN_DEAD_ROWS = 64
+
+
+class EmbeddingStore:
+    """Append-friendly memory-mapped vectors with an id/hash sidecar."""
+
+    def __init__(self, path: str, dtype: str = "float32", compact_ratio: float = 0.3):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown embedding store dtype {dtype!r}, expected one of {DTYPES}")
+        self.path = path
+        self.dtype = dtype
+        self.compact_ratio = compact_ratio
+        self.model: str | None = None
+        self.dim: int | None = None
+        self._file: str | None = None
+        self._rows = 0
+        self._entries: dict[str, tuple[int, str]] = {}  # node_id -> (row, content hash)
+        self._mmap: np.ndarray | None = None
+        self._configured_dtype = dtype
+        self._sidecar_version: tuple | None = None
+        self._pending_unlink: str | None = None
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    # ── Reading ──────────────────────────────────────────────────────────────
+
+    def _sidecar_path(self) -> str:
+        return os.path.join(self.path, SIDECAR)
+
+    def load(self) -> bool:
+        """(Re)read the sidecar and map the vector file if either changed. Returns True if populated."""
+        sidecar = self._sidecar_path()
+        try:
+            st = os.stat(sidecar)
+        except FileNotFoundError:
+            return False
+        # The sidecar is replaced, never rewritten in place, so a new inode means new data
+        version = (st.st_ino, st.st_mtime_ns)
+        if version == self._sidecar_version:
+            return bool(self._entries)
+        with open(sidecar) as f:
+            meta = json.load(f)
+        with self._lock:
+            self.model = meta["model"]
+            self.dim = meta["dim"]
+            self.dtype = meta["dtype"]
+            self._file = meta["file"]
+            self._rows = meta["rows"]
+            self._entries = {node_id: (row, h) for node_id, (row, h) in meta["entries"].items()}
+            self._mmap = self._map(self._file, self._rows)
+            self._sidecar_version = version
+        logger.info(
+            f"[EmbeddingStore] Mapped {len(self._entries)} vectors "
+            f"({self._rows - len(self._entries)} dead rows, {self.dtype}) from {self.path}"
+        )
+        return bool(self._entries)
+
+    def _map(self, file: str, rows: int) -> np.ndarray | None:
+        if not rows:
+            return None
+        return np.memmap(os.path.join(self.path, file), dtype=self.dtype, mode="r", shape=(rows, self.dim))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hashes(self) -> dict[str, str]:
+        return {node_id: h for node_id, (_, h) in self._entries.items()}
+
+    @property
+    def dead_rows(self) -> int:
+        return self._rows - len(self._entries)
+
+    def snapshot(self) -> tuple[list[str], np.ndarray | None]:
+        """Live ids and their normalized rows in matching order.
+
+        When the file has no dead rows and is float32, the returned matrix
+        is the read-only memmap itself, so it costs no private memory.
+        """
+        with self._lock:
+            if not self._entries or self._mmap is None:
+                return [], None
+            ordered = sorted(self._entries.items(), key=lambda kv: kv[1][0])
+            ids = [node_id for node_id, _ in ordered]
+            rows = np.fromiter((row for _, (row, _) in ordered), dtype=np.int64, count=len(ordered))
+            if len(rows) == self._rows and self._mmap.dtype == np.float32:
+                return ids, self._mmap
+            return ids, np.asarray(self._mmap[rows], dtype=np.float32)
+
+    def get(self, ids: list[str]) -> np.ndarray:
+        """Normalized float32 rows for ids, which must all be present."""
+        with self._lock:
+            rows = [self._entries[node_id][0] for node_id in ids]
+            return np.asarray(self._mmap[rows], dtype=np.float32)
+
+    # ── Writing ──────────────────────────────────────────────────────────────
+
+    @contextmanager
+    def _writer(self):
+        """Exclusive cross-process write lock, with state refreshed from disk."""
+        with open(os.path.join(self.path, LOCK), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self.load()
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def put(self, ids: list[str], hashes: list[str], vectors, model: str) -> None:
+        """Append (or replace) normalized vectors for ids."""
+        if not ids:
+            return
+        rows = normalize(vectors)
+        with self._writer():
+            saved = (dict(self._entries), self._rows, self._file, self.model, self.dim, self.dtype)
+            try:
+                self._append(ids, hashes, rows, model)
+            except BaseException:
+                # The sidecar on disk is unchanged; keep our view consistent with it
+                self._entries, self._rows, self._file, self.model, self.dim, self.dtype = saved
+                self._pending_unlink = None
+                raise
+
+    def _append(self, ids: list[str], hashes: list[str], rows: np.ndarray, model: str):
+        if self.model not in (None, model) or self.dim not in (None, rows.shape[1]):
+            logger.warning(
+                f"[EmbeddingStore] Model or dimension changed ({self.model}/{self.dim} -> "
+                f"{model}/{rows.shape[1]}), starting a new store"
+            )
+            self._reset()
+        self.model = model
+        self.dim = rows.shape[1]
+        if self._file is None:
+            self._file = f"vectors-0.f{self.dtype[-2:]}"
+        data = os.path.join(self.path, self._file)
+        with open(data, "r+b" if os.path.exists(data) else "wb") as f:
+            # Rows past the sidecar's count are left over from an interrupted put; overwrite them
+            f.seek(self._rows * self.dim * np.dtype(self.dtype).itemsize)
+            f.truncate()
+            f.write(rows.astype(self.dtype).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        for i, (node_id, h) in enumerate(zip(ids, hashes)):
+            self._entries[node_id] = (self._rows + i, h)
+        self._rows += len(ids)
+        self._maybe_compact()
+        self._write_sidecar()
+
+    def delete(self, ids: list[str]) -> int:
+        """Drop ids; their rows stay in the file until compaction."""
+        with self._writer():
+            removed = sum(1 for node_id in ids if self._entries.pop(node_id, None) is not None)
+            if removed:
+                self._maybe_compact()
+                self._write_sidecar()
+        return removed
+
+    def compact(self) -> None:
+        """Rewrite only live rows to a new file."""
+        with self._writer():
+            self._compact()
+            self._write_sidecar()
+
+    def _maybe_compact(self):
+        dead = self.dead_rows
+        if dead >= _MIN_DEAD_ROWS and dead > self.compact_ratio * self._rows:
+            self._compact()
+
+    def _compact(self):
+        old_file, old_rows = self._file, self._rows
+        mmap = self._map(old_file, old_rows) if old_file else None
+        generation = int(old_file.split("-")[1].split(".")[0]) + 1 if old_file else 0
+        new_file = f"vectors-{generation}.f{self.dtype[-2:]}"
+        ordered = sorted(self._entries.items(), key=lambda kv: kv[1][0])
+        with open(os.path.join(self.path, new_file), "wb") as f:
+            for start in range(0, len(ordered), 4096):
+                chunk = ordered[start : start + 4096]
+                f.write(np.asarray(mmap[[row for _, (row, _) in chunk]], dtype=self.dtype).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        self._entries = {node_id: (i, h) for i, (node_id, (_, h)) in enumerate(ordered)}
+        self._file = new_file
+        self._rows = len(ordered)
+        logger.info(f"[EmbeddingStore] Compacted {old_rows} rows to {self._rows} in {new_file}")
+        # Readers that still map the old file keep their view; the data is freed when they let go
+        if old_file and old_file != new_file:
+            self._pending_unlink = old_file
+
+    def _write_sidecar(self):
+        meta = {
+            "model": self.model,
+            "dim": self.dim,
+            "dtype": self.dtype,
+            "file": self._file,
+            "rows": self._rows,
+            "entries": {node_id: [row, h] for node_id, (row, h) in self._entries.items()},
+        }
+        tmp = self._sidecar_path() + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._sidecar_path())
+        if self._pending_unlink:
+            try:
+                os.unlink(os.path.join(self.path, self._pending_unlink))
+            except FileNotFoundError:
+                pass
+            self._pending_unlink = None
+        # Remap our own view from the data just written
+        self._sidecar_version = None
+        self.load()
+
+    def _reset(self):
+        if self._file:
+            try:
+                os.unlink(os.path.join(self.path, self._file))
+            except FileNotFoundError:
+                pass
+        self._file = None
+        self._rows = 0
+        self._entries = {}
+        self._mmap = None
+        self.model = None
+        self.dim = None
+        self.dtype = self._configured_dtype
+
+
+def open_embedding_store() -> EmbeddingStore | None:
+    """The store configured by NEXUS_EMBEDDING_STORE_*, or None if disabled or unusable."""
+    path = os.getenv("NEXUS_EMBEDDING_STORE_DIR", _DEFAULT_DIR)
+    if not path or path.lower() == "off":
+        return None
+    try:
+        store = EmbeddingStore(
+            os.path.abspath(path),
+            dtype=os.getenv("NEXUS_EMBEDDING_STORE_DTYPE", "float32"),
+            compact_ratio=float(os.getenv("NEXUS_EMBEDDING_STORE_COMPACT_RATIO", "0.3")),
+        )
+        store.load()
+        return store
+    except Exception as e:
+        logger.warning(f"[EmbeddingStore] Disabled, could not open {path}: {e}")
+        return None
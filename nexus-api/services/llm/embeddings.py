@@ -1,18 +1,56 @@
-"""Embedding service with Supabase pgvector for semantic search."""
+"""Embedding service for semantic search over graph nodes.
 
+Vectors are kept in an in-process VectorIndex, persisted to a local
+memory-mapped EmbeddingStore shared by all workers on the host and, when
+Supabase is configured, to pgvector. NEXUS_VECTOR_BACKEND picks where search
+runs: auto (default) uses the local index whenever it is populated, since
+at graph sizes an in-process matmul beats an RPC round trip, and pgvector
+otherwise; local or pgvector force one side.
+
+NEXUS_EMBEDDING_QUANTIZATION=int8|binary keeps only compact codes in the
+local index and reranks candidates with float rows read from the store.
+
+Query embeddings are kept in a bounded LRU (NEXUS_QUERY_EMBED_CACHE_SIZE,
+default 1024) with a TTL (NEXUS_QUERY_EMBED_CACHE_TTL seconds, default
+3600), so repeated questions skip the embedding round trip; concurrent
+misses for the same query share one request.
+"""
+
+import os
 import json
-import numpy as np
+import time
+import base64
+import asyncio
+import hashlib
 import logging
-import os
+from collections import OrderedDict
+
+import numpy as np
 from datetime import datetime, timezone
 
+from .. import metrics
+from ..graph_manager import add_node_listener
+from ..lexical_index import get_node_index
+from ..retrieval import SearchFilters
 from .client import get_llm_client
 from .context_builder import ContextBuilder
+from .embedding_store import open_embedding_store
+from .quantized_index import QUANTIZATIONS, QuantizedIndex
+from .vector_index import VectorIndex, normalize
 from ..supabase_client import get_supabase, is_supabase_configured
 
 logger = logging.getLogger("nexus.embeddings")
 
 EMBEDDING_MODEL = os.getenv("NEXUS_EMBEDDING_MODEL", "text-embedding-3-large")
+EMBEDDING_DIMENSIONS = int(os.getenv("NEXUS_EMBEDDING_DIMENSIONS", "0")) or None
+# Identifies the vector space: vectors of the same model at another size are not comparable
+EMBEDDING_TAG = f"{EMBEDDING_MODEL}@{EMBEDDING_DIMENSIONS}" if EMBEDDING_DIMENSIONS else EMBEDDING_MODEL
+# Output size of each model when NEXUS_EMBEDDING_DIMENSIONS does not shorten it
+NATIVE_DIMENSIONS = {"text-embedding-3-large": 3072, "text-embedding-3-small": 1536, "text-embedding-ada-002": 1536}
+# Size of the vectors we make, and so of node_embeddings.embedding; None for an unknown model
+EMBEDDING_WIDTH = EMBEDDING_DIMENSIONS or NATIVE_DIMENSIONS.get(EMBEDDING_MODEL)
+VECTOR_BACKENDS = ("auto", "local", "pgvector")
+QUANTIZATION = os.getenv("NEXUS_EMBEDDING_QUANTIZATION", "none")
 
 
 def cosine_similarity(a: list[float], b: list[float]) -> float:
@@ -26,54 +64,335 @@ def cosine_similarity(a: list[float], b: list[float]) -> float:
     return float(dot / norm)
 
 
+def normalize_query(query: str) -> str:
+    """Cache key for a query: case-folded with whitespace collapsed."""
+    return " ".join(query.casefold().split())
+
+
+def pack_vector(vector) -> str:
+    """Base64 of little-endian float32, as decoded by unpack_float32_vector in SQL."""
+    return base64.b64encode(np.asarray(vector, dtype="<f4").tobytes()).decode("ascii")
+
+
+class QueryEmbeddingCache:
+    """Bounded LRU of query text -> embedding, with per-entry expiry."""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, np.ndarray]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> np.ndarray | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        ts, vector = entry
+        if time.monotonic() - ts >= self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return vector
+
+    def put(self, key: str, vector) -> np.ndarray:
+        if self.max_size <= 0:
+            return np.asarray(vector, dtype=np.float32)
+        arr = np.array(vector, dtype=np.float32)
+        # Shared between callers, so nobody may modify it in place
+        arr.flags.writeable = False
+        self._entries[key] = (time.monotonic(), arr)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return arr
+
+    def clear(self):
+        self._entries.clear()
+
+
+def content_hash(text: str, model: str = EMBEDDING_TAG) -> str:
+    """Hash of a node's embedded text and model; a node is re-embedded only when this changes."""
+    return hashlib.sha256(f"{model}\n{text}".encode()).hexdigest()[:32]
+
+
 class EmbeddingService:
-    """Vector store for knowledge graph nodes backed by Supabase pgvector."""
+    """Vector store for knowledge graph nodes: a local index, persisted to pgvector when available.
+
+    Each indexed vector carries the content hash of the text it was made
+    from, so rebuilds only embed new or changed nodes and prune deleted
+    ones. graph_manager mutations enqueue the touched nodes, which are
+    re-embedded in a debounced background refresh.
+    """
 
     def __init__(self):
-        self._texts: dict[str, str] = {}  # node_id -> text (for keyword fallback)
+        self._texts: dict[str, str] = {}  # node_id -> text of every known node
+        self._hashes: dict[str, str] = {}  # node_id -> content hash of its indexed vector
+        self._store = open_embedding_store()
+        self._quantization = QUANTIZATION
+        if self._quantization not in QUANTIZATIONS:
+            logger.warning(f"[Embeddings] Unknown NEXUS_EMBEDDING_QUANTIZATION {self._quantization!r}, using none")
+            self._quantization = "none"
+        self._index = self._new_index()
         self._built = False
         self._use_supabase = is_supabase_configured()
+        self._backend = os.getenv("NEXUS_VECTOR_BACKEND", "auto")
+        if self._backend not in VECTOR_BACKENDS:
+            logger.warning(f"[Embeddings] Unknown NEXUS_VECTOR_BACKEND {self._backend!r}, using auto")
+            self._backend = "auto"
+        self._pending: set[str] = set()
+        self._refresh_task: asyncio.Task | None = None
+        self._refresh_delay = float(os.getenv("NEXUS_EMBED_REFRESH_DELAY", "2"))
+        self._sync_lock = asyncio.Lock()
+        self._query_cache = QueryEmbeddingCache(
+            max_size=int(os.getenv("NEXUS_QUERY_EMBED_CACHE_SIZE", "1024")),
+            ttl=float(os.getenv("NEXUS_QUERY_EMBED_CACHE_TTL", "3600")),
+        )
+        self._query_inflight: dict[str, asyncio.Task] = {}
+        # Cleared if the database predates search_similar_nodes_packed
+        self._packed_rpc = True
+        self._pgvector_checked = False
+        add_node_listener(self.enqueue)
 
     async def build_index(self):
-        """Embed all graph nodes and upsert into node_embeddings table."""
+        """Bring the index in line with the graph, embedding only new or changed nodes.
+
+        Vectors whose content hash still matches are kept. On first build
+        they are mapped from the local EmbeddingStore, or loaded from
+        node_embeddings when the store is empty and Supabase is configured.
+        Nodes no longer in the graph are pruned.
+        """
         ctx = ContextBuilder()
-        node_texts = ctx.get_all_node_texts()
+        node_texts = dict(ctx.get_all_node_texts())
 
         if not node_texts:
             logger.warning("No nodes to embed")
             return
 
-        client = get_llm_client()
-        ids = [nt[0] for nt in node_texts]
-        texts = [nt[1] for nt in node_texts]
+        async with self._sync_lock:
+            self._texts.update(node_texts)
+            if self._use_supabase and not self._pgvector_checked:
+                self._pgvector_checked = True
+                await asyncio.to_thread(self._check_pgvector_dimensions)
 
-        # Always populate _texts for keyword fallback
-        for node_id, text in zip(ids, texts):
-            self._texts[node_id] = text
-
-        try:
-            embeddings = await client.embed(texts)
+            try:
+                if not self._hashes and not self._load_from_store() and self._use_supabase:
+                    await asyncio.to_thread(self._load_from_supabase)
+                elif not self._use_supabase and not self._built:
+                    logger.info(
+                        "[Embeddings] Supabase not configured — "
+                        "embeddings kept in the local vector index only"
+                    )
+                embedded, pruned = await self._sync(node_texts, prune=True)
+
+                self._built = True
+                logger.info(
+                    f"[Embeddings] Index has {len(self._index)} nodes: "
+                    f"{embedded} embedded, {len(node_texts) - embedded} unchanged, {pruned} pruned"
+                )
 
+            except Exception as e:
+                logger.error(f"[Embeddings] Failed to build index: {e}")
+                self._built = False
+
+    async def _sync(self, node_texts: dict[str, str], prune: bool = False) -> tuple[int, int]:
+        """Embed nodes whose content hash changed; with prune, drop indexed nodes not in node_texts.
+
+        Returns (embedded, pruned).
+        """
+        hashes = {node_id: content_hash(text) for node_id, text in node_texts.items()}
+        changed = [
+            node_id for node_id, h in hashes.items()
+            if self._hashes.get(node_id) != h or node_id not in self._index
+        ]
+        removed = [node_id for node_id in self._hashes if node_id not in node_texts] if prune else []
+
+        # Another worker may already have embedded this exact text into the shared store
+        reused = []
+        if changed and self._store is not None:
+            self._store.load()
+            stored = self._store.hashes if self._store.model == EMBEDDING_TAG else {}
+            reused = [node_id for node_id in changed if stored.get(node_id) == hashes[node_id]]
+            if reused:
+                self._index.add(reused, self._store.get(reused))
+                self._hashes.update((node_id, hashes[node_id]) for node_id in reused)
+                changed = [node_id for node_id in changed if node_id not in set(reused)]
+
+        if changed:
+            texts = [node_texts[node_id] for node_id in changed]
+            embeddings = await get_llm_client().embed(texts)
+            # Stored first: a quantized index reranks from the store
+            if self._store is not None:
+                await asyncio.to_thread(
+                    self._store.put, changed, [hashes[n] for n in changed], embeddings, EMBEDDING_TAG
+                )
+            self._index.add(changed, embeddings)
+            self._hashes.update((node_id, hashes[node_id]) for node_id in changed)
             if self._use_supabase:
-                self._upsert_embeddings(ids, texts, embeddings)
-            else:
-                logger.warning(
-                    "[Embeddings] Supabase not configured — "
-                    "embeddings generated but not persisted"
+                await asyncio.to_thread(
+                    self._upsert_embeddings, changed, texts, embeddings, [hashes[n] for n in changed]
                 )
+        self._texts.update(node_texts)
 
-            self._built = True
-            logger.info(f"[Embeddings] Built index with {len(ids)} nodes")
-
+        if removed:
+            self.remove_nodes(removed)
+            if self._store is not None:
+                await asyncio.to_thread(self._store.delete, removed)
+            if self._use_supabase:
+                await asyncio.to_thread(self._delete_embeddings, removed)
+
+        metrics.EMBEDDING_NODES.inc(len(changed), result="embedded")
+        metrics.EMBEDDING_NODES.inc(len(reused), result="reused")
+        metrics.EMBEDDING_NODES.inc(len(node_texts) - len(changed) - len(reused), result="unchanged")
+        metrics.EMBEDDING_NODES.inc(len(removed), result="pruned")
+        return len(changed), len(removed)
+
+    async def index_nodes(self, ids: list[str], texts: list[str]) -> int:
+        """Embed and add (or replace) specific nodes whose text changed. Returns how many were embedded."""
+        if not ids:
+            return 0
+        async with self._sync_lock:
+            embedded, _ = await self._sync(dict(zip(ids, texts)))
+        logger.info(f"[Embeddings] Indexed {embedded}/{len(ids)} nodes ({len(self._index)} total)")
+        return embedded
+
+    def remove_nodes(self, ids: list[str]) -> int:
+        """Drop nodes from the local index and keyword fallback.
+
+        node_embeddings rows for deleted nodes are removed by the nodes
+        foreign key cascade, or by build_index when it prunes.
+        """
+        for node_id in ids:
+            self._texts.pop(node_id, None)
+            self._hashes.pop(node_id, None)
+        return self._index.remove(ids)
+
+    # ── Change tracking ──────────────────────────────────────────────────────
+
+    def enqueue(self, node_ids: list[str]):
+        """Queue nodes for re-embedding (graph_manager listener).
+
+        Changes are batched for NEXUS_EMBED_REFRESH_DELAY seconds. Outside an
+        event loop they wait for the next refresh_pending or build_index.
+        """
+        self._pending.update(node_ids)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = loop.create_task(self._refresh_later())
+
+    async def _refresh_later(self):
+        await asyncio.sleep(self._refresh_delay)
+        await self.refresh_pending()
+
+    async def refresh_pending(self) -> int:
+        """Re-embed queued nodes whose text changed and drop ones that no longer exist."""
+        if not self._pending:
+            return 0
+        ids, self._pending = list(self._pending), set()
+        node_texts = ContextBuilder().get_node_texts(ids)
+        try:
+            async with self._sync_lock:
+                embedded, _ = await self._sync(node_texts)
+                gone = [node_id for node_id in ids if node_id not in node_texts]
+                self.remove_nodes(gone)
         except Exception as e:
-            logger.error(f"[Embeddings] Failed to build index: {e}")
-            self._built = False
+            logger.warning(f"[Embeddings] Refresh of {len(ids)} changed nodes failed, will retry: {e}")
+            self._pending.update(ids)
+            return 0
+        logger.info(f"[Embeddings] Refreshed {len(ids)} changed nodes ({embedded} re-embedded)")
+        return embedded
+
+    # ── Persistence ──────────────────────────────────────────────────────────
+
+    def _new_index(self):
+        if self._quantization == "none":
+            return VectorIndex()
+        return QuantizedIndex(self._quantization, rerank_source=self._store)
+
+    def _load_from_store(self) -> bool:
+        """Seed the index from the local store. Returns True if any.
+
+        Unquantized, the index wraps the store's memmap without copying;
+        quantized, the rows are encoded in chunks.
+        """
+        if self._store is None or not self._store.load() or self._store.model != EMBEDDING_TAG:
+            return False
+        ids, matrix = self._store.snapshot()
+        if self._quantization == "none":
+            self._index = VectorIndex.from_normalized(ids, matrix)
+        else:
+            self._index = self._new_index()
+            for start in range(0, len(ids), 10_000):
+                self._index.add(ids[start : start + 10_000], matrix[start : start + 10_000])
+        self._hashes = self._store.hashes
+        logger.info(f"[Embeddings] Mapped {len(ids)} stored embeddings from {self._store.path}")
+        return True
+
+    def _check_pgvector_dimensions(self) -> None:
+        """Stop using node_embeddings if its column is not sized for our vectors.
+
+        Every upsert and pgvector search would otherwise fail.
+        """
+        if EMBEDDING_WIDTH is None:
+            return
+        try:
+            width = int(get_supabase().rpc("node_embedding_dimensions", {}).execute().data)
+        except Exception:
+            # Schemas from before node_embedding_dimensions all made vector(3072)
+            width = 3072
+        if width != EMBEDDING_WIDTH:
+            logger.error(
+                f"[Embeddings] node_embeddings holds {width}-dimensional vectors but {EMBEDDING_TAG} "
+                f"makes {EMBEDDING_WIDTH}; pgvector disabled, using the local index only. "
+                f"Apply `python migrate.py --print-schema` to resize the table."
+            )
+            self._use_supabase = False
+
+    def _load_from_supabase(self) -> None:
+        """Seed the local index from stored vectors that were made with the current model."""
+        sb = get_supabase()
+        page = 500
+        loaded = 0
+        offset = 0
+        while True:
+            result = (
+                sb.table("node_embeddings")
+                .select("node_id, text_content, content_hash, embedding")
+                .eq("model", EMBEDDING_TAG)
+                .not_.is_("content_hash", "null")
+                .range(offset, offset + page - 1)
+                .execute()
+            )
+            rows = result.data or []
+            ids, vectors = [], []
+            for row in rows:
+                emb = row.get("embedding")
+                if emb is None:
+                    continue
+                # PostgREST returns vector columns in their text form
+                ids.append(row["node_id"])
+                vectors.append(json.loads(emb) if isinstance(emb, str) else emb)
+                self._hashes[row["node_id"]] = row["content_hash"]
+                self._texts.setdefault(row["node_id"], row["text_content"])
+            if self._store is not None and ids:
+                self._store.put(ids, [self._hashes[n] for n in ids], vectors, EMBEDDING_TAG)
+            self._index.add(ids, vectors)
+            loaded += len(ids)
+            if len(rows) < page:
+                break
+            offset += page
+        logger.info(f"[Embeddings] Loaded {loaded} stored embeddings from Supabase")
 
     def _upsert_embeddings(
         self,
         ids: list[str],
         texts: list[str],
         embeddings: list[list[float]],
+        hashes: list[str],
     ) -> None:
         """Upsert embedding rows into the node_embeddings table."""
         sb = get_supabase()
@@ -85,15 +404,17 @@ class EmbeddingService:
             batch_ids = ids[i : i + batch_size]
             batch_texts = texts[i : i + batch_size]
             batch_embs = embeddings[i : i + batch_size]
+            batch_hashes = hashes[i : i + batch_size]
 
             rows = []
-            for node_id, text, emb in zip(batch_ids, batch_texts, batch_embs):
+            for node_id, text, emb, h in zip(batch_ids, batch_texts, batch_embs, batch_hashes):
                 rows.append(
                     {
                         "node_id": node_id,
                         "text_content": text,
                         "embedding": emb,  # pgvector accepts list of floats
-                        "model": EMBEDDING_MODEL,
+                        "model": EMBEDDING_TAG,
+                        "content_hash": h,
                         "created_at": now,
                     }
                 )
@@ -107,43 +428,139 @@ class EmbeddingService:
                 f"({len(rows)} rows)"
             )
 
+    def _delete_embeddings(self, ids: list[str]) -> None:
+        """Delete node_embeddings rows for pruned nodes."""
+        sb = get_supabase()
+        for i in range(0, len(ids), 100):
+            sb.table("node_embeddings").delete().in_("node_id", ids[i : i + 100]).execute()
+        logger.info(f"[Embeddings] Pruned {len(ids)} stale embeddings from Supabase")
+
     async def search(
-        self, query: str, top_k: int = 20
+        self,
+        query: str,
+        top_k: int = 20,
+        filters: SearchFilters | None = None,
+        keyword_fallback: bool = True,
     ) -> list[tuple[str, float]]:
-        """Search for most similar nodes. Returns [(node_id, score)]."""
+        """Search for most similar nodes. Returns [(node_id, score)].
+
+        filters restrict every backend to matching nodes. Without
+        keyword_fallback, an empty list is returned when no vector backend
+        is available (hybrid retrieval runs BM25 itself).
+        """
+
+        if self._backend != "pgvector" and len(self._index):
+            try:
+                return await self._local_search(query, top_k, filters)
+            except Exception as e:
+                logger.warning(f"[Embeddings] Local vector search failed: {e}")
 
-        # Try pgvector search first
-        if self._built and self._use_supabase:
+        if self._backend != "local" and self._built and self._use_supabase:
             try:
-                return await self._pgvector_search(query, top_k)
+                return await self._pgvector_search(query, top_k, filters)
             except Exception as e:
                 logger.warning(
                     f"[Embeddings] pgvector search failed, "
                     f"falling back to keywords: {e}"
                 )
 
-        # Fallback: simple keyword matching
-        return self._keyword_search(query, top_k)
+        if not keyword_fallback:
+            return []
+        # Fallback: BM25 keyword search
+        return self._keyword_search(query, top_k, filters)
+
+    async def similarities(self, query: str, ids: list[str]) -> dict[str, float]:
+        """Exact cosine similarity of the query to each of ids held in the local index."""
+        present = [node_id for node_id in ids if node_id in self._index]
+        if not present:
+            return {}
+        query_emb = normalize(await self.embed_query(query))[0]
+        return dict(zip(present, (self._index.get(present) @ query_emb).tolist()))
+
+    async def embed_query(self, query: str) -> np.ndarray:
+        """Embedding of a search query, from the LRU cache when possible.
+
+        The query text is embedded as given. Queries differing only in case or
+        spacing share a cache entry, holding the embedding of the first one.
+        """
+        key = normalize_query(query)
+        cached = self._query_cache.get(key)
+        if cached is not None:
+            metrics.QUERY_EMBED_CACHE.inc(result="hit")
+            return cached
+
+        task = self._query_inflight.get(key)
+        if task is not None:
+            metrics.QUERY_EMBED_CACHE.inc(result="coalesced")
+        else:
+            metrics.QUERY_EMBED_CACHE.inc(result="miss")
+            # Its own task, so one caller disconnecting does not fail the others waiting on it
+            task = asyncio.ensure_future(self._fetch_query_embedding(key, query))
+            self._query_inflight[key] = task
+            task.add_done_callback(lambda _: self._query_inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _fetch_query_embedding(self, key: str, query: str) -> np.ndarray:
+        # The normalized key only groups equivalent queries; case and spacing are the user's
+        embedding = (await get_llm_client().embed([query]))[0]
+        return self._query_cache.put(key, embedding)
+
+    async def _local_search(
+        self, query: str, top_k: int, filters: SearchFilters | None = None
+    ) -> list[tuple[str, float]]:
+        """Exact cosine search over the in-process index."""
+        query_emb = await self.embed_query(query)
+        allowed = filters.allowed_ids() if filters else None
+
+        with metrics.VECTOR_SEARCH_SECONDS.time(backend="local"):
+            results = self._index.search(query_emb, top_k, allowed=allowed)
+        logger.info(
+            f"[Embeddings] Local search returned {len(results)} results "
+            f"from {len(self._index)} vectors"
+        )
+        return results
 
     async def _pgvector_search(
-        self, query: str, top_k: int
+        self, query: str, top_k: int, filters: SearchFilters | None = None
     ) -> list[tuple[str, float]]:
-        """Perform similarity search via Supabase search_similar_nodes RPC."""
-        client = get_llm_client()
-        query_emb = (await client.embed([query]))[0]
+        """Perform similarity search via Supabase search_similar_nodes_packed RPC.
 
-        sb = get_supabase()
+        The query vector travels as base64 float32, about a quarter of the
+        size of its JSON text form.
+        """
+        query_emb = await self.embed_query(query)
+        filter_params = filters.rpc_params() if filters else {}
 
-        # Supabase RPC expects the vector as a string representation
-        embedding_str = json.dumps(query_emb)
+        sb = get_supabase()
 
-        result = sb.rpc(
-            "search_similar_nodes",
-            {
-                "query_embedding": embedding_str,
-                "match_count": top_k,
-            },
-        ).execute()
+        with metrics.VECTOR_SEARCH_SECONDS.time(backend="pgvector"):
+            result = None
+            if self._packed_rpc:
+                try:
+                    result = sb.rpc(
+                        "search_similar_nodes_packed",
+                        {
+                            "query_packed": pack_vector(query_emb),
+                            "match_count": top_k,
+                            **filter_params,
+                        },
+                    ).execute()
+                except Exception as e:
+                    self._packed_rpc = False
+                    logger.warning(
+                        f"[Embeddings] search_similar_nodes_packed unavailable, "
+                        f"sending JSON vectors (run migrate.py to add it): {e}"
+                    )
+            if result is None:
+                # Supabase RPC expects the vector as a string representation
+                result = sb.rpc(
+                    "search_similar_nodes",
+                    {
+                        "query_embedding": json.dumps(query_emb.tolist()),
+                        "match_count": top_k,
+                        **filter_params,
+                    },
+                ).execute()
 
         results: list[tuple[str, float]] = []
         if result.data:
@@ -159,54 +576,11 @@ class EmbeddingService:
         return results
 
     def _keyword_search(
-        self, query: str, top_k: int
+        self, query: str, top_k: int, filters: SearchFilters | None = None
     ) -> list[tuple[str, float]]:
-        """Fallback keyword-based search when embeddings aren't available."""
-        # If _texts is empty but Supabase is available, try loading texts
-        if not self._texts and self._use_supabase:
-            try:
-                self._load_texts_from_supabase()
-            except Exception as e:
-                logger.warning(
-                    f"[Embeddings] Failed to load texts from Supabase: {e}"
-                )
-
-        query_words = set(query.lower().split())
-        stop_words = {
-            "the", "a", "an", "is", "are", "was", "were",
-            "what", "why", "how", "who", "when",
-            "did", "do", "does",
-            "to", "for", "of", "in", "on", "at",
-            "and", "or", "but", "not",
-            "this", "that", "it",
-        }
-        query_words -= stop_words
-
-        scores = []
-        for node_id, text in self._texts.items():
-            text_words = set(text.lower().split())
-            overlap = len(query_words & text_words)
-            if overlap > 0:
-                score = overlap / max(len(query_words), 1)
-                scores.append((node_id, score))
-
-        scores.sort(key=lambda x: x[1], reverse=True)
-        return scores[:top_k]
-
-    def _load_texts_from_supabase(self) -> None:
-        """Load text_content from node_embeddings for keyword fallback."""
-        sb = get_supabase()
-        result = (
-            sb.table("node_embeddings")
-            .select("node_id, text_content")
-            .execute()
-        )
-        if result.data:
-            for row in result.data:
-                self._texts[row["node_id"]] = row["text_content"]
-            logger.info(
-                f"[Embeddings] Loaded {len(result.data)} texts from Supabase"
-            )
+        """Fallback BM25 keyword search when embeddings aren't available."""
+        allowed = filters.allowed_ids() if filters else None
+        return get_node_index().search(query, top_k, allowed=allowed)
 
     @property
     def is_ready(self) -> bool:
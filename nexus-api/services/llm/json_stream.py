@@ -0,0 +1,129 @@
+"""Incremental JSON parsing for streamed completions."""
+
+import json
+
+
+def parse_json_text(raw: str) -> dict:
+    """Parse a JSON completion, stripping markdown fences if present."""
+    text = raw.strip()
+    if text.startswith("```"):
+        lines = text.split("\n")
+        lines = [l for l in lines if not l.strip().startswith("```")]
+        text = "\n".join(lines)
+    return json.loads(text)
+
+
+class JSONArrayStreamParser:
+    """Scan a streamed JSON object and emit elements of its top-level arrays.
+
+    Given chunks of text like '{"findings": [{...}, {...}]}', feed() returns
+    ("findings", element) for each array element as soon as its closing
+    bracket arrives. Text before the first '{' (e.g. a ```json fence) is
+    ignored. Only arrays directly under the top-level object are tracked,
+    optionally restricted to the given keys.
+    """
+
+    def __init__(self, keys: set[str] | None = None):
+        self.keys = keys
+        self._chunks: list[str] = []
+        # Text not yet scanned, plus the part an unfinished key or element still needs
+        self._window = ""
+        self._offset = 0  # position of self._window[0] in the whole text
+        self._pos = 0
+        self._started = False
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_key: str | None = None
+        self._array_key: str | None = None
+        self._element_start: int | None = None
+        self._scalar = False
+
+    @property
+    def text(self) -> str:
+        return "".join(self._chunks)
+
+    def feed(self, chunk: str) -> list[tuple[str, object]]:
+        """Consume a chunk and return any array elements it completed.
+
+        Positions are absolute; text is sliced out of the window, so each
+        chunk costs its own length plus that of the element still open.
+        """
+        self._chunks.append(chunk)
+        base = self._offset
+        text = self._window + chunk
+        out: list[tuple[str, object]] = []
+
+        for i in range(self._pos, base + len(text)):
+            c = text[i - base]
+
+            if not self._started:
+                if c == "{":
+                    self._started = True
+                    self._stack.append("{")
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        self._last_key = json.loads(text[self._string_start - base:i + 1 - base])
+                continue
+
+            in_array = len(self._stack) == 2 and self._stack[1] == "[" and self._tracking()
+
+            if in_array and self._element_start is None and c not in " \t\r\n,]":
+                self._element_start = i
+                self._scalar = c not in "{["
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c in "{[":
+                if len(self._stack) == 1 and c == "[":
+                    self._array_key = self._last_key
+                self._stack.append(c)
+            elif c in "}]":
+                if in_array and self._element_start is not None and self._scalar and c == "]":
+                    self._emit(text[self._element_start - base:i - base], out)
+                if self._stack:
+                    self._stack.pop()
+                if (
+                    len(self._stack) == 2 and self._stack[1] == "["
+                    and self._element_start is not None and not self._scalar
+                    and self._tracking()
+                ):
+                    self._emit(text[self._element_start - base:i + 1 - base], out)
+            elif c == "," and in_array and self._element_start is not None and self._scalar:
+                self._emit(text[self._element_start - base:i - base], out)
+
+        self._pos = base + len(text)
+        keep = self._pos
+        if self._in_string:
+            keep = min(keep, self._string_start)
+        if self._element_start is not None:
+            keep = min(keep, self._element_start)
+        self._window = text[keep - base:]
+        self._offset = keep
+        return out
+
+    def _tracking(self) -> bool:
+        return self.keys is None or self._array_key in self.keys
+
+    def _emit(self, raw: str, out: list):
+        self._element_start = None
+        self._scalar = False
+        try:
+            out.append((self._array_key, json.loads(raw)))
+        except json.JSONDecodeError:
+            # Malformed element; the final parse of the whole text decides
+            pass
+
+    def result(self) -> dict:
+        """Parse the complete accumulated text."""
+        return parse_json_text(self.text)
@@ -0,0 +1,60 @@
+"""Prompt assembly ordered for provider-side prompt prefix caching.
+
+Providers cache the longest previously seen prefix of a prompt, so segments
+are laid out from most static to most dynamic. Prompts that share data (the
+six immune agents, worker tracker, task scheduler, info router) render the
+same shared prefix byte for byte and only diverge at their task instructions.
+"""
+
+from .context_builder import ContextBuilder
+from . import prompts
+
+# Segment tiers, from most static to most dynamic
+STATIC = 0    # fixed instructions and org identity
+SHARED = 1    # graph-derived data shared across tasks within a generation
+TASK = 2      # per-task instructions and task-specific data
+DYNAMIC = 3   # per-call input
+
+# Budgets for the shared org prefix. Every caller must use the same values
+# or the prefix stops being byte-identical across tasks.
+SHARED_ORG_CONTEXT_TOKENS = 2000
+SHARED_ALERTS_TOKENS = 800
+
+
+class PromptLayout:
+    """Collects prompt segments and renders them ordered by tier."""
+
+    def __init__(self):
+        self._segments: list[tuple[int, str]] = []
+
+    def add(self, tier: int, text: str) -> "PromptLayout":
+        """Append a segment; segments within a tier keep insertion order."""
+        if text:
+            self._segments.append((tier, text))
+        return self
+
+    def build(self, user_from: int = DYNAMIC) -> tuple[str, str]:
+        """Return (system_prompt, user_prompt).
+
+        Segments below the user_from tier form the system prompt, the rest
+        form the user prompt.
+        """
+        ordered = sorted(enumerate(self._segments), key=lambda s: (s[1][0], s[0]))
+        system = [text for _, (tier, text) in ordered if tier < user_from]
+        user = [text for _, (tier, text) in ordered if tier >= user_from]
+        return "\n\n".join(system), "\n\n".join(user)
+
+
+def org_layout(ctx: ContextBuilder | None = None, include_org: bool = True) -> PromptLayout:
+    """Start a layout with the shared NEXUS prefix.
+
+    The prefix is NEXUS_BASE followed by the org context and active alerts.
+    Callers add their own TASK and DYNAMIC segments after it.
+    """
+    ctx = ctx or ContextBuilder()
+    layout = PromptLayout()
+    layout.add(STATIC, prompts.NEXUS_BASE.format(**ctx.build_org_summary()))
+    if include_org:
+        layout.add(SHARED, "Organizational knowledge graph:\n" + ctx.build_org_context(max_tokens=SHARED_ORG_CONTEXT_TOKENS))
+        layout.add(SHARED, "Active alerts:\n" + ctx.build_alerts_context(max_tokens=SHARED_ALERTS_TOKENS))
+    return layout
@@ -370,11 +370,11 @@ Rules:
 - If multiple perspectives exist, present all of them
 - Be concise but thorough — executive-level communication
 
-Retrieved context:
-{retrieved_context}
-
 Active alerts:
-{alerts_context}"""
+{alerts_context}
+
+Retrieved context:
+{retrieved_context}"""
 
 ASK_NEXUS_STRUCTURED = """You are NEXUS. Answer the user's question using the retrieved context.
 Return a structured JSON response:
@@ -397,15 +397,15 @@ Return a structured JSON response:
   "suggested_followups": ["<2-3 follow-up questions>"]
 }}
 
-Retrieved context:
-{retrieved_context}
-
 Active alerts:
-{alerts_context}"""
+{alerts_context}
+
+Retrieved context:
+{retrieved_context}"""
 
 # ── Module 8: Briefing Generation ─────────────────────────────────────────────
 
-BRIEFING_GENERATOR = """You are NEXUS generating an executive briefing for {person_name} ({role}, {division}).
+BRIEFING_GENERATOR = """You are NEXUS generating an executive briefing for the reader described at the end.
 Analyze recent organizational activity and produce a concise briefing.
 
 Structure:
@@ -423,6 +423,7 @@ Recent changes and context:
 Active alerts:
 {alerts_context}
 
+Reader: {person_name} ({role}, {division})
 {person_name}'s responsibilities:
 {person_context}"""
 
@@ -0,0 +1,216 @@
+"""Quantized vector index with two-stage search.
+
+Vectors are kept in RAM only as compact codes:
+
+  int8    one signed byte per dimension plus a per-row scale (4x smaller)
+  binary  one bit per dimension, the sign of each component (32x smaller)
+
+A query first scans the codes (int8 dot products, or Hamming distance on
+the packed bits), keeps the best top_k * NEXUS_EMBEDDING_RERANK_FACTOR
+candidates, and reranks them with exact float similarity. Float rows for
+the rerank come from a source such as the memory-mapped EmbeddingStore, so
+they stay in the page cache instead of the worker's heap. Without a source
+the index keeps its own float16 copy.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+from .vector_index import allowed_rows, normalize, top_k_indices
+
+QUANTIZATIONS = ("none", "int8", "binary")
+_SCAN_CHUNK = 8192
+
+if hasattr(np, "bitwise_count"):
+    def _popcount(x: np.ndarray) -> np.ndarray:
+        return np.bitwise_count(x)
+else:  # numpy < 2.0
+    _POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(x: np.ndarray) -> np.ndarray:
+        return _POPCOUNT[x]
+
+
+def quantize_int8(rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 codes and the scales that map them back to floats."""
+    scales = np.abs(rows).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(rows / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def quantize_binary(rows: np.ndarray) -> np.ndarray:
+    """Sign bits packed eight dimensions to a byte."""
+    return np.packbits(rows > 0, axis=1)
+
+
+class QuantizedIndex:
+    """Compact codes for the first-stage scan, exact floats for the rerank.
+
+    Same interface as VectorIndex (add, remove, search, search_batch).
+    rerank_source, if given, must provide get(ids) -> normalized float32 rows
+    for every indexed id.
+    """
+
+    def __init__(self, kind: str = "int8", rerank_source=None, rerank_factor: int | None = None):
+        if kind not in ("int8", "binary"):
+            raise ValueError(f"Unknown quantization {kind!r}, expected int8 or binary")
+        self.kind = kind
+        self.rerank_source = rerank_source
+        self.rerank_factor = rerank_factor or int(os.getenv("NEXUS_EMBEDDING_RERANK_FACTOR", "8"))
+        self.dim: int | None = None
+        self._ids: list[str] = []
+        self._pos: dict[str, int] = {}
+        # Per-row arrays, kept aligned and moved together on removal
+        self._codes: np.ndarray | None = None
+        self._scales: np.ndarray | None = None
+        self._floats: np.ndarray | None = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, node_id: str) -> bool:
+        return node_id in self._pos
+
+    @property
+    def ids(self) -> list[str]:
+        return list(self._ids)
+
+    @property
+    def nbytes(self) -> int:
+        """Heap bytes held for vectors (codes, scales and any float16 rerank copy)."""
+        n = len(self._ids)
+        return sum(a[:n].nbytes for a in self._arrays())
+
+    def _arrays(self) -> list[np.ndarray]:
+        return [a for a in (self._codes, self._scales, self._floats) if a is not None]
+
+    def _reserve(self, rows: int):
+        if self._codes is not None and rows <= len(self._codes):
+            return
+        capacity = max(rows, 2 * (len(self._codes) if self._codes is not None else 0), 64)
+        n = len(self._ids)
+
+        def grow(old, shape, dtype):
+            new = np.zeros((capacity, *shape), dtype=dtype)
+            if old is not None:
+                new[:n] = old[:n]
+            return new
+
+        width = self.dim if self.kind == "int8" else (self.dim + 7) // 8
+        self._codes = grow(self._codes, (width,), np.int8 if self.kind == "int8" else np.uint8)
+        if self.kind == "int8":
+            self._scales = grow(self._scales, (), np.float32)
+        if self.rerank_source is None:
+            self._floats = grow(self._floats, (self.dim,), np.float16)
+
+    def add(self, ids: list[str], vectors) -> None:
+        """Insert or replace vectors for the given ids."""
+        if not ids:
+            return
+        rows = normalize(vectors)
+        if len(rows) != len(ids):
+            raise ValueError(f"Got {len(ids)} ids for {len(rows)} vectors")
+        with self._lock:
+            if self.dim is None:
+                self.dim = rows.shape[1]
+            elif rows.shape[1] != self.dim:
+                raise ValueError(f"Vector dimension {rows.shape[1]} does not match index dimension {self.dim}")
+            new = sum(1 for node_id in dict.fromkeys(ids) if node_id not in self._pos)
+            self._reserve(len(self._ids) + new)
+            positions = []
+            for node_id in ids:
+                pos = self._pos.get(node_id)
+                if pos is None:
+                    pos = len(self._ids)
+                    self._ids.append(node_id)
+                    self._pos[node_id] = pos
+                positions.append(pos)
+            if self.kind == "int8":
+                self._codes[positions], self._scales[positions] = quantize_int8(rows)
+            else:
+                self._codes[positions] = quantize_binary(rows)
+            if self._floats is not None:
+                self._floats[positions] = rows
+
+    def remove(self, ids: list[str]) -> int:
+        """Drop vectors for the given ids; returns how many were present."""
+        removed = 0
+        with self._lock:
+            for node_id in ids:
+                pos = self._pos.pop(node_id, None)
+                if pos is None:
+                    continue
+                last = len(self._ids) - 1
+                if pos != last:
+                    moved = self._ids[last]
+                    for arr in self._arrays():
+                        arr[pos] = arr[last]
+                    self._ids[pos] = moved
+                    self._pos[moved] = pos
+                self._ids.pop()
+                removed += 1
+        return removed
+
+    # ── Search ───────────────────────────────────────────────────────────────
+
+    def _scan(self, query: np.ndarray, k: int, rows: np.ndarray | None = None) -> np.ndarray:
+        """First stage: rows (of all, or of the given rows) with the best approximate scores."""
+        n = len(self._ids)
+        codes = self._codes[:n] if rows is None else self._codes[rows]
+        if self.kind == "int8":
+            scales = self._scales[:n] if rows is None else self._scales[rows]
+            scores = np.empty(len(codes), dtype=np.float32)
+            for start in range(0, len(codes), _SCAN_CHUNK):
+                end = min(start + _SCAN_CHUNK, len(codes))
+                # einsum accumulates straight from int8 without a float32 copy of the chunk
+                dots = np.einsum("ij,j->i", codes[start:end], query, dtype=np.float32)
+                scores[start:end] = dots * scales[start:end]
+        else:
+            packed = quantize_binary(query[None, :])[0]
+            distances = np.empty(len(codes), dtype=np.int32)
+            for start in range(0, len(codes), _SCAN_CHUNK):
+                end = min(start + _SCAN_CHUNK, len(codes))
+                distances[start:end] = _popcount(codes[start:end] ^ packed).sum(axis=1, dtype=np.int32)
+            scores = -distances.astype(np.float32)
+        best = top_k_indices(scores[None, :], min(k, len(codes)))[0]
+        return best if rows is None else rows[best]
+
+    def _float_rows(self, rows: np.ndarray) -> np.ndarray:
+        if self.rerank_source is None:
+            return self._floats[rows].astype(np.float32)
+        return self.rerank_source.get([self._ids[r] for r in rows])
+
+    def get(self, ids: list[str]) -> np.ndarray:
+        """Float rows for ids, which must all be indexed."""
+        with self._lock:
+            return self._float_rows(np.array([self._pos[node_id] for node_id in ids], dtype=np.int64))
+
+    def search(self, query, top_k: int = 20, allowed: set[str] | None = None) -> list[tuple[str, float]]:
+        """Top-k (id, cosine similarity) for one query vector."""
+        return self.search_batch([query], top_k, allowed=allowed)[0]
+
+    def search_batch(self, queries, top_k: int = 20, allowed: set[str] | None = None) -> list[list[tuple[str, float]]]:
+        """Top-k (id, cosine similarity) for each query: code scan, then exact float rerank.
+
+        allowed restricts both stages to those ids.
+        """
+        q = normalize(queries)
+        with self._lock:
+            if not self._ids or top_k <= 0:
+                return [[] for _ in range(len(q))]
+            if q.shape[1] != self.dim:
+                raise ValueError(f"Query dimension {q.shape[1]} does not match index dimension {self.dim}")
+            rows = allowed_rows(self._pos, allowed) if allowed is not None else None
+            if rows is not None and not len(rows):
+                return [[] for _ in range(len(q))]
+            results = []
+            for query in q:
+                candidates = self._scan(query, top_k * self.rerank_factor, rows)
+                exact = self._float_rows(candidates) @ query
+                best = top_k_indices(exact[None, :], min(top_k, len(candidates)))[0]
+                results.append([(self._ids[candidates[i]], float(exact[i])) for i in best])
+            return results
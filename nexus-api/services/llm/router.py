@@ -0,0 +1,237 @@
+"""SLO-aware model routing.
+
+route_model() is a static split between heavy and fast tasks. ModelRouter
+layers live signals on top of it: the heavy model's recent p95 latency,
+error rate and queue depth, checked against a per-task latency budget.
+When the heavy model is under pressure, tasks marked downgradable are sent
+to the fast model until it recovers, subject to quality guards:
+
+  - prompts larger than NEXUS_ROUTER_MAX_DOWNGRADE_TOKENS stay on heavy
+  - no downgrade while the fast model is itself failing
+
+A caller can force a model per request with "heavy", "fast" or a model name.
+API endpoints accept only the overrides in allowed_overrides(), so clients
+cannot pick an arbitrary (and arbitrarily priced) model.
+
+Configured through the environment:
+    NEXUS_ROUTER_ADAPTIVE             1 (default) | 0 to use the static split only
+    NEXUS_ROUTER_DOWNGRADABLE         comma-separated task types (default info_routing,worker_analysis)
+    NEXUS_ROUTER_P95_BUDGET_S         default p95 latency budget per task (default 20)
+    NEXUS_ROUTER_TASK_BUDGETS         per-task overrides, e.g. "info_routing=8,worker_analysis=30"
+    NEXUS_ROUTER_MAX_ERROR_RATE       recent heavy-model error rate that triggers downgrade (default 0.2)
+    NEXUS_ROUTER_MAX_QUEUE            heavy-model calls waiting for a slot (default 8)
+    NEXUS_ROUTER_MAX_DOWNGRADE_TOKENS largest prompt eligible for downgrade (default 12000)
+    NEXUS_ROUTER_COOLDOWN_S           minimum time to stay downgraded once triggered (default 30)
+    NEXUS_ROUTER_ALLOWED_MODELS       comma-separated model names API callers may request by name,
+                                      besides the heavy and fast models (default none)
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+
+import numpy as np
+
+from .. import metrics
+
+logger = logging.getLogger("nexus.llm.router")
+
+HEAVY_TASKS = {
+    "immune_agent", "briefing", "onboarding", "task_scheduling",
+    "conflict_analysis", "contradiction_detection", "executive_summary",
+    "complex_ask", "decision_chain_analysis", "relationship_extraction",
+    "info_routing", "worker_analysis",
+}
+
+FAST_TASKS = {
+    "classify", "extract_entities", "route_info", "simple_ask",
+    "infodrop_classify", "summarize_short", "dedup_check",
+}
+
+# Outcomes older than this do not count toward p95 or error rate
+_OUTCOME_WINDOW_S = 300
+_OUTCOMES_PER_MODEL = 1000
+_MIN_CALLS_FOR_ERROR_RATE = 5
+# A p95 from a handful of calls is noise
+_MIN_CALLS_FOR_P95 = 10
+
+
+def heavy_model() -> str:
+    return os.getenv("NEXUS_MODEL_HEAVY", "gpt-4o")
+
+
+def fast_model() -> str:
+    return os.getenv("NEXUS_MODEL_FAST", "gpt-4o-mini")
+
+
+def allowed_overrides() -> set[str]:
+    """Model overrides an API caller may request."""
+    extra = {m.strip() for m in os.getenv("NEXUS_ROUTER_ALLOWED_MODELS", "").split(",") if m.strip()}
+    return {"heavy", "fast", heavy_model(), fast_model()} | extra
+
+
+def check_override(override: str | None) -> None:
+    """Raise ValueError if an API caller may not request this model override."""
+    if override is not None and override not in allowed_overrides():
+        raise ValueError(f"Unknown model {override!r}, expected one of {sorted(allowed_overrides())}")
+
+
+def route_model(task_type: str) -> str:
+    """Static routing: fast tasks to the fast model, everything else to heavy."""
+    if task_type in FAST_TASKS:
+        return fast_model()
+    return heavy_model()
+
+
+def _parse_budgets(raw: str) -> dict[str, float]:
+    budgets = {}
+    for part in raw.split(","):
+        if "=" in part:
+            task, seconds = part.split("=", 1)
+            budgets[task.strip()] = float(seconds)
+    return budgets
+
+
+@dataclass
+class RouteDecision:
+    model: str
+    reason: str
+
+
+class ModelRouter:
+    """Picks a model per call from the static split plus live latency and error signals."""
+
+    def __init__(self):
+        self.adaptive = os.getenv("NEXUS_ROUTER_ADAPTIVE", "1") != "0"
+        self.downgradable = {
+            t.strip() for t in os.getenv("NEXUS_ROUTER_DOWNGRADABLE", "info_routing,worker_analysis").split(",") if t.strip()
+        }
+        self.default_budget = float(os.getenv("NEXUS_ROUTER_P95_BUDGET_S", "20"))
+        self.task_budgets = _parse_budgets(os.getenv("NEXUS_ROUTER_TASK_BUDGETS", ""))
+        self.max_error_rate = float(os.getenv("NEXUS_ROUTER_MAX_ERROR_RATE", "0.2"))
+        self.max_queue = int(os.getenv("NEXUS_ROUTER_MAX_QUEUE", "8"))
+        self.max_downgrade_tokens = int(os.getenv("NEXUS_ROUTER_MAX_DOWNGRADE_TOKENS", "12000"))
+        self.cooldown = float(os.getenv("NEXUS_ROUTER_COOLDOWN_S", "30"))
+        self._outcomes: dict[str, deque] = {}
+        self._downgraded_until: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    # ── Signals ──────────────────────────────────────────────────────────────
+
+    def record_outcome(self, model: str, task_type: str, seconds: float, ok: bool):
+        """Feed one finished call into the recent latency and error signals."""
+        with self._lock:
+            self._outcomes.setdefault(model, deque(maxlen=_OUTCOMES_PER_MODEL)).append(
+                (time.monotonic(), task_type, seconds, ok)
+            )
+
+    def _recent(self, model: str) -> list[tuple]:
+        # Time-bounded so a downgraded task's stale heavy-model samples age out
+        cutoff = time.monotonic() - _OUTCOME_WINDOW_S
+        with self._lock:
+            return [o for o in self._outcomes.get(model, ()) if o[0] >= cutoff]
+
+    def error_rate(self, model: str) -> float:
+        recent = [ok for _, _, _, ok in self._recent(model)]
+        if len(recent) < _MIN_CALLS_FOR_ERROR_RATE:
+            return 0.0
+        return 1 - sum(recent) / len(recent)
+
+    def p95(self, model: str, task_type: str) -> float | None:
+        latencies = [s for _, task, s, ok in self._recent(model) if ok and task == task_type]
+        if len(latencies) < _MIN_CALLS_FOR_P95:
+            return None
+        return float(np.quantile(latencies, 0.95))
+
+    def budget_for(self, task_type: str) -> float:
+        return self.task_budgets.get(task_type, self.default_budget)
+
+    def pressure(self, task_type: str) -> str | None:
+        """Why the heavy model is currently out of budget for this task, or None."""
+        model = heavy_model()
+        queued = metrics.LLM_QUEUED.get(model=model)
+        if queued > self.max_queue:
+            return f"queue {queued:.0f}>{self.max_queue}"
+        errors = self.error_rate(model)
+        if errors > self.max_error_rate:
+            return f"error rate {errors:.0%}>{self.max_error_rate:.0%}"
+        p95 = self.p95(model, task_type)
+        budget = self.budget_for(task_type)
+        if p95 is not None and p95 > budget:
+            return f"p95 {p95:.1f}s>{budget:.0f}s"
+        return None
+
+    # ── Routing ──────────────────────────────────────────────────────────────
+
+    def route(self, task_type: str, override: str | None = None, prompt_tokens: int = 0) -> RouteDecision:
+        """Choose a model for one call.
+
+        override is "heavy", "fast" or an explicit model name and always wins.
+        prompt_tokens, when known, feeds the downgrade size guard.
+        """
+        if override:
+            model = {"heavy": heavy_model(), "fast": fast_model()}.get(override, override)
+            return self._decide(task_type, model, "override")
+
+        model = route_model(task_type)
+        if not self.adaptive or task_type not in self.downgradable or model != heavy_model():
+            return self._decide(task_type, model, "static")
+
+        if prompt_tokens > self.max_downgrade_tokens:
+            return self._decide(task_type, model, "guard_prompt_size")
+
+        now = time.monotonic()
+        reason = self.pressure(task_type)
+        if reason is None and now < self._downgraded_until.get(task_type, 0):
+            reason = "cooldown"
+        if reason is None:
+            return self._decide(task_type, model, "static")
+
+        if self.error_rate(fast_model()) > self.max_error_rate:
+            return self._decide(task_type, model, "guard_fast_unhealthy")
+
+        if reason != "cooldown":
+            if now >= self._downgraded_until.get(task_type, 0):
+                logger.warning(f"[Router] Downgrading {task_type} to {fast_model()}: {reason}")
+            self._downgraded_until[task_type] = now + self.cooldown
+        return self._decide(task_type, fast_model(), "downgrade")
+
+    def _decide(self, task_type: str, model: str, reason: str) -> RouteDecision:
+        metrics.LLM_ROUTE_DECISIONS.inc(task_type=task_type, model=model, reason=reason)
+        return RouteDecision(model, reason)
+
+    def status(self) -> dict:
+        """Current signals and downgrade state, for the routing status endpoint."""
+        now = time.monotonic()
+        heavy = heavy_model()
+        return {
+            "adaptive": self.adaptive,
+            "heavy_model": heavy,
+            "fast_model": fast_model(),
+            "heavy_queued": metrics.LLM_QUEUED.get(model=heavy),
+            "heavy_error_rate": round(self.error_rate(heavy), 4),
+            "fast_error_rate": round(self.error_rate(fast_model()), 4),
+            "tasks": {
+                task: {
+                    "budget_p95_s": self.budget_for(task),
+                    "p95_s": self.p95(heavy, task),
+                    "pressure": self.pressure(task),
+                    "downgraded": now < self._downgraded_until.get(task, 0),
+                }
+                for task in sorted(self.downgradable)
+            },
+        }
+
+
+# ── Singleton ────────────────────────────────────────────────────────────────
+
+_router: ModelRouter | None = None
+
+def get_model_router() -> ModelRouter:
+    global _router
+    if _router is None:
+        _router = ModelRouter()
+    return _router
@@ -0,0 +1,183 @@
+"""Token counting and token-budgeted context assembly."""
+
+import os
+import logging
+from functools import lru_cache
+
+logger = logging.getLogger("nexus.llm.tokens")
+
+# Rough chars-per-token ratio used when no tokenizer is available
+_CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=8)
+def _get_encoder(model: str | None):
+    """Return a tiktoken encoder for the model, or None if unavailable."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        if model:
+            try:
+                return tiktoken.encoding_for_model(model)
+            except KeyError:
+                pass
+        return tiktoken.get_encoding(os.getenv("NEXUS_TOKENIZER_ENCODING", "o200k_base"))
+    except Exception as e:
+        # Encoding files are downloaded on first use; offline hosts fall back
+        logger.warning(f"[Tokens] Tokenizer unavailable, using estimate: {e}")
+        return None
+
+
+def count_tokens(text: str, model: str | None = None) -> int:
+    """Count tokens in text, estimating from length if no tokenizer is available."""
+    if not text:
+        return 0
+    enc = _get_encoder(model)
+    if enc is None:
+        return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str | None = None) -> str:
+    """Truncate text to at most max_tokens, cutting on line boundaries where possible."""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+
+    kept: list[str] = []
+    used = 0
+    for line in text.split("\n"):
+        cost = count_tokens(line + "\n", model)
+        if used + cost > max_tokens:
+            if not kept:
+                # A single oversized line: fall back to a token-exact cut
+                enc = _get_encoder(model)
+                if enc is None:
+                    return line[: max_tokens * _CHARS_PER_TOKEN]
+                return enc.decode(enc.encode(line, disallowed_special=())[:max_tokens])
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept)
+
+
+def fit_messages(messages: list[dict], max_tokens: int, model: str | None = None) -> list[dict]:
+    """The newest chat messages whose contents fit in max_tokens, oldest first.
+
+    Messages are kept whole; the window never opens on an assistant reply.
+    """
+    kept: list[dict] = []
+    used = 0
+    for message in reversed(messages):
+        cost = count_tokens(message.get("content") or "", model)
+        if used + cost > max_tokens:
+            break
+        kept.append(message)
+        used += cost
+    kept.reverse()
+    while kept and kept[0].get("role") == "assistant":
+        kept.pop(0)
+    return kept
+
+
+class ContextBudget:
+    """Assemble prioritized context sections under an explicit token budget.
+
+    Higher-priority sections get a larger share of the budget. Within a
+    section, items are admitted by descending relevance score until its share
+    runs out; admitted items are rendered in their original order so the
+    output still reads naturally. Items are never cut mid-line.
+    """
+
+    def __init__(self, max_tokens: int, model: str | None = None):
+        self.max_tokens = max_tokens
+        self.model = model
+        self._sections: list[dict] = []
+        self.report: dict[str, dict] = {}
+
+    def add_section(
+        self,
+        name: str,
+        items: list[tuple[float, str]],
+        priority: int = 0,
+        header: str | None = None,
+    ):
+        """Add a section of (score, text) items. Higher priority gets more budget."""
+        self._sections.append({
+            "name": name,
+            "items": items,
+            "priority": priority,
+            "header": header,
+        })
+
+    def render(self) -> str:
+        """Render all sections within budget and record per-section token usage.
+
+        A first pass caps each section at a share of the budget proportional
+        to its priority so no single section starves the others; a second
+        pass hands any leftover budget out in priority order.
+        """
+        sections = sorted(self._sections, key=lambda s: -s["priority"])
+        total_weight = sum(max(s["priority"], 1) for s in sections) or 1
+        chosen: dict[str, set[int]] = {s["name"]: set() for s in sections}
+        used: dict[str, int] = {s["name"]: 0 for s in sections}
+        costs = {
+            s["name"]: [count_tokens(text + "\n", self.model) for _, text in s["items"]]
+            for s in sections
+        }
+        header_costs = {
+            s["name"]: count_tokens(s["header"] + "\n", self.model) if s["header"] else 0
+            for s in sections
+        }
+        remaining = self.max_tokens
+
+        def fill(section: dict, cap: int) -> int:
+            name = section["name"]
+            items = section["items"]
+            spent = 0
+            header = header_costs[name] if not chosen[name] else 0
+            for i in sorted(range(len(items)), key=lambda i: -items[i][0]):
+                if i in chosen[name]:
+                    continue
+                cost = costs[name][i] + header
+                if spent + cost > cap:
+                    continue
+                chosen[name].add(i)
+                spent += cost
+                header = 0
+            used[name] += spent
+            return spent
+
+        for section in sections:
+            cap = self.max_tokens * max(section["priority"], 1) // total_weight
+            remaining -= fill(section, min(cap, remaining))
+        for section in sections:
+            if remaining <= 0:
+                break
+            remaining -= fill(section, remaining)
+
+        self.report = {
+            s["name"]: {
+                "tokens": used[s["name"]],
+                "items_kept": len(chosen[s["name"]]),
+                "items_dropped": len(s["items"]) - len(chosen[s["name"]]),
+            }
+            for s in sections
+        }
+
+        parts = []
+        for section in self._sections:
+            indices = sorted(chosen[section["name"]])
+            if not indices:
+                continue
+            lines = [section["header"]] if section["header"] else []
+            lines.extend(section["items"][i][1] for i in indices)
+            parts.append("\n".join(lines))
+
+        logger.debug(f"[Tokens] Context budget {self.max_tokens - remaining}/{self.max_tokens}: {self.report}")
+        return "\n\n".join(parts)
+
+    @property
+    def tokens_used(self) -> int:
+        return sum(r["tokens"] for r in self.report.values())
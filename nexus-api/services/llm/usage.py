@@ -1,122 +1,325 @@
-"""Token usage tracking and cost computation."""
+"""Token usage tracking and cost computation.
 
+Usage is aggregated incrementally: running totals per (model, task type),
+time buckets per minute/hour/day, and a bounded buffer of recent calls.
+Raw rows and bucket increments are persisted write-behind in batches, and
+historical windows are summed server-side from the llm_usage_rollups table,
+so summaries cost O(buckets) rather than O(calls).
+"""
+
+import os
+import asyncio
 import logging
-from datetime import datetime
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
 from ..supabase_client import get_supabase, is_supabase_configured
 
 logger = logging.getLogger("nexus.llm.usage")
 
-# Pricing per 1M tokens (as of Feb 2026)
+# Pricing per 1M tokens (as of Feb 2026). "cached_input" applies to prompt
+# tokens served from the provider's prompt prefix cache.
 PRICING = {
-    "gpt-5.2":    {"input": 1.75, "output": 14.00},
-    "gpt-4o":     {"input": 2.50, "output": 10.00},
-    "gpt-4o-mini": {"input": 0.15, "output": 0.60},
-    "text-embedding-3-large": {"input": 0.13, "output": 0.0},
+    "gpt-5.2":    {"input": 1.75, "cached_input": 0.175, "output": 14.00},
+    "gpt-4o":     {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+    "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+    "text-embedding-3-large": {"input": 0.13, "cached_input": 0.13, "output": 0.0},
 }
 
 
+def compute_cost(model: str, input_tokens: int, output_tokens: int, cached_tokens: int = 0) -> float:
+    """Cost in USD; cached_tokens is the part of input_tokens served from cache."""
+    pricing = PRICING.get(model, {"input": 2.50, "cached_input": 1.25, "output": 10.00})
+    uncached = max(input_tokens - cached_tokens, 0)
+    return (
+        uncached * pricing["input"]
+        + cached_tokens * pricing.get("cached_input", pricing["input"])
+        + output_tokens * pricing["output"]
+    ) / 1_000_000
+
+
+GRANULARITIES = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+# How long each granularity is kept in memory
+_RETENTION = {
+    "minute": timedelta(hours=3),
+    "hour": timedelta(days=3),
+    "day": timedelta(days=400),
+}
+
+_COUNTER_FIELDS = ("calls", "input_tokens", "cached_tokens", "output_tokens", "cost_usd")
+
+FLUSH_INTERVAL = float(os.getenv("NEXUS_USAGE_FLUSH_INTERVAL", "10"))
+FLUSH_BATCH = int(os.getenv("NEXUS_USAGE_FLUSH_BATCH", "50"))
+RECENT_CALLS = int(os.getenv("NEXUS_USAGE_RECENT_CALLS", "500"))
+# Cap on unflushed rows kept while Supabase is unreachable
+_MAX_PENDING_ROWS = 10_000
+
+
+def _empty() -> dict:
+    return {f: 0 for f in _COUNTER_FIELDS}
+
+
+def _add(counters: dict, delta: dict):
+    for f in _COUNTER_FIELDS:
+        counters[f] += delta.get(f) or 0
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    """Start of the bucket containing ts."""
+    if granularity == "minute":
+        return ts.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def parse_window(window: str | None) -> timedelta | None:
+    """Parse '15m', '24h' or '7d' into a timedelta; None means all time."""
+    if not window:
+        return None
+    units = {"m": "minutes", "h": "hours", "d": "days"}
+    unit = units.get(window[-1])
+    if unit is None or not window[:-1].isdigit():
+        raise ValueError(f"Invalid window {window!r}, expected e.g. 15m, 24h or 7d")
+    return timedelta(**{unit: int(window[:-1])})
+
+
+def granularity_for(window: timedelta | None) -> str:
+    """Coarsest bucket size that still resolves the window reasonably."""
+    if window is None or window > timedelta(days=3):
+        return "day"
+    if window > timedelta(hours=3):
+        return "hour"
+    return "minute"
+
+
 class UsageTracker:
     def __init__(self):
-        self.calls: list[dict] = []
+        self.recent: deque[dict] = deque(maxlen=RECENT_CALLS)
+        self._totals: dict[tuple[str, str], dict] = {}
+        self._buckets: dict[str, dict[tuple[datetime, str, str], dict]] = {g: {} for g in GRANULARITIES}
+        self._pending_rows: list[dict] = []
+        self._pending_rollups: dict[tuple[str, datetime, str, str], dict] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._flush_scheduled = False
 
-    def record(self, model: str, input_tokens: int, output_tokens: int, task_type: str):
-        pricing = PRICING.get(model, {"input": 2.50, "output": 10.00})
-        cost = (input_tokens * pricing["input"] + output_tokens * pricing["output"]) / 1_000_000
+    def record(
+        self,
+        model: str,
+        input_tokens: int,
+        output_tokens: int,
+        task_type: str,
+        cached_tokens: int = 0,
+    ):
+        cost = compute_cost(model, input_tokens, output_tokens, cached_tokens)
+        now = datetime.now(timezone.utc)
         entry = {
             "model": model,
             "input_tokens": input_tokens,
+            "cached_tokens": cached_tokens,
             "output_tokens": output_tokens,
             "cost_usd": round(cost, 6),
             "task_type": task_type,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now.isoformat(),
         }
+        delta = {**entry, "calls": 1}
 
-        # Always keep in-memory copy
-        self.calls.append(entry)
+        with self._lock:
+            self.recent.append(entry)
+            _add(self._totals.setdefault((model, task_type), _empty()), delta)
+            for granularity in GRANULARITIES:
+                start = bucket_start(now, granularity)
+                buckets = self._buckets[granularity]
+                key = (start, model, task_type)
+                if key not in buckets:
+                    self._prune(granularity, now)
+                _add(buckets.setdefault(key, _empty()), delta)
+                if is_supabase_configured():
+                    _add(self._pending_rollups.setdefault((granularity, *key), _empty()), delta)
+            if is_supabase_configured():
+                self._pending_rows.append({k: v for k, v in entry.items() if k != "timestamp"})
 
-        # Persist to Supabase
-        if is_supabase_configured():
+        self._maybe_flush()
+
+    def _prune(self, granularity: str, now: datetime):
+        cutoff = now - _RETENTION[granularity]
+        buckets = self._buckets[granularity]
+        for key in [k for k in buckets if k[0] < cutoff]:
+            del buckets[key]
+
+    # ── Write-behind persistence ─────────────────────────────────────────────
+
+    def _maybe_flush(self):
+        if not self._pending_rows or self._flush_scheduled:
+            return
+        due = len(self._pending_rows) >= FLUSH_BATCH or time.monotonic() - self._last_flush >= FLUSH_INTERVAL
+        if not due:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        # Keep Supabase round trips off the event loop
+        self._flush_scheduled = True
+        loop.run_in_executor(None, self.flush)
+
+    def flush(self):
+        """Persist buffered usage rows and rollup increments to Supabase."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._pending_rows = self._pending_rows, []
+                rollups, self._pending_rollups = self._pending_rollups, {}
+                self._flush_scheduled = False
+                self._last_flush = time.monotonic()
+            if not rows and not rollups:
+                return
             try:
                 sb = get_supabase()
-                sb.table("llm_usage").insert({
-                    "model": model,
-                    "input_tokens": input_tokens,
-                    "output_tokens": output_tokens,
-                    "cost_usd": round(cost, 6),
-                    "task_type": task_type,
-                }).execute()
+                if rows:
+                    sb.table("llm_usage").insert(rows).execute()
+                    rows = []
+                sb.rpc("increment_usage_rollups", {"p_rows": [
+                    {
+                        "granularity": granularity,
+                        "bucket_start": start.isoformat(),
+                        "model": model,
+                        "task_type": task_type,
+                        **{f: round(c[f], 6) if f == "cost_usd" else c[f] for f in _COUNTER_FIELDS},
+                    }
+                    for (granularity, start, model, task_type), c in rollups.items()
+                ]}).execute()
+                logger.debug(f"[UsageTracker] Flushed {len(rollups)} rollup increments")
             except Exception as e:
-                logger.warning(f"[UsageTracker] Failed to persist usage to Supabase: {e}")
+                logger.warning(f"[UsageTracker] Failed to persist usage to Supabase, will retry: {e}")
+                self._requeue(rows, rollups)
+
+    def _requeue(self, rows: list[dict], rollups: dict):
+        with self._lock:
+            self._pending_rows = (rows + self._pending_rows)[-_MAX_PENDING_ROWS:]
+            for key, c in rollups.items():
+                _add(self._pending_rollups.setdefault(key, _empty()), c)
+
+    # ── Summaries ────────────────────────────────────────────────────────────
+
+    def get_summary(self, window: str | None = None) -> dict:
+        """Usage totals for the whole history or a trailing window like '24h'.
+
+        Blocking with Supabase configured (flush plus RPC); call it from a thread.
+        """
+        span = parse_window(window)
+        since = datetime.now(timezone.utc) - span if span else None
+        granularity = granularity_for(span)
 
-    def get_summary(self) -> dict:
         # Try Supabase first for a complete picture
         if is_supabase_configured():
             try:
+                self.flush()
                 sb = get_supabase()
-                result = sb.table("llm_usage").select("*").execute()
+                result = sb.rpc("usage_summary", {
+                    "p_since": bucket_start(since, granularity).isoformat() if since else None,
+                    "p_granularity": granularity,
+                }).execute()
                 if result.data is not None:
-                    rows = result.data
-                    total_cost = sum(r.get("cost_usd", 0) for r in rows)
-                    total_input = sum(r.get("input_tokens", 0) for r in rows)
-                    total_output = sum(r.get("output_tokens", 0) for r in rows)
-
-                    by_model: dict[str, dict] = {}
-                    by_task: dict[str, dict] = {}
-
-                    for r in rows:
-                        m = r.get("model", "unknown")
-                        if m not in by_model:
-                            by_model[m] = {"calls": 0, "cost_usd": 0, "input_tokens": 0, "output_tokens": 0}
-                        by_model[m]["calls"] += 1
-                        by_model[m]["cost_usd"] += r.get("cost_usd", 0)
-                        by_model[m]["input_tokens"] += r.get("input_tokens", 0)
-                        by_model[m]["output_tokens"] += r.get("output_tokens", 0)
-
-                        t = r.get("task_type", "unknown")
-                        if t not in by_task:
-                            by_task[t] = {"calls": 0, "cost_usd": 0}
-                        by_task[t]["calls"] += 1
-                        by_task[t]["cost_usd"] += r.get("cost_usd", 0)
-
-                    return {
-                        "total_calls": len(rows),
-                        "total_input_tokens": total_input,
-                        "total_output_tokens": total_output,
-                        "total_cost_usd": round(total_cost, 4),
-                        "by_model": by_model,
-                        "by_task_type": by_task,
-                    }
+                    return {**_summarize(result.data), "window": window}
             except Exception as e:
                 logger.warning(f"[UsageTracker] Failed to read usage from Supabase, using in-memory fallback: {e}")
 
         # In-memory fallback
-        total_cost = sum(c["cost_usd"] for c in self.calls)
-        total_input = sum(c["input_tokens"] for c in self.calls)
-        total_output = sum(c["output_tokens"] for c in self.calls)
-
-        by_model: dict[str, dict] = {}
-        by_task: dict[str, dict] = {}
-
-        for c in self.calls:
-            m = c["model"]
-            if m not in by_model:
-                by_model[m] = {"calls": 0, "cost_usd": 0, "input_tokens": 0, "output_tokens": 0}
-            by_model[m]["calls"] += 1
-            by_model[m]["cost_usd"] += c["cost_usd"]
-            by_model[m]["input_tokens"] += c["input_tokens"]
-            by_model[m]["output_tokens"] += c["output_tokens"]
-
-            t = c["task_type"]
-            if t not in by_task:
-                by_task[t] = {"calls": 0, "cost_usd": 0}
-            by_task[t]["calls"] += 1
-            by_task[t]["cost_usd"] += c["cost_usd"]
-
-        return {
-            "total_calls": len(self.calls),
-            "total_input_tokens": total_input,
-            "total_output_tokens": total_output,
-            "total_cost_usd": round(total_cost, 4),
-            "by_model": by_model,
-            "by_task_type": by_task,
-        }
+        with self._lock:
+            if since is None:
+                groups = [{"model": m, "task_type": t, **c} for (m, t), c in self._totals.items()]
+            else:
+                merged: dict[tuple[str, str], dict] = {}
+                floor = bucket_start(since, granularity)
+                for (start, model, task_type), c in self._buckets[granularity].items():
+                    if start >= floor:
+                        _add(merged.setdefault((model, task_type), _empty()), c)
+                groups = [{"model": m, "task_type": t, **c} for (m, t), c in merged.items()]
+        return {**_summarize(groups), "window": window}
+
+    def get_timeseries(self, granularity: str = "hour", window: str = "24h") -> list[dict]:
+        """Per-bucket totals (across models and task types) for charting. Blocking, like get_summary."""
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Invalid granularity {granularity!r}, expected one of {list(GRANULARITIES)}")
+        since = bucket_start(datetime.now(timezone.utc) - parse_window(window), granularity)
+
+        rows = None
+        if is_supabase_configured():
+            try:
+                self.flush()
+                sb = get_supabase()
+                result = (
+                    sb.table("llm_usage_rollups")
+                    .select("bucket_start, " + ", ".join(_COUNTER_FIELDS))
+                    .eq("granularity", granularity)
+                    .gte("bucket_start", since.isoformat())
+                    .execute()
+                )
+                rows = [{**r, "bucket_start": datetime.fromisoformat(r["bucket_start"])} for r in result.data or []]
+            except Exception as e:
+                logger.warning(f"[UsageTracker] Failed to read rollups from Supabase, using in-memory fallback: {e}")
+
+        if rows is None:
+            with self._lock:
+                rows = [
+                    {"bucket_start": start, **c}
+                    for (start, _, _), c in self._buckets[granularity].items()
+                    if start >= since
+                ]
+
+        series: dict[datetime, dict] = {}
+        for r in rows:
+            _add(series.setdefault(r["bucket_start"], _empty()), r)
+        return [
+            {"bucket_start": start.isoformat(), **{**c, "cost_usd": round(c["cost_usd"], 6)}}
+            for start, c in sorted(series.items())
+        ]
+
+    def get_recent(self, limit: int = 50) -> list[dict]:
+        with self._lock:
+            return list(self.recent)[-limit:]
+
+
+def _summarize(groups: list[dict]) -> dict:
+    """Aggregate per-(model, task type) counters into totals and breakdowns."""
+    totals = _empty()
+    by_model: dict[str, dict] = {}
+    by_task: dict[str, dict] = {}
+
+    for g in groups:
+        _add(totals, g)
+        m = g.get("model") or "unknown"
+        if m not in by_model:
+            by_model[m] = _empty()
+        _add(by_model[m], g)
+
+        t = g.get("task_type") or "unknown"
+        if t not in by_task:
+            by_task[t] = _empty()
+        _add(by_task[t], g)
+
+    for t in by_task.values():
+        del t["output_tokens"]
+    for bucket in (*by_model.values(), *by_task.values()):
+        bucket["cost_usd"] = round(bucket["cost_usd"], 6)
+        bucket["cache_hit_rate"] = round(bucket["cached_tokens"] / bucket["input_tokens"], 4) if bucket["input_tokens"] else 0.0
+
+    return {
+        "total_calls": totals["calls"],
+        "total_input_tokens": totals["input_tokens"],
+        "total_cached_tokens": totals["cached_tokens"],
+        "total_output_tokens": totals["output_tokens"],
+        "cache_hit_rate": round(totals["cached_tokens"] / totals["input_tokens"], 4) if totals["input_tokens"] else 0.0,
+        "total_cost_usd": round(totals["cost_usd"], 4),
+        "by_model": by_model,
+        "by_task_type": by_task,
+    }
@@ -0,0 +1,299 @@
+"""In-process vector index.
+
+Rows are L2-normalized float32 vectors in one contiguous matrix, so cosine
+similarity for a batch of queries is a single matrix product and top-k is
+an argpartition over each row of scores. At knowledge-graph sizes (hundreds
+to tens of thousands of nodes) this is exact and faster than a pgvector
+RPC round trip.
+
+Past NEXUS_VECTOR_ANN_MIN_ROWS rows an IVF partitioning takes over: rows
+are clustered around sqrt(n) spherical k-means centroids and a query only
+scores the rows in its NEXUS_VECTOR_IVF_NPROBE closest clusters, which
+keeps search cost sublinear in the number of rows. NEXUS_VECTOR_ANN=exact
+turns it off.
+"""
+
+import os
+import logging
+import threading
+
+import numpy as np
+
+logger = logging.getLogger("nexus.llm.vector_index")
+
+
+def normalize(vectors) -> np.ndarray:
+    """L2-normalize rows as float32; zero vectors stay zero."""
+    arr = np.asarray(vectors, dtype=np.float32)
+    if arr.ndim == 1:
+        arr = arr[None, :]
+    norms = np.linalg.norm(arr, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return arr / norms
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores per row, best first."""
+    n = scores.shape[-1]
+    if k >= n:
+        part = np.broadcast_to(np.arange(n), scores.shape)
+    else:
+        part = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=-1), axis=-1, kind="stable")
+    return np.take_along_axis(part, order, axis=-1)
+
+
+def allowed_rows(positions: dict[str, int], allowed: set[str]) -> np.ndarray:
+    """Sorted row numbers of the allowed ids that are indexed."""
+    rows = np.fromiter((positions[i] for i in allowed if i in positions), dtype=np.int64)
+    rows.sort()
+    return rows
+
+
+class IVF:
+    """Inverted-file partitioning over a VectorIndex's rows.
+
+    assign[row] is the cluster of each row. Inverted lists are derived from
+    it lazily, so adds and removals only touch the assignment array.
+    """
+
+    def __init__(self, centroids: np.ndarray, assign: np.ndarray, trained_rows: int):
+        self.centroids = centroids
+        self.assign = assign
+        self.trained_rows = trained_rows
+        self._lists: tuple[np.ndarray, np.ndarray] | None = None
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, nlist: int | None = None, iterations: int = 10, seed: int = 0) -> "IVF":
+        """Spherical k-means on a sample of rows, then assign every row."""
+        n = len(vectors)
+        nlist = min(nlist or max(1, int(np.sqrt(n))), n)
+        rng = np.random.default_rng(seed)
+        sample = vectors[np.sort(rng.choice(n, size=min(n, 64 * nlist), replace=False))]
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            empty = np.bincount(labels, minlength=nlist) == 0
+            # Re-seed empty clusters from random sample rows
+            sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+            centroids = normalize(sums)
+        ivf = cls(centroids, np.zeros(0, dtype=np.int32), n)
+        ivf.assign = ivf.nearest(vectors)
+        return ivf
+
+    def nearest(self, vectors: np.ndarray) -> np.ndarray:
+        out = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), 8192):
+            out[start : start + 8192] = np.argmax(vectors[start : start + 8192] @ self.centroids.T, axis=1)
+        return out
+
+    def set_rows(self, rows: np.ndarray, vectors: np.ndarray, total: int):
+        """(Re)assign the given rows; total is the live row count afterwards."""
+        if len(self.assign) < total:
+            grown = np.zeros(max(total, 2 * len(self.assign)), dtype=np.int32)
+            grown[: len(self.assign)] = self.assign
+            self.assign = grown
+        if len(rows):
+            self.assign[rows] = self.nearest(vectors)
+        self._lists = None
+
+    def move_row(self, src: int, dst: int):
+        self.assign[dst] = self.assign[src]
+        self._lists = None
+
+    def candidates(self, query: np.ndarray, nprobe: int, total: int) -> np.ndarray:
+        """Rows in the nprobe clusters closest to the query."""
+        if self._lists is None:
+            assign = self.assign[:total]
+            order = np.argsort(assign, kind="stable")
+            bounds = np.searchsorted(assign[order], np.arange(len(self.centroids) + 1))
+            self._lists = (order, bounds)
+        order, bounds = self._lists
+        probe = top_k_indices((self.centroids @ query)[None, :], nprobe)[0]
+        return np.concatenate([order[bounds[c] : bounds[c + 1]] for c in probe])
+
+
+class VectorIndex:
+    """Normalized float32 matrix with an id mapping, supporting upsert and removal.
+
+    Removal swaps the last row into the freed slot so the live rows stay
+    contiguous; capacity grows geometrically so incremental adds are cheap.
+    An index can also wrap an existing read-only matrix (e.g. a memmap from
+    EmbeddingStore), which is copied only on the first modification.
+    """
+
+    def __init__(self, dim: int | None = None):
+        self.dim = dim
+        self._matrix = np.zeros((0, dim or 0), dtype=np.float32)
+        self._ids: list[str] = []
+        self._pos: dict[str, int] = {}
+        self._lock = threading.RLock()
+        self.ann = os.getenv("NEXUS_VECTOR_ANN", "ivf")
+        self.ann_min_rows = int(os.getenv("NEXUS_VECTOR_ANN_MIN_ROWS", "20000"))
+        self.nprobe = int(os.getenv("NEXUS_VECTOR_IVF_NPROBE", "32"))
+        self._ivf: IVF | None = None
+
+    @classmethod
+    def from_normalized(cls, ids: list[str], matrix: np.ndarray) -> "VectorIndex":
+        """Wrap already-normalized float32 rows without copying them."""
+        if matrix.dtype != np.float32 or matrix.ndim != 2 or len(ids) != matrix.shape[0]:
+            raise ValueError("from_normalized needs one float32 row per id")
+        index = cls(matrix.shape[1])
+        index._matrix = matrix
+        index._ids = list(ids)
+        index._pos = {node_id: i for i, node_id in enumerate(ids)}
+        return index
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, node_id: str) -> bool:
+        return node_id in self._pos
+
+    @property
+    def ids(self) -> list[str]:
+        return list(self._ids)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """View of the live rows (normalized)."""
+        return self._matrix[: len(self._ids)]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of vector data (for a wrapped memmap, page cache rather than heap)."""
+        return self.vectors.nbytes
+
+    def _reserve(self, rows: int):
+        if rows <= self._matrix.shape[0] and self._matrix.flags.writeable:
+            return
+        capacity = max(rows, 2 * self._matrix.shape[0], 64)
+        grown = np.zeros((capacity, self.dim), dtype=np.float32)
+        grown[: len(self._ids)] = self._matrix[: len(self._ids)]
+        self._matrix = grown
+
+    def add(self, ids: list[str], vectors) -> None:
+        """Insert or replace vectors for the given ids."""
+        if not ids:
+            return
+        rows = normalize(vectors)
+        if len(rows) != len(ids):
+            raise ValueError(f"Got {len(ids)} ids for {len(rows)} vectors")
+        with self._lock:
+            if self.dim is None or not self._ids:
+                if self.dim != rows.shape[1]:
+                    self.dim = rows.shape[1]
+                    self._matrix = np.zeros((0, self.dim), dtype=np.float32)
+            elif rows.shape[1] != self.dim:
+                raise ValueError(f"Vector dimension {rows.shape[1]} does not match index dimension {self.dim}")
+            new = sum(1 for node_id in dict.fromkeys(ids) if node_id not in self._pos)
+            self._reserve(len(self._ids) + new)
+            positions = []
+            for node_id, row in zip(ids, rows):
+                pos = self._pos.get(node_id)
+                if pos is None:
+                    pos = len(self._ids)
+                    self._ids.append(node_id)
+                    self._pos[node_id] = pos
+                self._matrix[pos] = row
+                positions.append(pos)
+            if self._ivf is not None:
+                self._ivf.set_rows(np.asarray(positions), rows, len(self._ids))
+
+    def remove(self, ids: list[str]) -> int:
+        """Drop vectors for the given ids; returns how many were present."""
+        removed = 0
+        with self._lock:
+            if any(node_id in self._pos for node_id in ids):
+                self._reserve(len(self._ids))
+            for node_id in ids:
+                pos = self._pos.pop(node_id, None)
+                if pos is None:
+                    continue
+                last = len(self._ids) - 1
+                if pos != last:
+                    moved = self._ids[last]
+                    self._matrix[pos] = self._matrix[last]
+                    self._ids[pos] = moved
+                    self._pos[moved] = pos
+                    if self._ivf is not None:
+                        self._ivf.move_row(last, pos)
+                self._ids.pop()
+                removed += 1
+            if removed and self._ivf is not None:
+                self._ivf.set_rows(np.zeros(0, dtype=np.int64), self._matrix[:0], len(self._ids))
+        return removed
+
+    # ── Approximate search ───────────────────────────────────────────────────
+
+    def _use_ivf(self) -> bool:
+        """Train (or retrain after 4x growth) the IVF partitioning once the index is large enough."""
+        n = len(self._ids)
+        if self.ann != "ivf" or n < self.ann_min_rows:
+            return False
+        if self._ivf is None or n > 4 * self._ivf.trained_rows:
+            self.train_ivf()
+        return True
+
+    def train_ivf(self, nlist: int | None = None):
+        """Cluster the current rows into IVF partitions."""
+        with self._lock:
+            self._ivf = IVF.train(self.vectors, nlist)
+            logger.info(f"[VectorIndex] Trained IVF with {len(self._ivf.centroids)} lists over {len(self._ids)} rows")
+
+    def search_ivf(self, queries, top_k: int = 20, nprobe: int | None = None) -> list[list[tuple[str, float]]]:
+        """Approximate top-k scoring only rows in each query's closest IVF lists."""
+        q = normalize(queries)
+        with self._lock:
+            if self._ivf is None:
+                self.train_ivf()
+            nprobe = min(nprobe or self.nprobe, len(self._ivf.centroids))
+            results = []
+            for query in q:
+                rows = self._ivf.candidates(query, nprobe, len(self._ids))
+                scores = self._matrix[rows] @ query
+                best = top_k_indices(scores[None, :], min(top_k, len(rows)))[0]
+                results.append([(self._ids[rows[i]], float(scores[i])) for i in best])
+            return results
+
+    def get(self, ids: list[str]) -> np.ndarray:
+        """Normalized rows for ids, which must all be indexed."""
+        with self._lock:
+            return self._matrix[[self._pos[node_id] for node_id in ids]]
+
+    def search(self, query, top_k: int = 20, allowed: set[str] | None = None) -> list[tuple[str, float]]:
+        """Top-k (id, cosine similarity) for one query vector."""
+        return self.search_batch([query], top_k, allowed=allowed)[0]
+
+    def search_batch(
+        self, queries, top_k: int = 20, exact: bool = False, allowed: set[str] | None = None
+    ) -> list[list[tuple[str, float]]]:
+        """Top-k (id, cosine similarity) for each query vector; IVF-approximate on large indexes.
+
+        allowed restricts the search to those ids, scored exactly.
+        """
+        q = normalize(queries)
+        with self._lock:
+            if not self._ids or top_k <= 0:
+                return [[] for _ in range(len(q))]
+            if q.shape[1] != self.dim:
+                raise ValueError(f"Query dimension {q.shape[1]} does not match index dimension {self.dim}")
+            if allowed is not None:
+                rows = allowed_rows(self._pos, allowed)
+                scores = q @ self._matrix[rows].T
+                best = top_k_indices(scores, min(top_k, len(rows))) if len(rows) else np.zeros((len(q), 0), dtype=np.int64)
+                return [
+                    [(self._ids[rows[i]], float(row_scores[i])) for i in row]
+                    for row, row_scores in zip(best, scores)
+                ]
+            if not exact and self._use_ivf():
+                return self.search_ivf(q, top_k)
+            scores = q @ self.vectors.T
+            ids = self._ids
+            best = top_k_indices(scores, top_k)
+            return [
+                [(ids[i], float(row_scores[i])) for i in row]
+                for row, row_scores in zip(best, scores)
+            ]
@@ -0,0 +1,324 @@
+"""In-process metrics with Prometheus text exposition.
+
+A small registry of counters, gauges and histograms keyed by label values.
+Histograms keep cumulative buckets for Prometheus plus a sliding window of
+recent observations for p50/p95/p99, which is what SLO checks and routing
+decisions read. Everything is exposed on /metrics by main.py.
+"""
+
+import time
+import bisect
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# Latency buckets in seconds, from cache lookups up to slow heavy-model calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+RATE_BUCKETS = (5, 10, 20, 40, 60, 80, 100, 150, 200, 300, 500)
+QUANTILES = (0.5, 0.95, 0.99)
+WINDOW_SIZE = 1024
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def values(self) -> dict[tuple, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def _samples(self) -> list[str]:
+        return [f"{self.name}{_label_str(self.label_names, k)} {_fmt(v)}" for k, v in self.values().items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: dict[tuple, list[int]] = {}
+        self._sums: dict[tuple, float] = {}
+        self._windows: dict[tuple, deque] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            if key not in self._counts:
+                self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+                self._windows[key] = deque(maxlen=WINDOW_SIZE)
+            self._counts[key][bisect.bisect_left(self.buckets, value)] += 1
+            self._sums[key] += value
+            self._windows[key].append(value)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def quantiles(self, qs: tuple = QUANTILES, **labels) -> dict[float, float] | None:
+        """Quantiles over the recent window for one label set, or None if empty."""
+        with self._lock:
+            window = self._windows.get(self._key(labels))
+            values = list(window) if window else None
+        if not values:
+            return None
+        return dict(zip(qs, np.quantile(values, qs).tolist()))
+
+    def count(self, **labels) -> int:
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def label_sets(self) -> list[dict]:
+        with self._lock:
+            keys = list(self._counts)
+        return [dict(zip(self.label_names, k)) for k in keys]
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            snapshot = [(k, list(c), self._sums[k]) for k, c in self._counts.items()]
+        lines = []
+        for key, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = 'le="%s"' % _fmt(bound)
+                lines.append(f"{self.name}_bucket{_label_str(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_str(self.label_names, key)} {_fmt(total)}")
+            lines.append(f"{self.name}_count{_label_str(self.label_names, key)} {cumulative}")
+        return lines
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        # Recent-window quantiles as a companion summary family
+        with self._lock:
+            windows = [(k, list(w)) for k, w in self._windows.items() if w]
+        if windows:
+            name = f"{self.name}_recent"
+            lines += [f"# HELP {name} {self.help} (last {WINDOW_SIZE} observations)", f"# TYPE {name} summary"]
+            for key, values in windows:
+                for q, v in zip(QUANTILES, np.quantile(values, QUANTILES).tolist()):
+                    quantile = 'quantile="%s"' % q
+                    lines.append(f"{name}{_label_str(self.label_names, key, quantile)} {_fmt(v)}")
+                lines.append(f"{name}_sum{_label_str(self.label_names, key)} {_fmt(float(sum(values)))}")
+                lines.append(f"{name}_count{_label_str(self.label_names, key)} {len(values)}")
+        return lines
+
+
+# ── Registry ─────────────────────────────────────────────────────────────────
+
+_registry: dict[str, _Metric] = {}
+
+
+def _register(metric: _Metric) -> _Metric:
+    return _registry.setdefault(metric.name, metric)
+
+
+def counter(name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+    return _register(Counter(name, help, labels))
+
+
+def gauge(name: str, help: str, labels: tuple[str, ...] = ()) -> Gauge:
+    return _register(Gauge(name, help, labels))
+
+
+def histogram(name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+    return _register(Histogram(name, help, labels, buckets))
+
+
+def render() -> str:
+    """All registered metrics in Prometheus text exposition format."""
+    lines = []
+    for metric in _registry.values():
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ── NEXUS metrics ────────────────────────────────────────────────────────────
+
+LLM_REQUEST_SECONDS = histogram(
+    "nexus_llm_request_duration_seconds",
+    "End-to-end LLM call time including queueing and retries",
+    ("model", "task_type", "outcome"),
+)
+LLM_ATTEMPT_SECONDS = histogram(
+    "nexus_llm_attempt_duration_seconds",
+    "Time of a single provider attempt",
+    ("model", "task_type"),
+)
+LLM_QUEUE_WAIT_SECONDS = histogram(
+    "nexus_llm_queue_wait_seconds",
+    "Time spent waiting for an LLM concurrency slot",
+    ("model",),
+)
+LLM_TTFT_SECONDS = histogram(
+    "nexus_llm_time_to_first_token_seconds",
+    "Time from request to first streamed token",
+    ("model", "task_type"),
+)
+LLM_INTER_TOKEN_SECONDS = histogram(
+    "nexus_llm_inter_token_seconds",
+    "Gap between consecutive streamed tokens",
+    ("model", "task_type"),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+LLM_TOKENS_PER_SECOND = histogram(
+    "nexus_llm_stream_tokens_per_second",
+    "Streamed output rate after the first token",
+    ("model", "task_type"),
+    buckets=RATE_BUCKETS,
+)
+LLM_RETRIES = counter("nexus_llm_retries_total", "LLM attempts that were retried", ("model", "task_type"))
+LLM_RETRY_WAIT_SECONDS = counter("nexus_llm_retry_wait_seconds_total", "Time spent in retry backoff", ("model", "task_type"))
+LLM_ERRORS = counter("nexus_llm_errors_total", "Failed LLM attempts by error type", ("model", "task_type", "error"))
+LLM_HEDGES = counter("nexus_llm_hedges_total", "Hedged request outcomes: fired, skipped, primary_won, hedge_won", ("model", "task_type", "result"))
+LLM_ROUTE_DECISIONS = counter("nexus_llm_route_decisions_total", "Model routing decisions by reason", ("task_type", "model", "reason"))
+LLM_CACHE = counter("nexus_llm_cache_requests_total", "Response cache lookups", ("task_type", "result"))
+LLM_TOKENS = counter("nexus_llm_tokens_total", "Tokens processed", ("model", "task_type", "kind"))
+LLM_IN_FLIGHT = gauge("nexus_llm_in_flight", "LLM calls currently holding a concurrency slot", ("model",))
+LLM_QUEUED = gauge("nexus_llm_queued", "LLM calls waiting for a concurrency slot", ("model",))
+
+EMBEDDING_SECONDS = histogram(
+    "nexus_embedding_request_duration_seconds",
+    "Time of one embedding batch request",
+    ("model",),
+)
+EMBEDDING_TEXTS = counter("nexus_embedding_texts_total", "Texts embedded", ("model",))
+EMBEDDING_TEXTS_PER_SECOND = gauge("nexus_embedding_texts_per_second", "Throughput of the last multi-batch embed call", ("model",))
+EMBEDDING_NODES = counter("nexus_embedding_nodes_total", "Nodes seen by index syncs: embedded, reused, unchanged, pruned", ("result",))
+QUERY_EMBED_CACHE = counter("nexus_query_embedding_cache_total", "Query embedding lookups: hit, miss, coalesced", ("result",))
+ASK_CACHE = counter("nexus_ask_cache_total", "Answer cache lookups: hit, stale (served while refreshing), miss, coalesced, bypass", ("result",))
+ASK_CACHE_SAVED_SECONDS = counter("nexus_ask_cache_saved_seconds_total", "Pipeline time avoided by answers served from cache")
+ASK_CACHE_ENTRIES = gauge("nexus_ask_cache_entries", "Answers held in the in-memory answer cache")
+ASK_STREAM_FIRST_EVENT_SECONDS = histogram(
+    "nexus_ask_stream_first_event_seconds",
+    "Time from a streamed Ask request to its first retrieval and token events",
+    ("event",),
+)
+ASK_STREAM_FRAMES = counter("nexus_ask_stream_frames_total", "SSE frames sent by streamed Ask, by event type", ("type",))
+VECTOR_SEARCH_SECONDS = histogram(
+    "nexus_vector_search_seconds",
+    "Time of one nearest-neighbour lookup, excluding query embedding",
+    ("backend",),
+)
+RETRIEVAL_SECONDS = histogram(
+    "nexus_retrieval_stage_seconds",
+    "Time of one hybrid retrieval stage: lexical, vector (incl. query embedding), rerank",
+    ("stage",),
+)
+
+GRAPH_STORE_LOAD_SECONDS = histogram(
+    "nexus_graph_store_load_seconds",
+    "Time to load a data source on a cache miss",
+    ("source", "backend"),
+)
+GRAPH_STORE_CACHE = counter("nexus_graph_store_cache_total", "Graph store cache lookups", ("source", "result"))
+STORAGE_OP_SECONDS = histogram(
+    "nexus_storage_operation_seconds",
+    "Time of graph write operations",
+    ("op", "backend"),
+)
+
+
+def llm_snapshot() -> dict:
+    """p50/p95/p99 latency, TTFT and rates per model and task type, for SLO review."""
+    out: dict[str, dict] = {}
+    for labels in LLM_REQUEST_SECONDS.label_sets():
+        if labels["outcome"] != "ok":
+            continue
+        key = f"{labels['task_type']}@{labels['model']}"
+        q = LLM_REQUEST_SECONDS.quantiles(**labels) or {}
+        entry = out.setdefault(key, {"model": labels["model"], "task_type": labels["task_type"]})
+        entry["calls"] = LLM_REQUEST_SECONDS.count(**labels)
+        entry.update({f"p{int(k * 100)}_s": round(v, 4) for k, v in q.items()})
+        entry["retries"] = LLM_RETRIES.get(model=labels["model"], task_type=labels["task_type"])
+        ttft = LLM_TTFT_SECONDS.quantiles(model=labels["model"], task_type=labels["task_type"])
+        if ttft:
+            entry["ttft_p50_s"] = round(ttft[0.5], 4)
+            entry["ttft_p95_s"] = round(ttft[0.95], 4)
+        fired = LLM_HEDGES.get(model=labels["model"], task_type=labels["task_type"], result="fired")
+        if fired:
+            won = LLM_HEDGES.get(model=labels["model"], task_type=labels["task_type"], result="hedge_won")
+            entry["hedges_fired"] = fired
+            entry["hedge_fire_rate"] = round(fired / entry["calls"], 4)
+            entry["hedge_win_rate"] = round(won / fired, 4)
+    cache = LLM_CACHE.values()
+    hits = sum(v for k, v in cache.items() if k[1] == "hit")
+    lookups = sum(cache.values())
+    asks = ASK_CACHE.values()
+    served = sum(v for k, v in asks.items() if k[0] in ("hit", "stale"))
+    ask_lookups = served + asks.get(("miss",), 0) + asks.get(("coalesced",), 0)
+    return {
+        "by_task": out,
+        "cache_hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        "ask_cache": {
+            "hit_ratio": round(served / ask_lookups, 4) if ask_lookups else 0.0,
+            "saved_seconds": round(ASK_CACHE_SAVED_SECONDS.get(), 3),
+            "entries": ASK_CACHE_ENTRIES.get(),
+        },
+    }
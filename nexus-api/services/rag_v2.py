@@ -1,84 +1,93 @@
-"""Module 7: Real RAG pipeline — embedding search + LLM generation with citations."""
+"""Module 7: Real RAG pipeline — hybrid search + LLM generation with citations."""
 
+import os
+import asyncio
 import logging
+from contextlib import aclosing
+from . import metrics
 from .llm.client import get_llm_client
 from .llm.context_builder import ContextBuilder
 from .llm.embeddings import get_embedding_service
 from .llm import prompts
-from .graph_store import load_graph
-from .supabase_client import get_supabase, is_supabase_configured
+from .llm.tokens import ContextBudget, fit_messages
+from .answer_cache import get_answer_cache
+from .graph_expansion import expand, get_adjacency
+from .retrieval import SearchFilters, hybrid_search
+from .conversation_store import get_conversation_store
 
 logger = logging.getLogger("nexus.rag")
 
-# Conversation memory store (fallback)
-_conversations: dict[str, list[dict]] = {}
-
-
-def _load_conversation_history(conversation_id: str) -> list[dict]:
-    """Load conversation history from Supabase, falling back to in-memory."""
-    if is_supabase_configured():
-        try:
-            sb = get_supabase()
-            result = (
-                sb.table("conversation_messages")
-                .select("role, content")
-                .eq("conversation_id", conversation_id)
-                .order("created_at", desc=False)
-                .limit(10)
-                .execute()
-            )
-            if result.data:
-                return result.data
-        except Exception as e:
-            logger.warning(f"[RAG] Failed to load conversation from Supabase: {e}")
-
-    # In-memory fallback
-    if conversation_id in _conversations:
-        return _conversations[conversation_id][-10:]
-    return []
-
-
-def _save_conversation_messages(conversation_id: str, user_query: str, assistant_answer: str):
-    """Persist conversation messages to Supabase and in-memory."""
-    # Always keep in-memory copy
-    if conversation_id not in _conversations:
-        _conversations[conversation_id] = []
-    _conversations[conversation_id].append({"role": "user", "content": user_query})
-    _conversations[conversation_id].append({"role": "assistant", "content": assistant_answer})
-
-    if is_supabase_configured():
-        try:
-            sb = get_supabase()
-            # Upsert conversation record
-            sb.table("conversations").upsert({
-                "id": conversation_id,
-                "updated_at": "now()",
-            }).execute()
-
-            # Insert the two messages
-            sb.table("conversation_messages").insert([
-                {
-                    "conversation_id": conversation_id,
-                    "role": "user",
-                    "content": user_query,
-                },
-                {
-                    "conversation_id": conversation_id,
-                    "role": "assistant",
-                    "content": assistant_answer,
-                },
-            ]).execute()
-            logger.info(f"[RAG] Conversation {conversation_id} persisted to Supabase")
-        except Exception as e:
-            logger.warning(f"[RAG] Failed to persist conversation to Supabase: {e}")
+# Nodes retrieved before graph expansion
+RAG_TOP_K = int(os.getenv("NEXUS_RAG_TOP_K", "12"))
+RAG_STREAM_TOP_K = int(os.getenv("NEXUS_RAG_STREAM_TOP_K", "10"))
+# Hard limits on the expanded context
+RAG_MAX_NODES = int(os.getenv("NEXUS_RAG_MAX_NODES", "24"))
+RAG_CONTEXT_TOKENS = int(os.getenv("NEXUS_RAG_CONTEXT_TOKENS", "1800"))
+
+# Token budget for earlier conversation turns sent with a follow-up
+RAG_HISTORY_TOKENS = int(os.getenv("NEXUS_RAG_HISTORY_TOKENS", "1200"))
+
+
+def _node_line(node: dict, relevance: float) -> str:
+    """One context entry for a node."""
+    nid = node["id"]
+    line = (
+        f"[{node.get('type', '?').upper()}] {node.get('label', nid)} (ID: {nid})"
+        f" | Division: {node.get('division', '?')}"
+    )
+    if node.get("content"):
+        line += f"\n  Content: {node['content'][:300]}"
+    if node.get("role"):
+        line += f" | Role: {node['role']}"
+    if node.get("cognitive_load") is not None:
+        line += f" | Load: {node['cognitive_load']}"
+    if node.get("status"):
+        line += f" | Status: {node['status']}"
+    if node.get("freshness_score") is not None:
+        line += f" | Freshness: {node['freshness_score']}"
+    if relevance > 0:
+        line += f" | Relevance: {relevance:.2f}"
+    return line
 
 
 async def query_rag(
     query: str,
     conversation_id: str | None = None,
     structured: bool = True,
+    filters: SearchFilters | None = None,
 ) -> dict:
-    """Full RAG pipeline: embed query -> search -> expand context -> generate answer."""
+    """Full RAG pipeline: hybrid search -> budgeted graph expansion -> generate answer.
+
+    filters restrict retrieval, and the neighbours added by expansion, to
+    matching nodes. Answers to questions asked outside a conversation come
+    from the answer cache while the nodes they cite are unchanged.
+    """
+    cache = get_answer_cache()
+    if cache is None or conversation_id:
+        if cache is not None:
+            metrics.ASK_CACHE.inc(result="bypass")  # follow-ups depend on the conversation so far
+        result, _ = await _generate_answer(query, structured, filters, conversation_id)
+    else:
+        result = await cache.get_or_compute(
+            cache.key(query, filters, structured),
+            lambda: _generate_answer(query, structured, filters),
+        )
+
+    # Recorded in memory now, persisted by the store's background writer
+    if conversation_id:
+        get_conversation_store().append(conversation_id, query, result.get("answer", ""))
+
+    logger.info(f"[RAG] Answer with {len(result.get('citations', []))} citations for: {query[:50]}")
+    return result
+
+
+async def _generate_answer(
+    query: str,
+    structured: bool,
+    filters: SearchFilters | None,
+    conversation_id: str | None = None,
+) -> tuple[dict, list[str]]:
+    """Run the pipeline once; returns the answer and the ids of the nodes in its context."""
     client = get_llm_client()
     ctx = ContextBuilder()
     emb_service = get_embedding_service()
@@ -87,69 +96,48 @@ async def query_rag(
     if not emb_service.is_ready:
         await emb_service.build_index()
 
-    # Step 1: Semantic search
-    search_results = await emb_service.search(query, top_k=20)
+    # Step 1: Hybrid BM25 + vector search, with the graph-derived contexts and history loaded alongside
+    search_results, adjacency, alerts_context, org_summary, history = await asyncio.gather(
+        hybrid_search(query, top_k=RAG_TOP_K, filters=filters),
+        asyncio.to_thread(get_adjacency),
+        asyncio.to_thread(ctx.build_alerts_context),
+        asyncio.to_thread(ctx.build_org_summary),
+        _conversation_history(conversation_id),
+    )
     logger.info(f"[RAG] Retrieved {len(search_results)} nodes for: {query[:50]}...")
 
-    # Step 2: Expand context via graph neighbors
-    graph = load_graph()
-    nodes_by_id = {n["id"]: n for n in graph.get("nodes", [])}
-    edges = graph.get("edges", [])
-
-    retrieved_ids = {nid for nid, _ in search_results}
-    expanded_ids = set(retrieved_ids)
-
-    # 1-hop expansion
-    for e in edges:
-        if e["source"] in retrieved_ids:
-            expanded_ids.add(e["target"])
-        if e["target"] in retrieved_ids:
-            expanded_ids.add(e["source"])
-
-    # Step 3: Build context text
-    context_lines = []
-    for nid in expanded_ids:
-        node = nodes_by_id.get(nid)
-        if not node:
-            continue
-        relevance = next((s for n, s in search_results if n == nid), 0.0)
-        line = (
-            f"[{node.get('type', '?').upper()}] {node.get('label', nid)} (ID: {nid})"
-            f" | Division: {node.get('division', '?')}"
-        )
-        if node.get("content"):
-            line += f"\n  Content: {node['content'][:300]}"
-        if node.get("role"):
-            line += f" | Role: {node['role']}"
-        if node.get("cognitive_load") is not None:
-            line += f" | Load: {node['cognitive_load']}"
-        if node.get("status"):
-            line += f" | Status: {node['status']}"
-        if node.get("freshness_score") is not None:
-            line += f" | Freshness: {node['freshness_score']}"
-        if relevance > 0:
-            line += f" | Relevance: {relevance:.2f}"
-        context_lines.append(line)
-
-    # Add relevant edges
-    edge_lines = []
-    for e in edges:
-        if e["source"] in expanded_ids and e["target"] in expanded_ids:
-            edge_lines.append(f"  {e['source']} --[{e['type']}]--> {e['target']}")
-
-    retrieved_context = "\n".join(context_lines[:40])
-    if edge_lines:
-        retrieved_context += "\n\nRelationships:\n" + "\n".join(edge_lines[:30])
-
-    alerts_context = ctx.build_alerts_context()
-    org_summary = ctx.build_org_summary()
-
-    # Step 4: Build conversation history
-    messages = []
-    if conversation_id:
-        messages = _load_conversation_history(conversation_id)
+    # Step 2: Expand context over the graph, strongest relationships first
+    expanded = expand(
+        search_results,
+        max_nodes=RAG_MAX_NODES,
+        accept=filters.matches if filters else None,
+        adjacency=adjacency,
+    )
+    scores = dict(expanded)
+
+    # Step 3: Build context text within the token budget
+    budget = ContextBudget(RAG_CONTEXT_TOKENS)
+    budget.add_section(
+        "nodes",
+        [(score, _node_line(adjacency.nodes_by_id[nid], score)) for nid, score in expanded],
+        priority=3,
+    )
+    budget.add_section(
+        "relationships",
+        [
+            (min(scores[e["source"]], scores[e["target"]]), f"  {e['source']} --[{e['type']}]--> {e['target']}")
+            for e in adjacency.edges_between(scores)
+        ],
+        priority=1,
+        header="Relationships:",
+    )
+    retrieved_context = budget.render()
+    logger.info(
+        f"[RAG] Context: {len(search_results)} retrieved -> {len(expanded)} expanded nodes, "
+        f"{budget.tokens_used}/{RAG_CONTEXT_TOKENS} tokens"
+    )
 
-    # Step 5: Generate answer
+    # Step 4: Generate answer
     if structured:
         system = (
             prompts.NEXUS_BASE.format(**org_summary) + "\n\n"
@@ -173,18 +161,42 @@ async def query_rag(
         system_prompt=system,
         user_prompt=query,
         use_cache=False,
+        history=history,
     )
 
-    # Store conversation
-    if conversation_id:
-        _save_conversation_messages(conversation_id, query, result.get("answer", ""))
-
     logger.info(f"[RAG] Generated answer with {len(result.get('citations', []))} citations")
-    return result
-
-
-async def query_rag_stream(query: str):
-    """Stream RAG response token by token."""
+    return result, list(scores)
+
+
+async def _conversation_history(conversation_id: str | None) -> list[dict]:
+    """Earlier turns of a conversation that fit RAG_HISTORY_TOKENS, oldest first."""
+    if not conversation_id:
+        return []
+    store = get_conversation_store()
+    messages = store.cached(conversation_id)
+    if messages is None:
+        messages = await asyncio.to_thread(store.load, conversation_id)
+    return fit_messages(messages, RAG_HISTORY_TOKENS)
+
+
+def _cited_in_text(answer: str, nodes: list[tuple[dict, float]]) -> list[dict]:
+    """Context nodes the answer names, by label or id, in retrieval order."""
+    text = answer.casefold()
+    return [
+        {"node_id": node["id"], "label": node.get("label", node["id"]), "relevance": round(score, 4)}
+        for node, score in nodes
+        if node["id"].casefold() in text or (node.get("label") and node["label"].casefold() in text)
+    ]
+
+
+async def query_rag_stream(query: str, filters: SearchFilters | None = None):
+    """Stream a RAG answer as events, retrieval first.
+
+    Yields {"type": "retrieval", "nodes": [...]} as soon as search finishes,
+    a {"type": "token", "content": ...} per model token, then
+    {"type": "citations", ...} for the context nodes the answer names and a
+    final {"type": "result", ...} with the whole answer.
+    """
     client = get_llm_client()
     ctx = ContextBuilder()
     emb_service = get_embedding_service()
@@ -192,23 +204,34 @@ async def query_rag_stream(query: str):
     if not emb_service.is_ready:
         await emb_service.build_index()
 
-    search_results = await emb_service.search(query, top_k=15)
-    graph = load_graph()
-    nodes_by_id = {n["id"]: n for n in graph.get("nodes", [])}
-
-    context_lines = []
-    for nid, score in search_results:
-        node = nodes_by_id.get(nid)
-        if node:
-            context_lines.append(
-                f"[{node.get('type', '?').upper()}] {node.get('label', nid)}: "
-                f"{(node.get('content') or node.get('label', ''))[:200]}"
-            )
-
-    retrieved_context = "\n".join(context_lines[:25])
-    alerts_context = ctx.build_alerts_context()
-    org_summary = ctx.build_org_summary()
-
+    search_results, adjacency, alerts_context, org_summary = await asyncio.gather(
+        hybrid_search(query, top_k=RAG_STREAM_TOP_K, filters=filters),
+        asyncio.to_thread(get_adjacency),
+        asyncio.to_thread(ctx.build_alerts_context),
+        asyncio.to_thread(ctx.build_org_summary),
+    )
+    retrieved = [
+        (adjacency.nodes_by_id[nid], score) for nid, score in search_results if nid in adjacency.nodes_by_id
+    ]
+    yield {
+        "type": "retrieval",
+        "nodes": [
+            {
+                "id": node["id"],
+                "label": node.get("label", node["id"]),
+                "type": node.get("type"),
+                "division": node.get("division"),
+                "score": round(score, 4),
+            }
+            for node, score in retrieved
+        ],
+    }
+
+    retrieved_context = "\n".join(
+        f"[{node.get('type', '?').upper()}] {node.get('label', node['id'])}: "
+        f"{(node.get('content') or node.get('label', ''))[:200]}"
+        for node, _ in retrieved[:25]
+    )
     system = (
         prompts.NEXUS_BASE.format(**org_summary) + "\n\n"
         + prompts.ASK_NEXUS.format(
@@ -218,12 +241,26 @@ async def query_rag_stream(query: str):
         )
     )
 
-    # Stream tokens
-    async for token in await client.complete(
+    # Stream tokens; aclosing() releases the upstream stream if our consumer stops early
+    tokens = await client.complete(
         task_type="complex_ask",
         system_prompt=system,
         user_prompt=query,
         stream=True,
         use_cache=False,
-    ):
-        yield token
+    )
+    parts = []
+    async with aclosing(tokens):
+        async for token in tokens:
+            parts.append(token)
+            yield {"type": "token", "content": token}
+
+    answer = "".join(parts)
+    citations = _cited_in_text(answer, retrieved)
+    yield {"type": "citations", "citations": citations}
+    yield {
+        "type": "result",
+        "answer": answer,
+        "citations": citations,
+        "highlight_node_ids": [c["node_id"] for c in citations] or [node["id"] for node, _ in retrieved[:5]],
+    }
@@ -0,0 +1,168 @@
+"""Hybrid retrieval for Ask: BM25 and vector search fused with reciprocal rank fusion.
+
+Both retrievers run for every query: lexical search over the shared BM25
+index while the query embedding is in flight, then vector search. Their
+rankings are fused with RRF, score(d) = sum over lists of 1 / (k + rank),
+which needs no calibration between BM25 and cosine scores.
+
+SearchFilters (division, type, status) are applied inside each retriever
+rather than to their results, so a filtered query still gets a full top_k
+of matching nodes: as an allowed-id set for the in-process indexes and as
+SQL predicates for pgvector.
+
+With rerank, the fused candidates are rescored by a blend of exact cosine
+similarity (from the local vector index) and normalized BM25.
+
+Configured through the environment:
+    NEXUS_RRF_K                     RRF rank constant (default 60)
+    NEXUS_RETRIEVAL_CANDIDATES      results taken from each retriever before fusion (default 30)
+    NEXUS_RETRIEVAL_RERANK          1 to rerank fused candidates (default 0)
+    NEXUS_RETRIEVAL_RERANK_ALPHA    cosine weight in the rerank blend, BM25 gets the rest (default 0.7)
+"""
+
+import os
+import asyncio
+import logging
+from dataclasses import dataclass
+
+import numpy as np
+
+from . import metrics
+from .graph_store import get_generation, load_graph
+from .lexical_index import get_node_index
+
+logger = logging.getLogger("nexus.retrieval")
+
+RRF_K = int(os.getenv("NEXUS_RRF_K", "60"))
+
+
+@dataclass(frozen=True)
+class SearchFilters:
+    """Metadata pre-filters; an empty field matches every node."""
+
+    divisions: tuple[str, ...] = ()
+    types: tuple[str, ...] = ()
+    statuses: tuple[str, ...] = ()
+
+    @classmethod
+    def of(cls, divisions=None, types=None, statuses=None) -> "SearchFilters | None":
+        """Filters from optional lists, or None when nothing is filtered."""
+        filters = cls(tuple(divisions or ()), tuple(types or ()), tuple(statuses or ()))
+        return filters if filters else None
+
+    def __bool__(self) -> bool:
+        return bool(self.divisions or self.types or self.statuses)
+
+    def matches(self, node: dict) -> bool:
+        return (
+            (not self.divisions or node.get("division") in self.divisions)
+            and (not self.types or node.get("type") in self.types)
+            and (not self.statuses or node.get("status") in self.statuses)
+        )
+
+    def allowed_ids(self) -> set[str]:
+        """Ids of graph nodes passing the filters, cached per graph generation."""
+        generation = get_generation("graph")
+        cached = _allowed_cache.get(self)
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+        ids = {n["id"] for n in load_graph().get("nodes", []) if self.matches(n)}
+        if len(_allowed_cache) >= 64:
+            _allowed_cache.clear()
+        _allowed_cache[self] = (generation, ids)
+        return ids
+
+    def rpc_params(self) -> dict:
+        """search_similar_nodes arguments; omitted fields stay NULL."""
+        params = {}
+        if self.divisions:
+            params["filter_divisions"] = list(self.divisions)
+        if self.types:
+            params["filter_types"] = list(self.types)
+        if self.statuses:
+            params["filter_statuses"] = list(self.statuses)
+        return params
+
+
+_allowed_cache: dict[SearchFilters, tuple[int, set[str]]] = {}
+
+
+def reciprocal_rank_fusion(rankings: list[list[tuple[str, float]]], k: int = RRF_K) -> list[tuple[str, float]]:
+    """Fuse ranked (id, score) lists by summed 1 / (k + rank); best first."""
+    fused: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, (node_id, _) in enumerate(ranking, start=1):
+            fused[node_id] = fused.get(node_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda kv: kv[1], reverse=True)
+
+
+async def hybrid_search(
+    query: str,
+    top_k: int = 12,
+    filters: SearchFilters | None = None,
+    rerank: bool | None = None,
+) -> list[tuple[str, float]]:
+    """Top-k (node_id, relevance) from fused BM25 and vector search.
+
+    Relevance is scaled so the best result is 1.0.
+    """
+    from .llm.embeddings import get_embedding_service
+
+    emb_service = get_embedding_service()
+    candidates = int(os.getenv("NEXUS_RETRIEVAL_CANDIDATES", "30"))
+    if rerank is None:
+        rerank = os.getenv("NEXUS_RETRIEVAL_RERANK", "0") == "1"
+    allowed = filters.allowed_ids() if filters else None
+
+    async def vector_search():
+        with metrics.RETRIEVAL_SECONDS.time(stage="vector"):
+            return await emb_service.search(query, top_k=candidates, filters=filters, keyword_fallback=False)
+
+    # Start the vector side first; BM25 runs while its query embedding is in flight
+    vector_task = asyncio.create_task(vector_search())
+    try:
+        with metrics.RETRIEVAL_SECONDS.time(stage="lexical"):
+            lexical = await asyncio.to_thread(lambda: get_node_index().search(query, candidates, allowed=allowed))
+        try:
+            vector = await vector_task
+        except Exception as e:
+            logger.warning(f"[Retrieval] Vector search failed, using BM25 only: {e}")
+            vector = []
+    finally:
+        vector_task.cancel()
+
+    fused = reciprocal_rank_fusion([r for r in (lexical, vector) if r])
+    if rerank and fused:
+        with metrics.RETRIEVAL_SECONDS.time(stage="rerank"):
+            fused = await _rerank(query, fused, dict(lexical))
+    results = fused[:top_k]
+
+    logger.info(
+        f"[Retrieval] {len(lexical)} lexical + {len(vector)} vector -> {len(results)} nodes"
+        + (f" (filters: {filters})" if filters else "")
+    )
+    if not results:
+        return []
+    best = results[0][1] if results[0][1] > 0 else 1.0
+    return [(node_id, score / best) for node_id, score in results]
+
+
+async def _rerank(query: str, fused: list[tuple[str, float]], bm25: dict[str, float]) -> list[tuple[str, float]]:
+    """Rescore candidates by alpha * cosine + (1 - alpha) * BM25 / max BM25."""
+    from .llm.embeddings import get_embedding_service
+
+    alpha = float(os.getenv("NEXUS_RETRIEVAL_RERANK_ALPHA", "0.7"))
+    emb_service = get_embedding_service()
+    ids = [node_id for node_id, _ in fused]
+    try:
+        cosine = await emb_service.similarities(query, ids)
+    except Exception as e:
+        logger.warning(f"[Retrieval] Rerank skipped, no vectors: {e}")
+        return fused
+    top_bm25 = max(bm25.values(), default=0.0) or 1.0
+    scores = np.array([
+        alpha * cosine.get(node_id, 0.0) + (1 - alpha) * bm25.get(node_id, 0.0) / top_bm25
+        for node_id in ids
+    ])
+    order = np.argsort(-scores, kind="stable")
+    return [(ids[i], float(scores[i])) for i in order]
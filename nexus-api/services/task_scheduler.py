@@ -4,6 +4,7 @@ import json
 import logging
 from .llm.client import get_llm_client
 from .llm.context_builder import ContextBuilder
+from .llm.prompt_layout import org_layout, TASK, DYNAMIC
 from .llm import prompts
 from .supabase_client import get_supabase, is_supabase_configured
 
@@ -20,21 +21,16 @@ async def generate_task_graph() -> dict:
     client = get_llm_client()
     ctx = ContextBuilder()
 
-    org_summary = ctx.build_org_summary()
-    org_context = ctx.build_org_context()
-    alerts_context = ctx.build_alerts_context()
-    knowledge_context = ctx.build_knowledge_context()
-
-    system = prompts.NEXUS_BASE.format(**org_summary) + "\n\n" + prompts.TASK_SCHEDULER
+    layout = org_layout(ctx)
+    layout.add(TASK, prompts.TASK_SCHEDULER)
+    layout.add(TASK, "Knowledge units:\n" + ctx.build_knowledge_context(max_tokens=1000))
+    layout.add(DYNAMIC, "Generate the task graph for the current organizational state above.")
+    system, user = layout.build()
 
     result = await client.complete_json(
         task_type="task_scheduling",
         system_prompt=system,
-        user_prompt=(
-            f"Current organizational state:\n{org_context[:6000]}\n\n"
-            f"Active alerts:\n{alerts_context}\n\n"
-            f"Knowledge units:\n{knowledge_context[:4000]}"
-        ),
+        user_prompt=user,
         use_cache=False,
     )
 
@@ -0,0 +1,143 @@
+"""Character-trigram index for fuzzy matching against cached Ask queries.
+
+Each string is reduced to its set of character trigrams, with one posting
+array of string positions per trigram. A lookup concatenates the postings
+of the query's trigrams and counts them with np.bincount, which gives the
+trigram overlap with every string that shares at least one. That overlap
+answers both questions the cache fallback asks, without running difflib
+over the whole cache:
+
+  substring   a string containing q has all of q's trigrams; a string
+              contained in q has all of its own. Only strings meeting one
+              of those counts are checked with `in`.
+  similarity  strings are ranked by trigram Dice coefficient and only the
+              best NEXUS_TRIGRAM_CANDIDATES are scored with SequenceMatcher,
+              so the 0.5 ratio threshold keeps its meaning. Candidates
+              whose quick_ratio bound cannot beat the best so far are
+              skipped.
+
+Strings shorter than three characters have no trigrams and are checked
+directly.
+"""
+
+import os
+import threading
+from difflib import SequenceMatcher
+
+import numpy as np
+
+from .graph_store import get_generation
+
+
+def trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """Trigram postings over a fixed list of strings, addressed by position."""
+
+    def __init__(self, strings: list[str]):
+        self.strings = strings
+        postings: dict[str, list[int]] = {}
+        self._sizes = np.zeros(len(strings), dtype=np.int32)
+        self._short: list[int] = []  # positions of strings without trigrams
+        for i, s in enumerate(strings):
+            grams = trigrams(s)
+            self._sizes[i] = len(grams)
+            if not grams:
+                self._short.append(i)
+            for g in grams:
+                postings.setdefault(g, []).append(i)
+        self._postings = {g: np.array(ids, dtype=np.int32) for g, ids in postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+    def _overlap(self, grams: set[str]) -> np.ndarray:
+        lists = [self._postings[g] for g in grams if g in self._postings]
+        if not lists:
+            return np.zeros(len(self.strings), dtype=np.int32)
+        return np.bincount(np.concatenate(lists), minlength=len(self.strings))
+
+    def first_substring(self, q: str, grams: set[str] | None = None, overlap: np.ndarray | None = None) -> int | None:
+        """Position of the first string that contains q or is contained in q."""
+        if len(q) < 3:
+            # Too short to have trigrams; `in` over every string is still cheap
+            return next((i for i, s in enumerate(self.strings) if q in s or s in q), None)
+        if grams is None:
+            grams = trigrams(q)
+        if overlap is None:
+            overlap = self._overlap(grams)
+        candidates = np.flatnonzero((overlap == len(grams)) | ((overlap == self._sizes) & (self._sizes > 0)))
+        for i in sorted([*candidates.tolist(), *self._short]):
+            s = self.strings[i]
+            if q in s or s in q:
+                return i
+        return None
+
+    def most_similar(
+        self,
+        q: str,
+        min_ratio: float = 0.0,
+        grams: set[str] | None = None,
+        overlap: np.ndarray | None = None,
+        candidates: int | None = None,
+    ) -> tuple[int | None, float]:
+        """(position, SequenceMatcher ratio) of the most similar string, first one on ties.
+
+        Strings whose ratio cannot exceed min_ratio are not scored; (None, 0.0)
+        when none does.
+        """
+        if grams is None:
+            grams = trigrams(q)
+        if overlap is None:
+            overlap = self._overlap(grams)
+        if candidates is None:
+            candidates = int(os.getenv("NEXUS_TRIGRAM_CANDIDATES", "4"))
+        shared = np.flatnonzero(overlap)
+        if not len(shared):
+            return None, 0.0
+        dice = 2 * overlap[shared] / (len(grams) + self._sizes[shared])
+        if len(shared) > candidates:
+            top = np.argpartition(-dice, candidates - 1)[:candidates]
+            shared, dice = shared[top], dice[top]
+        # Best Dice first, so the quick_ratio upper bound skips most of the rest
+        matcher = SequenceMatcher(None, q)
+        best, best_ratio = None, min_ratio
+        for i in shared[np.lexsort((shared, -dice))].tolist():
+            matcher.set_seq2(self.strings[i])
+            if matcher.real_quick_ratio() <= best_ratio or matcher.quick_ratio() <= best_ratio:
+                continue
+            ratio = matcher.ratio()
+            if ratio > best_ratio or (ratio == best_ratio and best is not None and i < best):
+                best, best_ratio = i, ratio
+        return (best, best_ratio) if best is not None else (None, 0.0)
+
+    def match(self, q: str, min_ratio: float = 0.0) -> tuple[int | None, float]:
+        """(position, ratio) for a substring match (ratio 1.0), else the most similar string above min_ratio."""
+        grams = trigrams(q)
+        overlap = self._overlap(grams)
+        i = self.first_substring(q, grams, overlap)
+        if i is not None:
+            return i, 1.0
+        return self.most_similar(q, min_ratio, grams, overlap)
+
+
+# ── Ask cache index ──────────────────────────────────────────────────────────
+
+_ask_index: tuple[tuple, TrigramIndex, list] | None = None
+_ask_lock = threading.Lock()
+
+
+def get_ask_cache_index(queries: dict) -> tuple[TrigramIndex, list]:
+    """Index over the lowercased keys of an ask cache's queries, and the responses by position.
+
+    Rebuilt when the ask_cache generation or the dict itself changes.
+    """
+    global _ask_index
+    stamp = (id(queries), len(queries), get_generation("ask_cache"))
+    with _ask_lock:
+        if _ask_index is None or _ask_index[0] != stamp:
+            items = list(queries.items())
+            _ask_index = (stamp, TrigramIndex([k.lower() for k, _ in items]), [v for _, v in items])
+        return _ask_index[1], _ask_index[2]
@@ -4,6 +4,7 @@ import json
 import logging
 from .llm.client import get_llm_client
 from .llm.context_builder import ContextBuilder
+from .llm.prompt_layout import org_layout, TASK, DYNAMIC
 from .llm import prompts
 from .supabase_client import get_supabase, is_supabase_configured
 
@@ -12,27 +13,26 @@ logger = logging.getLogger("nexus.worker_tracker")
 _latest_analysis: dict | None = None
 
 
-async def analyze_workers() -> dict:
+async def analyze_workers(model: str | None = None) -> dict:
     """Run full worker analysis: conflicts, duplicates, overloads, reallocation, collaboration."""
     global _latest_analysis
 
     client = get_llm_client()
-    ctx = ContextBuilder()
-
-    org_summary = ctx.build_org_summary()
-    org_context = ctx.build_org_context()
-    alerts_context = ctx.build_alerts_context()
 
-    system = prompts.NEXUS_BASE.format(**org_summary) + "\n\n" + prompts.WORKER_TRACKER
+    layout = org_layout()
+    layout.add(TASK, prompts.WORKER_TRACKER)
+    layout.add(DYNAMIC, (
+        "Analyze the current work assignments in the organizational state above. "
+        "Use the active alerts as overload/conflict signals."
+    ))
+    system, user = layout.build()
 
     result = await client.complete_json(
         task_type="worker_analysis",
         system_prompt=system,
-        user_prompt=(
-            f"Current work assignments and organizational state:\n{org_context[:8000]}\n\n"
-            f"Active alerts (for overload/conflict signals):\n{alerts_context}"
-        ),
+        user_prompt=user,
         use_cache=False,
+        model=model,
     )
 
     _latest_analysis = result
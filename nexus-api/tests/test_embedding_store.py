@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from services.llm.embedding_store import EmbeddingStore
+
+
+def _vectors(n: int, dim: int = 8, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+
+def test_put_after_interrupted_write_keeps_rows_aligned(tmp_path, monkeypatch):
+    store = EmbeddingStore(str(tmp_path))
+    first = _vectors(3, seed=1)
+    store.put(["a", "b", "c"], ["ha", "hb", "hc"], first, model="m")
+
+    # Vector data reaches the file, but the sidecar is never replaced
+    def fail():
+        raise OSError("disk full")
+
+    monkeypatch.setattr(store, "_write_sidecar", fail)
+    with pytest.raises(OSError):
+        store.put(["d", "e"], ["hd", "he"], _vectors(2, seed=2), model="m")
+    monkeypatch.undo()
+
+    assert "d" not in store.hashes and len(store) == 3 and store._rows == 3
+
+    fresh = EmbeddingStore(str(tmp_path))
+    fresh.load()
+    f = _vectors(1, seed=3)
+    fresh.put(["f"], ["hf"], f, model="m")
+
+    expected = f[0] / np.linalg.norm(f[0])
+    np.testing.assert_allclose(fresh.get(["f"])[0], expected, rtol=1e-6)
+    np.testing.assert_allclose(fresh.get(["a"])[0], first[0] / np.linalg.norm(first[0]), rtol=1e-6)
+
+
+def test_store_reopens_with_same_vectors(tmp_path):
+    vectors = _vectors(4)
+    store = EmbeddingStore(str(tmp_path))
+    store.put(["a", "b", "c", "d"], ["1", "2", "3", "4"], vectors, model="m")
+
+    reopened = EmbeddingStore(str(tmp_path))
+    assert reopened.load()
+    assert reopened.hashes == {"a": "1", "b": "2", "c": "3", "d": "4"}
+    np.testing.assert_allclose(reopened.get(["c"])[0], vectors[2] / np.linalg.norm(vectors[2]), rtol=1e-6)
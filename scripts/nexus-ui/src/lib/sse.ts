@@ -6,10 +6,36 @@
 const BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
 const STREAM_TIMEOUT_MS = 5000;
 
+export interface RetrievedNode {
+  id: string;
+  label: string;
+  type: string;
+  division: string;
+  score: number;
+}
+
+export interface StreamCitation {
+  node_id: string;
+  label: string;
+  relevance: number;
+}
+
+export interface StreamResult {
+  answer: string;
+  citations: StreamCitation[];
+  highlight_node_ids: string[];
+}
+
 export interface SSECallbacks {
   onToken: (token: string) => void;
   onDone: () => void;
   onError?: (error: string) => void;
+  /** Ask only: ranked context nodes, sent before the first token. */
+  onRetrieval?: (nodes: RetrievedNode[]) => void;
+  /** Ask only: context nodes the answer names, sent after the last token. */
+  onCitations?: (citations: StreamCitation[]) => void;
+  /** Ask only: the complete answer, sent just before done. */
+  onResult?: (result: StreamResult) => void;
 }
 
 /**
@@ -66,6 +92,12 @@ export async function streamPost(
           const payload = JSON.parse(line.slice(6));
           if (payload.type === 'token') {
             callbacks.onToken(payload.content);
+          } else if (payload.type === 'retrieval') {
+            callbacks.onRetrieval?.(payload.nodes);
+          } else if (payload.type === 'citations') {
+            callbacks.onCitations?.(payload.citations);
+          } else if (payload.type === 'result') {
+            callbacks.onResult?.(payload);
           } else if (payload.type === 'done') {
             callbacks.onDone();
             return;
@@ -4,6 +4,7 @@ import { Search, Sparkles, ArrowRight, Zap } from 'lucide-react'
 import type { AskResponse } from '../types/graph'
 import { askNexus } from '../lib/api'
 import { streamPost } from '../lib/sse'
+import type { RetrievedNode, StreamCitation } from '../lib/sse'
 import { DivisionScopeBadge, FeedbackWidget } from '../components/shared'
 
 const SUGGESTED_QUERIES = [
@@ -54,6 +55,9 @@ export function AskNexusView() {
   const [streamText, setStreamText] = useState('')
   const [isStreaming, setIsStreaming] = useState(false)
   const [useStream, setUseStream] = useState(false)
+  const [retrieved, setRetrieved] = useState<RetrievedNode[]>([])
+  const [citations, setCitations] = useState<StreamCitation[]>([])
+  const [streamHighlight, setStreamHighlight] = useState<string[]>([])
   const streamTextRef = useRef('')
 
   const handleSubmit = useCallback(
@@ -63,16 +67,22 @@ export function AskNexusView() {
       setLoading(true)
       setResponse(null)
       setStreamText('')
+      setRetrieved([])
+      setCitations([])
+      setStreamHighlight([])
       streamTextRef.current = ''
 
       if (useStream) {
         setIsStreaming(true)
         try {
           await streamPost('/api/ask', { query: text, stream: true }, {
+            onRetrieval: (nodes) => setRetrieved(nodes),
             onToken: (token) => {
               streamTextRef.current += token
               setStreamText(streamTextRef.current)
             },
+            onCitations: (cited) => setCitations(cited),
+            onResult: (result) => setStreamHighlight(result.highlight_node_ids),
             onDone: () => {
               setIsStreaming(false)
               setLoading(false)
@@ -175,22 +185,58 @@ export function AskNexusView() {
 
         {/* Streaming response */}
         {(isStreaming || streamText) && !response && (
-          <div className="bg-cards rounded-lg border border-white/5 border-l-[3px] border-l-accent-blue p-5 mb-4">
-            <div className="flex items-center gap-2 mb-3">
-              <Sparkles size={14} className="text-accent-blue" />
-              <span className="text-xs font-semibold text-accent-blue uppercase tracking-wider">
-                LLM Response
-              </span>
-              {isStreaming && (
-                <span className="w-1.5 h-1.5 rounded-full bg-accent-blue animate-pulse" />
-              )}
-            </div>
-            <div className="text-sm text-text-secondary leading-relaxed whitespace-pre-wrap">
-              {streamText}
-              {isStreaming && (
-                <span className="inline-block w-0.5 h-4 bg-accent-blue ml-0.5 animate-pulse align-middle" />
-              )}
+          <div className="space-y-4 mb-4">
+            {/* Retrieved context, shown while the answer is generated */}
+            {retrieved.length > 0 && (
+              <div>
+                <p className="text-[10px] font-semibold uppercase tracking-wider text-text-tertiary mb-2">
+                  {citations.length > 0 ? 'Cited' : 'Searching'}
+                </p>
+                <div className="flex flex-wrap gap-1.5">
+                  {(citations.length > 0
+                    ? citations.map(c => ({ id: c.node_id, label: c.label }))
+                    : retrieved
+                  ).map(node => (
+                    <span
+                      key={node.id}
+                      title={node.id}
+                      className="px-2 py-0.5 rounded-full bg-white/5 border border-white/10 text-[11px] text-text-secondary"
+                    >
+                      {node.label}
+                    </span>
+                  ))}
+                </div>
+              </div>
+            )}
+
+            <div className="bg-cards rounded-lg border border-white/5 border-l-[3px] border-l-accent-blue p-5">
+              <div className="flex items-center gap-2 mb-3">
+                <Sparkles size={14} className="text-accent-blue" />
+                <span className="text-xs font-semibold text-accent-blue uppercase tracking-wider">
+                  LLM Response
+                </span>
+                {isStreaming && (
+                  <span className="w-1.5 h-1.5 rounded-full bg-accent-blue animate-pulse" />
+                )}
+              </div>
+              <div className="text-sm text-text-secondary leading-relaxed whitespace-pre-wrap">
+                {streamText}
+                {isStreaming && (
+                  <span className="inline-block w-0.5 h-4 bg-accent-blue ml-0.5 animate-pulse align-middle" />
+                )}
+              </div>
             </div>
+
+            {streamHighlight.length > 0 && (
+              <button
+                onClick={() => navigate(`/pulse?highlight=${streamHighlight.join(',')}`)}
+                className="w-full flex items-center justify-center gap-2 px-4 py-2.5 rounded-lg bg-accent-blue/10 border border-accent-blue/20 text-accent-blue text-sm font-medium hover:bg-accent-blue/20 transition-colors"
+              >
+                <Sparkles size={14} />
+                Highlight on Pulse View
+                <ArrowRight size={14} />
+              </button>
+            )}
           </div>
         )}
 